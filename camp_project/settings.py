@@ -115,6 +115,37 @@ DATABASES = {
 }
 
 
+# Com REDIS_URL o cache é compartilhado entre os workers do gunicorn e os
+# processos de segundo plano, sem consultas ao banco. Sem Redis, produção usa
+# a tabela do banco (createcachetable), que também é compartilhada: as versões
+# de valores e folha não expiram e precisam ser vistas por todos os processos.
+# O cache em memória, um por processo, fica só para desenvolvimento (DEBUG).
+if os.getenv('REDIS_URL'):
+    CACHES = {
+        'default': {
+            'BACKEND': 'django_redis.cache.RedisCache',
+            'LOCATION': os.environ['REDIS_URL'],
+            'OPTIONS': {
+                'CLIENT_CLASS': 'django_redis.client.DefaultClient',
+            }
+        }
+    }
+elif DEBUG:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': 'paiol',
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.db.DatabaseCache',
+            'LOCATION': 'cache_paiol',
+        }
+    }
+
+
 # Password validation
 # https://docs.djangoproject.com/en/5.1/ref/settings/#auth-password-validators
 
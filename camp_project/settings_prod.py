@@ -105,18 +105,6 @@ LOGGING = {
     },
 }
 
-# Cache (opcional - para melhor performance)
-if 'REDIS_URL' in os.environ:
-    CACHES = {
-        'default': {
-            'BACKEND': 'django_redis.cache.RedisCache',
-            'LOCATION': os.environ.get('REDIS_URL'),
-            'OPTIONS': {
-                'CLIENT_CLASS': 'django_redis.client.DefaultClient',
-            }
-        }
-    }
-
 # Configurações específicas para diferentes provedores
 PROVIDER = os.environ.get('HOSTING_PROVIDER', 'generic')
 
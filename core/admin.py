@@ -1,6 +1,6 @@
 from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin
-from .models import CustomUser
+from .models import CustomUser, ImportacaoUsuarios, RegistroAprovacao
 
 
 class CustomUserAdmin(UserAdmin):
@@ -14,3 +14,17 @@ class CustomUserAdmin(UserAdmin):
 
 admin.site.register(CustomUser, CustomUserAdmin)
 
+
+
+@admin.register(RegistroAprovacao)
+class RegistroAprovacaoAdmin(admin.ModelAdmin):
+    list_display = ('monitor', 'acao', 'gestor', 'aprovado_antes', 'ativo_antes', 'criado_em')
+    list_filter = ('acao',)
+    search_fields = ('monitor__username', 'gestor__username')
+
+
+@admin.register(ImportacaoUsuarios)
+class ImportacaoUsuariosAdmin(admin.ModelAdmin):
+    list_display = ('nome_arquivo', 'criado_por', 'status', 'linhas_processadas', 'usuarios_criados', 'total_erros', 'criado_em')
+    list_filter = ('status',)
+    readonly_fields = ('erros',)
@@ -0,0 +1,54 @@
+"""Fila de aprovação de monitores: filtros e ações em lote auditadas."""
+from django.db import transaction
+from django.db.models import Count, Q
+
+from .dashboard import invalidar_resumo_gestor
+from .models import CustomUser, RegistroAprovacao
+
+# Campos gravados por cada ação
+ACOES = {
+    'approve': {'is_approved': True, 'is_active': True},
+    'disapprove': {'is_approved': False},
+    'reject': {'is_approved': False, 'is_active': False},
+}
+
+FILTROS = {
+    'pendentes': Q(is_approved=False, is_active=True),
+    'incompletos': Q(cadastro_completo=False),
+    'inativos': Q(is_active=False),
+    'todos': Q(),
+}
+
+
+def contagens_fila():
+    """Total de monitores em cada filtro, em uma única consulta."""
+    return CustomUser.objects.filter(user_type='monitor').aggregate(
+        **{nome: Count('id', filter=filtro) for nome, filtro in FILTROS.items()}
+    )
+
+
+def aplicar_acao(monitor_ids, acao, gestor):
+    """Aplica ``acao`` aos monitores com um único UPDATE e registra a auditoria.
+
+    Retorna quantos monitores foram alterados.
+    """
+    campos = ACOES[acao]
+    with transaction.atomic():
+        monitores = list(
+            CustomUser.objects.select_for_update()
+            .filter(id__in=monitor_ids, user_type='monitor')
+            .values_list('id', 'is_approved', 'is_active')
+        )
+        if not monitores:
+            return 0
+        alterados = CustomUser.objects.filter(id__in=[m[0] for m in monitores]).update(**campos)
+        RegistroAprovacao.objects.bulk_create([
+            RegistroAprovacao(
+                monitor_id=monitor_id, gestor=gestor, acao=acao,
+                aprovado_antes=aprovado, ativo_antes=ativo,
+            )
+            for monitor_id, aprovado, ativo in monitores
+        ])
+        # update() não dispara os sinais que invalidam o painel
+        invalidar_resumo_gestor()
+    return alterados
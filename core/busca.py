@@ -0,0 +1,110 @@
+"""Busca de usuários sem acentos e apoiada em índice.
+
+O texto pesquisável de cada usuário (usuário, e-mail, nomes e nome completo)
+é gravado já normalizado em ``CustomUser.busca_normalizada``. Normalizar na
+escrita evita depender de ``unaccent()`` na consulta: a função não é
+IMMUTABLE no Postgres e, por isso, não pode alimentar um índice.
+
+- Postgres: índice GIN trigram sobre ``busca_normalizada`` atende o
+  ``LIKE '%termo%'`` e a similaridade ordena o resultado.
+- SQLite: a tabela FTS5 ``core_customuser_busca`` espelha o texto (rowid = id
+  do usuário) e o ``bm25`` ordena o resultado.
+"""
+import re
+import unicodedata
+
+from django.db import connection
+from django.db.models import FloatField, Q, Value
+from django.db.models.expressions import RawSQL
+
+TABELA_FTS = 'core_customuser_busca'
+CAMPOS_BUSCA = ('username', 'email', 'first_name', 'last_name', 'nome_completo')
+
+
+def normalizar(texto):
+    """Minúsculas e sem acentos: "José" -> "jose"."""
+    decomposto = unicodedata.normalize('NFKD', texto or '')
+    return ''.join(c for c in decomposto if not unicodedata.combining(c)).lower()
+
+
+def texto_busca(usuario):
+    return normalizar(' '.join(getattr(usuario, campo) or '' for campo in CAMPOS_BUSCA))
+
+
+def _palavras(termo):
+    return re.findall(r'\w+', normalizar(termo))
+
+
+def _usa_fts():
+    return connection.vendor == 'sqlite'
+
+
+def _em_lotes(ids, tamanho=500):
+    ids = list(ids)
+    for inicio in range(0, len(ids), tamanho):
+        yield ids[inicio:inicio + tamanho]
+
+
+def indexar_usuarios(ids):
+    """Sincroniza a tabela FTS com ``busca_normalizada`` (necessário após bulk_create/update)."""
+    if not _usa_fts():
+        return
+    with connection.cursor() as cursor:
+        for lote in _em_lotes(ids):
+            marcadores = ','.join(['%s'] * len(lote))
+            cursor.execute(f'DELETE FROM {TABELA_FTS} WHERE rowid IN ({marcadores})', lote)
+            cursor.execute(
+                f'INSERT INTO {TABELA_FTS} (rowid, texto) '
+                f'SELECT id, busca_normalizada FROM core_customuser WHERE id IN ({marcadores})',
+                lote,
+            )
+
+
+def remover_do_indice(ids):
+    if not _usa_fts():
+        return
+    with connection.cursor() as cursor:
+        for lote in _em_lotes(ids):
+            marcadores = ','.join(['%s'] * len(lote))
+            cursor.execute(f'DELETE FROM {TABELA_FTS} WHERE rowid IN ({marcadores})', lote)
+
+
+def buscar_usuarios(usuarios, termo):
+    """Filtra ``usuarios`` pelo termo e anota ``relevancia`` (maior = melhor).
+
+    Todas as palavras do termo precisam aparecer; a ordenação fica a cargo de
+    quem chama (``order_by('-relevancia', ...)``).
+    """
+    palavras = _palavras(termo)
+    if not palavras:
+        return usuarios.annotate(relevancia=Value(0.0, output_field=FloatField()))
+
+    if connection.vendor == 'postgresql':
+        from django.contrib.postgres.search import TrigramWordSimilarity
+
+        filtro = Q()
+        for palavra in palavras:
+            filtro &= Q(busca_normalizada__contains=palavra)
+        return usuarios.filter(filtro).annotate(
+            relevancia=TrigramWordSimilarity(' '.join(palavras), 'busca_normalizada')
+        )
+
+    if _usa_fts():
+        # Cada palavra vira um prefixo: "jos sil" encontra "José da Silva"
+        consulta = ' '.join(f'"{palavra}"*' for palavra in palavras)
+        return usuarios.filter(
+            id__in=RawSQL(f'SELECT rowid FROM {TABELA_FTS} WHERE {TABELA_FTS} MATCH %s', [consulta])
+        ).annotate(
+            # bm25 é negativo e menor para os melhores resultados
+            relevancia=RawSQL(
+                f'SELECT -bm25({TABELA_FTS}) FROM {TABELA_FTS} '
+                f'WHERE {TABELA_FTS} MATCH %s AND rowid = core_customuser.id',
+                [consulta],
+                output_field=FloatField(),
+            )
+        )
+
+    filtro = Q()
+    for palavra in palavras:
+        filtro &= Q(busca_normalizada__contains=palavra)
+    return usuarios.filter(filtro).annotate(relevancia=Value(0.0, output_field=FloatField()))
@@ -0,0 +1,95 @@
+"""Contadores dos painéis iniciais, calculados com agregações condicionais e cacheados."""
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count, FilteredRelation, Q
+from django.utils import timezone
+
+from temporadas.cache import chave_resumo_monitor
+from temporadas.models import InteresseTemporada, Temporada
+from .models import CustomUser
+
+CHAVE_RESUMO_GESTOR = 'dashboard:gestor'
+TIMEOUT_RESUMO = 60 * 15
+
+
+def _calcular_resumo_gestor():
+    temporadas = Temporada.objects.aggregate(
+        total=Count('id'),
+        sem_email=Count('id', filter=Q(email_enviado=False)),
+    )
+    interesses = InteresseTemporada.objects.aggregate(
+        pendentes=Count('id', filter=Q(status='interessado')),
+    )
+    usuarios = CustomUser.objects.aggregate(
+        total=Count('id'),
+        admin=Count('id', filter=Q(user_type='admin')),
+        gestor=Count('id', filter=Q(user_type='gestor')),
+        monitor=Count('id', filter=Q(user_type='monitor')),
+        monitores_pendentes=Count('id', filter=Q(user_type='monitor', is_approved=False)),
+    )
+    ultimos_usuarios = list(
+        CustomUser.objects.only('username', 'email', 'user_type', 'date_joined').order_by('-date_joined')[:5]
+    )
+
+    return {
+        'total_temporadas': temporadas['total'],
+        'interesses_pendentes': interesses['pendentes'],
+        'temporadas_sem_email': temporadas['sem_email'],
+        'monitores_pendentes_aprovacao': usuarios['monitores_pendentes'],
+        'total_usuarios': usuarios['total'],
+        'usuarios_por_tipo': {
+            'admin': usuarios['admin'],
+            'gestor': usuarios['gestor'],
+            'monitor': usuarios['monitor'],
+        },
+        'ultimos_usuarios': ultimos_usuarios,
+    }
+
+
+def resumo_gestor():
+    """Contadores do painel do gestor; recalculados apenas após alguma escrita."""
+    resumo = cache.get(CHAVE_RESUMO_GESTOR)
+    if resumo is None:
+        resumo = _calcular_resumo_gestor()
+        cache.set(CHAVE_RESUMO_GESTOR, resumo, TIMEOUT_RESUMO)
+    return resumo
+
+
+def invalidar_resumo_gestor():
+    """Apaga os contadores do gestor quando a transação atual confirmar.
+
+    Apagar antes do commit deixaria outra requisição recalcular com os dados
+    antigos e guardá-los por ``TIMEOUT_RESUMO``.
+    """
+    transaction.on_commit(lambda: cache.delete(CHAVE_RESUMO_GESTOR))
+
+
+def _calcular_resumo_monitor(monitor, hoje):
+    # LEFT JOIN apenas com o interesse deste monitor (no máximo um por temporada)
+    contagens = Temporada.objects.annotate(
+        meu_interesse=FilteredRelation('interessetemporada', condition=Q(interessetemporada__monitor=monitor)),
+    ).aggregate(
+        disponiveis=Count('id', filter=Q(data_fim__gte=hoje, meu_interesse__isnull=True)),
+        minhas=Count('id', filter=Q(meu_interesse__status__in=['aprovado', 'confirmado'])),
+    )
+    return {
+        'temporadas_disponiveis': contagens['disponiveis'],
+        # Após aprovação, já deve aparecer em "Minhas temporadas"
+        'minhas_temporadas': contagens['minhas'],
+    }
+
+
+def resumo_monitor(monitor):
+    """Contadores da home do monitor.
+
+    A chave usa as versões do calendário (``temporadas.cache``), que já mudam
+    quando alguma temporada é salva ou quando os interesses do monitor mudam.
+    """
+    # Mesmo critério de data da listagem de temporadas disponíveis
+    hoje = timezone.now().date()
+    chave = chave_resumo_monitor(monitor.id, hoje)
+    resumo = cache.get(chave)
+    if resumo is None:
+        resumo = _calcular_resumo_monitor(monitor, hoje)
+        cache.set(chave, resumo, TIMEOUT_RESUMO)
+    return resumo
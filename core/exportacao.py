@@ -0,0 +1,141 @@
+"""Exportação da lista de usuários em CSV ou XLSX.
+
+As linhas vêm de ``values_list(...).iterator(chunk_size=...)`` com o
+endereço por JOIN, sem instanciar ``CustomUser``. Só o CSV é em fluxo: cada
+linha vai direto para a resposta, com memória constante e o primeiro byte
+saindo logo. O XLSX (openpyxl, dependência opcional) não é: um .xlsx é um
+ZIP que só se fecha depois da última linha, então a planilha inteira é
+montada antes do envio (ver ``resposta_xlsx``).
+"""
+import csv
+import tempfile
+
+from django.http import FileResponse, StreamingHttpResponse
+from django.utils import timezone
+
+from .models import CATEGORIA_CHOICES, USER_TYPES
+
+TAMANHO_LOTE_EXPORTACAO = 2000
+
+# (cabeçalho, campo do values_list)
+COLUNAS = (
+    ('Usuário', 'username'),
+    ('E-mail', 'email'),
+    ('Nome', 'first_name'),
+    ('Sobrenome', 'last_name'),
+    ('Nome completo', 'nome_completo'),
+    ('Tipo', 'user_type'),
+    ('Categoria', 'categoria'),
+    ('Aprovado', 'is_approved'),
+    ('Ativo', 'is_active'),
+    ('Cadastro completo', 'cadastro_completo'),
+    ('CPF', 'cpf'),
+    ('Telefone', 'telefone'),
+    ('Celular', 'celular'),
+    ('Data de nascimento', 'data_nascimento'),
+    ('Cadastrado em', 'date_joined'),
+    ('CEP', 'endereco_completo__cep'),
+    ('Logradouro', 'endereco_completo__logradouro'),
+    ('Número', 'endereco_completo__numero'),
+    ('Complemento', 'endereco_completo__complemento'),
+    ('Bairro', 'endereco_completo__bairro'),
+    ('Cidade', 'endereco_completo__cidade'),
+    ('Estado', 'endereco_completo__estado'),
+)
+
+_ROTULOS = {
+    'user_type': dict(USER_TYPES),
+    'categoria': dict(CATEGORIA_CHOICES),
+}
+
+
+def xlsx_disponivel():
+    try:
+        import openpyxl  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+# Prefixos que o Excel/LibreOffice interpretam como início de fórmula
+INICIO_FORMULA = ('=', '+', '-', '@', '\t', '\r')
+
+
+def texto_seguro(valor):
+    """Neutraliza fórmulas em texto digitado por usuários (ex.: ``=HYPERLINK(...)``)."""
+    if isinstance(valor, str) and valor.startswith(INICIO_FORMULA):
+        return "'" + valor
+    return valor
+
+
+def _formatar(campo, valor):
+    if valor is None:
+        return ''
+    if isinstance(valor, bool):
+        return 'Sim' if valor else 'Não'
+    if campo in _ROTULOS:
+        return _ROTULOS[campo].get(valor, valor)
+    if campo == 'date_joined':
+        return timezone.localtime(valor).strftime('%d/%m/%Y %H:%M')
+    if campo == 'data_nascimento':
+        return valor.strftime('%d/%m/%Y')
+    return texto_seguro(valor)
+
+
+def linhas_usuarios(usuarios):
+    """Cabeçalho seguido de uma tupla formatada por usuário, lidas em lotes."""
+    campos = [campo for _, campo in COLUNAS]
+    yield [cabecalho for cabecalho, _ in COLUNAS]
+    for valores in usuarios.values_list(*campos).iterator(chunk_size=TAMANHO_LOTE_EXPORTACAO):
+        yield [_formatar(campo, valor) for campo, valor in zip(campos, valores)]
+
+
+class Eco:
+    """Pseudo-arquivo para o csv.writer: devolve a linha em vez de guardá-la."""
+
+    def write(self, valor):
+        return valor
+
+
+def _nome_arquivo(extensao):
+    return f'usuarios_{timezone.localtime():%Y%m%d_%H%M}.{extensao}'
+
+
+def resposta_csv(usuarios):
+    escritor = csv.writer(Eco())
+
+    def conteudo():
+        yield '\ufeff'  # BOM para o Excel reconhecer UTF-8
+        for linha in linhas_usuarios(usuarios):
+            yield escritor.writerow(linha)
+
+    resposta = StreamingHttpResponse(conteudo(), content_type='text/csv; charset=utf-8')
+    resposta['Content-Disposition'] = f'attachment; filename="{_nome_arquivo("csv")}"'
+    return resposta
+
+
+def resposta_xlsx(usuarios):
+    """Planilha completa, enviada só depois de pronta.
+
+    O modo write-only mantém a memória constante, pois as linhas vão para
+    arquivos temporários em disco. Mas o disco usado e o tempo até o
+    primeiro byte crescem com o número de linhas. Para listas grandes, o
+    CSV é o formato em fluxo.
+    """
+    from openpyxl import Workbook
+
+    planilha = Workbook(write_only=True)
+    aba = planilha.create_sheet('Usuários')
+    for linha in linhas_usuarios(usuarios):
+        aba.append(linha)
+
+    # O arquivo temporário é apagado quando a resposta termina de ser enviada
+    arquivo = tempfile.TemporaryFile()
+    planilha.save(arquivo)
+    arquivo.seek(0)
+    return FileResponse(
+        arquivo,
+        as_attachment=True,
+        filename=_nome_arquivo('xlsx'),
+        content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+    )
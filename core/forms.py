@@ -1,8 +1,8 @@
 from django import forms
 from django.contrib.auth.forms import UserCreationForm
 from .models import CustomUser
-import csv
-import io
+
+TAMANHO_MAXIMO_CSV = 50 * 1024 * 1024
 
 class CustomUserCreationForm(UserCreationForm):
     email = forms.EmailField(
@@ -256,89 +256,6 @@ class UserManagementForm(forms.ModelForm):
         return user
 
 
-class CSVUploadForm(forms.Form):
-    """Formulário para upload de CSV com usuários"""
-    
-    csv_file = forms.FileField(
-        label='Arquivo CSV',
-        widget=forms.FileInput(attrs={
-            'class': 'form-control',
-            'accept': '.csv'
-        }),
-        help_text='Formato obrigatório: username,email,first_name,last_name,user_type,cpf,telefone,password'
-    )
-    
-    def clean_csv_file(self):
-        csv_file = self.cleaned_data['csv_file']
-        
-        if not csv_file.name.endswith('.csv'):
-            raise forms.ValidationError('O arquivo deve ter extensão .csv')
-        
-        # Verificar se o arquivo não está vazio
-        if csv_file.size == 0:
-            raise forms.ValidationError('O arquivo CSV está vazio')
-        
-        # Verificar se o arquivo não é muito grande (5MB)
-        if csv_file.size > 5 * 1024 * 1024:
-            raise forms.ValidationError('O arquivo é muito grande. Máximo 5MB.')
-        
-        return csv_file
-    
-    def process_csv(self):
-        """Processa o arquivo CSV e retorna lista de usuários para criar"""
-        csv_file = self.cleaned_data['csv_file']
-        
-        # Ler o arquivo CSV
-        file_data = csv_file.read().decode('utf-8')
-        csv_data = csv.DictReader(io.StringIO(file_data))
-        
-        users_to_create = []
-        errors = []
-        
-        required_fields = ['username', 'email', 'password']
-        
-        for row_num, row in enumerate(csv_data, start=2):  # Start=2 porque linha 1 é header
-            # Verificar campos obrigatórios
-            missing_fields = [field for field in required_fields if not row.get(field, '').strip()]
-            if missing_fields:
-                errors.append(f'Linha {row_num}: Campos obrigatórios faltando: {", ".join(missing_fields)}')
-                continue
-            
-            # Verificar se username já existe
-            if CustomUser.objects.filter(username=row['username'].strip()).exists():
-                errors.append(f'Linha {row_num}: Nome de usuário "{row["username"].strip()}" já existe')
-                continue
-            
-            # Verificar se email já existe
-            if CustomUser.objects.filter(email=row['email'].strip()).exists():
-                errors.append(f'Linha {row_num}: E-mail "{row["email"].strip()}" já existe')
-                continue
-            
-            # Preparar dados do usuário
-            user_data = {
-                'username': row['username'].strip(),
-                'email': row['email'].strip(),
-                'first_name': row.get('first_name', '').strip(),
-                'last_name': row.get('last_name', '').strip(),
-                'user_type': row.get('user_type', 'monitor').strip(),
-                'cpf': row.get('cpf', '').strip(),
-                'telefone': row.get('telefone', '').strip(),
-                'password': row['password'].strip(),
-            }
-            
-            # Validar user_type
-            valid_types = ['admin', 'gestor', 'monitor']
-            if user_data['user_type'] not in valid_types:
-                user_data['user_type'] = 'monitor'
-            
-            users_to_create.append(user_data)
-        
-        return users_to_create, errors
-
-
-
-
-
 class CSVUploadForm(forms.Form):
     """Formulário para upload de CSV com usuários"""
     
@@ -361,60 +278,8 @@ class CSVUploadForm(forms.Form):
         if csv_file.size == 0:
             raise forms.ValidationError('O arquivo CSV está vazio')
         
-        # Verificar se o arquivo não é muito grande (5MB)
-        if csv_file.size > 5 * 1024 * 1024:
-            raise forms.ValidationError('O arquivo é muito grande. Máximo 5MB.')
+        # O arquivo é lido em fluxo pelo worker; o limite só evita uploads absurdos
+        if csv_file.size > TAMANHO_MAXIMO_CSV:
+            raise forms.ValidationError(f'O arquivo é muito grande. Máximo {TAMANHO_MAXIMO_CSV // (1024 * 1024)}MB.')
         
         return csv_file
-    
-    def process_csv(self):
-        """Processa o arquivo CSV e retorna lista de usuários para criar"""
-        csv_file = self.cleaned_data['csv_file']
-        
-        # Ler o arquivo CSV
-        file_data = csv_file.read().decode('utf-8')
-        csv_data = csv.DictReader(io.StringIO(file_data))
-        
-        users_to_create = []
-        errors = []
-        
-        required_fields = ['username', 'email', 'password']
-        
-        for row_num, row in enumerate(csv_data, start=2):  # Start=2 porque linha 1 é header
-            # Verificar campos obrigatórios
-            missing_fields = [field for field in required_fields if not row.get(field, '').strip()]
-            if missing_fields:
-                errors.append(f'Linha {row_num}: Campos obrigatórios faltando: {", ".join(missing_fields)}')
-                continue
-            
-            # Verificar se username já existe
-            if CustomUser.objects.filter(username=row['username'].strip()).exists():
-                errors.append(f'Linha {row_num}: Nome de usuário "{row["username"].strip()}" já existe')
-                continue
-            
-            # Verificar se email já existe
-            if CustomUser.objects.filter(email=row['email'].strip()).exists():
-                errors.append(f'Linha {row_num}: E-mail "{row["email"].strip()}" já existe')
-                continue
-            
-            # Preparar dados do usuário
-            user_data = {
-                'username': row['username'].strip(),
-                'email': row['email'].strip(),
-                'first_name': row.get('first_name', '').strip(),
-                'last_name': row.get('last_name', '').strip(),
-                'user_type': row.get('user_type', 'monitor').strip(),
-                'cpf': row.get('cpf', '').strip(),
-                'telefone': row.get('telefone', '').strip(),
-                'password': row['password'].strip(),
-            }
-            
-            # Validar user_type
-            valid_types = ['admin', 'gestor', 'monitor']
-            if user_data['user_type'] not in valid_types:
-                user_data['user_type'] = 'monitor'
-            
-            users_to_create.append(user_data)
-        
-        return users_to_create, errors
-
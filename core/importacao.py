@@ -0,0 +1,337 @@
+"""Importação de usuários via CSV com validação em conjunto e inserção em lote.
+
+A validação reúne usernames, e-mails e CPFs de um lote de linhas e consulta
+cada coluna uma única vez com ``IN``; repetições dentro do lote são
+detectadas em memória. A criação usa ``bulk_create`` em uma transação,
+então ``CustomUser.save`` não roda: os campos que ele calcularia são
+preenchidos aqui.
+
+O upload vira uma ``ImportacaoUsuarios`` processada pelo comando
+``processar_importacoes``. O conteúdo fica no banco em partes
+(``ParteImportacao``), porque o worker pode rodar em outro contêiner, sem
+acesso ao disco do processo web. O arquivo é lido em fluxo (com detecção de
+codificação), em lotes de ``tamanho_lote`` linhas, e cada lote grava os
+usuários e o progresso na mesma transação. Falhas inesperadas são
+retentadas com espera crescente, retomando do último lote gravado.
+"""
+import codecs
+import csv
+import io
+import re
+from datetime import timedelta
+from itertools import islice
+
+from django.db import transaction
+from django.utils import timezone
+
+from .busca import indexar_usuarios, texto_busca
+from .dashboard import invalidar_resumo_gestor
+from .models import CustomUser, ImportacaoUsuarios, ParteImportacao
+from .senhas import gerar_hashes
+
+CAMPOS_OBRIGATORIOS = ('username', 'email', 'password')
+TIPOS_VALIDOS = ('admin', 'gestor', 'monitor')
+# Colunas únicas verificadas contra o banco, com o rótulo usado nas mensagens
+COLUNAS_UNICAS = (
+    ('username', 'Nome de usuário'),
+    ('email', 'E-mail'),
+    ('cpf', 'CPF'),
+)
+TAMANHO_LOTE = 500
+# Erros guardados na importação (o total continua sendo contado)
+LIMITE_ERROS_GUARDADOS = 1000
+TAMANHO_AMOSTRA = 64 * 1024
+TAMANHO_PARTE = 512 * 1024
+RESERVA_IMPORTACAO = timedelta(minutes=10)
+MAX_TENTATIVAS = 3
+ESPERA_TENTATIVA = timedelta(minutes=1)
+# Tratador de erros de decodificação registrado abaixo
+ERROS_DECODIFICACAO = 'importacao_cp1252'
+
+
+def _dados_da_linha(linha):
+    tipo = (linha.get('user_type') or 'monitor').strip()
+    return {
+        'username': (linha.get('username') or '').strip(),
+        'email': (linha.get('email') or '').strip(),
+        'first_name': (linha.get('first_name') or '').strip(),
+        'last_name': (linha.get('last_name') or '').strip(),
+        'user_type': tipo if tipo in TIPOS_VALIDOS else 'monitor',
+        # O modelo guarda só os dígitos; vazio vira NULL para não colidir no índice único
+        'cpf': re.sub(r'\D', '', linha.get('cpf') or '') or None,
+        'telefone': (linha.get('telefone') or '').strip(),
+        'password': (linha.get('password') or '').strip(),
+    }
+
+
+def _existentes(coluna, valores):
+    if not valores:
+        return set()
+    return set(CustomUser.objects.filter(**{f'{coluna}__in': valores}).values_list(coluna, flat=True))
+
+
+def validar_linhas(linhas, inicio=2):
+    """Valida as linhas do CSV (dicts do ``DictReader``).
+
+    Retorna ``(validos, erros)``: ``validos`` é uma lista de ``(numero_linha,
+    dados)`` e ``erros`` uma lista de ``{'linha', 'mensagem'}``. A numeração
+    começa em 2 porque a linha 1 é o cabeçalho.
+    """
+    candidatos = []
+    erros = []
+    vistos = {coluna: {} for coluna, _ in COLUNAS_UNICAS}
+
+    for numero, linha in enumerate(linhas, start=inicio):
+        dados = _dados_da_linha(linha)
+        faltando = [campo for campo in CAMPOS_OBRIGATORIOS if not dados[campo]]
+        if faltando:
+            erros.append({'linha': numero, 'mensagem': f'Campos obrigatórios faltando: {", ".join(faltando)}'})
+            continue
+        if dados['cpf'] and len(dados['cpf']) != 11:
+            erros.append({'linha': numero, 'mensagem': f'CPF "{dados["cpf"]}" deve ter 11 dígitos'})
+            continue
+
+        repetido = None
+        for coluna, rotulo in COLUNAS_UNICAS:
+            valor = dados[coluna]
+            if valor and valor in vistos[coluna]:
+                repetido = f'{rotulo} "{valor}" repetido no arquivo (linha {vistos[coluna][valor]})'
+                break
+        if repetido:
+            erros.append({'linha': numero, 'mensagem': repetido})
+            continue
+        for coluna, _ in COLUNAS_UNICAS:
+            if dados[coluna]:
+                vistos[coluna][dados[coluna]] = numero
+        candidatos.append((numero, dados))
+
+    # Uma consulta IN por coluna única para todo o arquivo
+    existentes = {coluna: _existentes(coluna, list(vistos[coluna])) for coluna, _ in COLUNAS_UNICAS}
+
+    validos = []
+    for numero, dados in candidatos:
+        conflito = next(
+            (f'{rotulo} "{dados[coluna]}" já existe' for coluna, rotulo in COLUNAS_UNICAS if dados[coluna] in existentes[coluna]),
+            None,
+        )
+        if conflito:
+            erros.append({'linha': numero, 'mensagem': conflito})
+        else:
+            validos.append((numero, dados))
+
+    erros.sort(key=lambda erro: erro['linha'])
+    return validos, erros
+
+
+def _novo_usuario(dados, senha_hash):
+    usuario = CustomUser(**{campo: valor for campo, valor in dados.items() if campo != 'password'})
+    usuario.password = senha_hash
+    # Mesmas regras de CustomUser.save para um cadastro novo sem ``_created_by_manager``
+    if usuario.user_type == 'monitor':
+        usuario.cadastro_completo = False
+        usuario.is_approved = False
+    else:
+        usuario.cadastro_completo = True
+        usuario.is_approved = True
+    usuario.busca_normalizada = texto_busca(usuario)
+    return usuario
+
+
+def preparar_usuarios(validos):
+    """Instancia os usuários validados; os hashes (a parte cara) são calculados em paralelo."""
+    hashes = gerar_hashes([dados['password'] for _, dados in validos])
+    return [_novo_usuario(dados, senha_hash) for (_, dados), senha_hash in zip(validos, hashes)]
+
+
+def inserir_usuarios(usuarios):
+    with transaction.atomic():
+        criados = CustomUser.objects.bulk_create(usuarios, batch_size=TAMANHO_LOTE)
+        # bulk_create não dispara sinais: sincroniza a busca e o painel aqui
+        indexar_usuarios([usuario.pk for usuario in criados])
+        invalidar_resumo_gestor()
+    return criados
+
+
+def criar_usuarios(validos):
+    """Cria os usuários validados com ``bulk_create`` em uma única transação."""
+    return inserir_usuarios(preparar_usuarios(validos))
+
+
+def _bytes_como_cp1252(erro):
+    # A amostra só cobre o começo do arquivo: um byte Latin-1 mais adiante em
+    # um arquivo detectado como UTF-8 é lido como Windows-1252 (ou Latin-1,
+    # que aceita qualquer byte) em vez de interromper a importação
+    trecho = erro.object[erro.start:erro.end]
+    try:
+        return trecho.decode('cp1252'), erro.end
+    except UnicodeDecodeError:
+        return trecho.decode('latin-1'), erro.end
+
+
+codecs.register_error(ERROS_DECODIFICACAO, _bytes_como_cp1252)
+
+
+def detectar_codificacao(amostra):
+    """UTF-8 (com ou sem BOM) quando a amostra for válida; senão Windows-1252/Latin-1 (Excel)."""
+    if amostra.startswith(codecs.BOM_UTF8):
+        return 'utf-8-sig'
+    try:
+        # final=False tolera um caractere multibyte cortado no fim da amostra
+        codecs.getincrementaldecoder('utf-8')().decode(amostra, final=False)
+        return 'utf-8'
+    except UnicodeDecodeError:
+        pass
+    try:
+        amostra.decode('cp1252')
+        return 'cp1252'
+    except UnicodeDecodeError:
+        return 'latin-1'
+
+
+def iniciar_importacao(arquivo, usuario, tamanho_lote=200):
+    """Registra o upload, com o conteúdo em partes no banco, como uma importação pendente."""
+    with transaction.atomic():
+        importacao = ImportacaoUsuarios.objects.create(
+            criado_por=usuario,
+            nome_arquivo=arquivo.name,
+            tamanho_bytes=arquivo.size,
+            tamanho_lote=tamanho_lote,
+        )
+        # read() em vez de chunks(): upload em memória devolve tudo em um pedaço só
+        arquivo.seek(0)
+        ParteImportacao.objects.bulk_create(
+            ParteImportacao(importacao=importacao, ordem=ordem, dados=dados)
+            for ordem, dados in enumerate(iter(lambda: arquivo.read(TAMANHO_PARTE), b''))
+        )
+    return importacao
+
+
+class ConteudoImportacao(io.RawIOBase):
+    """Leitura em fluxo das partes de uma importação, uma consulta por parte."""
+
+    def __init__(self, importacao):
+        self._ids = list(importacao.partes.order_by('ordem').values_list('id', flat=True))
+        self._proxima = 0
+        self._atual = memoryview(b'')
+        self._posicao = 0
+
+    def readable(self):
+        return True
+
+    def readinto(self, destino):
+        while not self._atual:
+            if self._proxima >= len(self._ids):
+                return 0
+            dados = ParteImportacao.objects.values_list('dados', flat=True).get(pk=self._ids[self._proxima])
+            self._atual = memoryview(bytes(dados))
+            self._proxima += 1
+        tamanho = min(len(destino), len(self._atual))
+        destino[:tamanho] = self._atual[:tamanho]
+        self._atual = self._atual[tamanho:]
+        self._posicao += tamanho
+        return tamanho
+
+    def tell(self):
+        return self._posicao
+
+
+def reservar_importacao():
+    """Reserva a próxima importação pendente ou abandonada (reserva expirada)."""
+    agora = timezone.now()
+    with transaction.atomic():
+        importacao = (
+            ImportacaoUsuarios.objects.select_for_update(skip_locked=True)
+            .filter(status__in=['pendente', 'processando'])
+            .exclude(reservado_ate__gt=agora)
+            .order_by('criado_em')
+            .first()
+        )
+        if importacao:
+            importacao.status = 'processando'
+            importacao.reservado_ate = agora + RESERVA_IMPORTACAO
+            importacao.save(update_fields=['status', 'reservado_ate', 'atualizado_em'])
+    return importacao
+
+
+def _lotes(leitor, tamanho):
+    while True:
+        lote = list(islice(leitor, tamanho))
+        if not lote:
+            return
+        yield lote
+
+
+def _processar_lotes(importacao):
+    if not importacao.codificacao:
+        importacao.codificacao = detectar_codificacao(ConteudoImportacao(importacao).read(TAMANHO_AMOSTRA))
+    arquivo = ConteudoImportacao(importacao)
+    # TextIOWrapper decodifica o arquivo em fluxo, sem carregá-lo inteiro na memória
+    texto = io.TextIOWrapper(
+        io.BufferedReader(arquivo), encoding=importacao.codificacao, errors=ERROS_DECODIFICACAO, newline=''
+    )
+    leitor = csv.DictReader(texto)
+    # Linhas já gravadas em uma execução anterior
+    for _ in islice(leitor, importacao.linhas_processadas):
+        pass
+
+    for lote in _lotes(leitor, importacao.tamanho_lote):
+        validos, erros = validar_linhas(lote, inicio=importacao.linhas_processadas + 2)
+        usuarios = preparar_usuarios(validos)
+        with transaction.atomic():
+            criados = inserir_usuarios(usuarios)
+            importacao.linhas_processadas += len(lote)
+            importacao.bytes_processados = arquivo.tell()
+            importacao.usuarios_criados += len(criados)
+            importacao.total_erros += len(erros)
+            espaco = max(LIMITE_ERROS_GUARDADOS - len(importacao.erros), 0)
+            importacao.erros = importacao.erros + erros[:espaco]
+            importacao.reservado_ate = timezone.now() + RESERVA_IMPORTACAO
+            importacao.save()
+
+
+def processar_importacao(importacao):
+    """Processa a importação até o fim, retomando de ``linhas_processadas``.
+
+    Um CSV malformado falha de vez. Outros erros (banco, worker reiniciado)
+    deixam a importação pendente com espera crescente, até ``MAX_TENTATIVAS``.
+    """
+    try:
+        _processar_lotes(importacao)
+    except Exception as e:
+        # Os contadores em memória podem ter avançado em um lote desfeito:
+        # volta ao que foi gravado para a retomada não pular linhas
+        importacao.refresh_from_db()
+        if isinstance(e, csv.Error):
+            importacao.status = 'falhou'
+            importacao.ultimo_erro = f'CSV inválido: {e}'
+            importacao.reservado_ate = None
+        else:
+            importacao.tentativas += 1
+            importacao.ultimo_erro = str(e)
+            if importacao.tentativas >= MAX_TENTATIVAS:
+                importacao.status = 'falhou'
+                importacao.reservado_ate = None
+            else:
+                importacao.status = 'pendente'
+                # A reserva vira a espera: reservar_importacao ignora a importação até lá
+                importacao.reservado_ate = timezone.now() + ESPERA_TENTATIVA * (2 ** (importacao.tentativas - 1))
+    else:
+        importacao.status = 'concluida'
+        importacao.concluido_em = timezone.now()
+        importacao.reservado_ate = None
+    importacao.save()
+    if importacao.status in ('concluida', 'falhou'):
+        # O arquivo contém senhas em texto puro: não fica guardado após o término
+        importacao.partes.all().delete()
+    return importacao
+
+
+def processar_importacoes_pendentes():
+    """Processa importações até a fila esvaziar; retorna quantas foram tratadas."""
+    total = 0
+    while True:
+        importacao = reservar_importacao()
+        if importacao is None:
+            return total
+        processar_importacao(importacao)
+        total += 1
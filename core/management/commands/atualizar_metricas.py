@@ -0,0 +1,23 @@
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core.metricas import atualizar_metricas
+
+
+class Command(BaseCommand):
+    help = 'Preenche os snapshots diários de métricas do BI desde a última execução.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--ate', help='Último dia a calcular (AAAA-MM-DD). Padrão: ontem.')
+
+    def handle(self, *args, **options):
+        ate = None
+        if options['ate']:
+            try:
+                ate = date.fromisoformat(options['ate'])
+            except ValueError:
+                raise CommandError('Data inválida para --ate. Use AAAA-MM-DD.')
+
+        criados = atualizar_metricas(ate=ate)
+        self.stdout.write(f'{criados} dia(s) de métricas gerado(s).')
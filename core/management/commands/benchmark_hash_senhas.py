@@ -0,0 +1,44 @@
+import csv
+import io
+import time
+
+from django.contrib.auth.hashers import get_hasher, make_password
+from django.core.management.base import BaseCommand
+
+from core.senhas import gerar_hashes, numero_de_processos
+
+
+class Command(BaseCommand):
+    help = 'Compara o hash sequencial e o paralelo das senhas de um CSV de importação gerado.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--linhas', type=int, default=1000, help='Linhas do CSV gerado (padrão: 1000).')
+        parser.add_argument('--processos', type=int, help='Processos do pool (padrão: núcleos disponíveis).')
+
+    def handle(self, *args, **options):
+        arquivo = io.StringIO()
+        escritor = csv.writer(arquivo)
+        escritor.writerow(['username', 'email', 'password'])
+        for i in range(options['linhas']):
+            escritor.writerow([f'bench{i}', f'bench{i}@exemplo.com', f'senha-{i}'])
+        arquivo.seek(0)
+        senhas = [linha['password'] for linha in csv.DictReader(arquivo)]
+
+        inicio = time.perf_counter()
+        for senha in senhas:
+            make_password(senha)
+        sequencial = time.perf_counter() - inicio
+
+        processos = options['processos'] or numero_de_processos()
+        inicio = time.perf_counter()
+        hashes = gerar_hashes(senhas, processos=processos)
+        paralelo = time.perf_counter() - inicio
+
+        hasher = get_hasher()
+        amostra = hashes[0]
+        identico = make_password(senhas[0], hasher.decode(amostra)['salt']) == amostra
+
+        self.stdout.write(f'Hasher: {hasher.algorithm} | linhas: {len(senhas)} | processos: {processos}')
+        self.stdout.write(f'Sequencial: {sequencial:.2f}s')
+        self.stdout.write(f'Paralelo:   {paralelo:.2f}s ({sequencial / paralelo:.1f}x)')
+        self.stdout.write(f'Resultado idêntico a make_password: {"sim" if identico else "NÃO"}')
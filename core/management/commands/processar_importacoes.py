@@ -0,0 +1,22 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from core.importacao import processar_importacoes_pendentes
+
+
+class Command(BaseCommand):
+    help = 'Processa as importações de usuários (CSV) pendentes ou interrompidas.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--continuo', action='store_true', help='Permanece rodando e verifica a fila periodicamente.')
+        parser.add_argument('--intervalo', type=int, default=5, help='Segundos de espera com a fila vazia (modo contínuo).')
+
+    def handle(self, *args, **options):
+        while True:
+            processadas = processar_importacoes_pendentes()
+            if processadas:
+                self.stdout.write(f'{processadas} importação(ões) processada(s).')
+            if not options['continuo']:
+                break
+            time.sleep(options['intervalo'])
@@ -0,0 +1,105 @@
+"""Preenchimento incremental da tabela MetricaDiaria."""
+from datetime import timedelta
+
+from django.db import transaction
+from django.db.models import Count, Min, Q
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from temporadas.models import InteresseTemporada, Temporada, TemporadaEquipe
+from temporadas.pagamentos import totais_pagamento
+from .models import CustomUser, MetricaDiaria
+
+
+def _primeiro_dia_com_dados():
+    datas = [
+        CustomUser.objects.filter(user_type='monitor').aggregate(d=Min('date_joined'))['d'],
+        InteresseTemporada.objects.aggregate(d=Min('data_interesse'))['d'],
+    ]
+    dias = [timezone.localtime(d).date() for d in datas if d]
+    primeira_temporada = Temporada.objects.aggregate(d=Min('data_inicio'))['d']
+    if primeira_temporada:
+        dias.append(primeira_temporada)
+    return min(dias) if dias else None
+
+
+def _contagem_por_dia(queryset, campo, inicio, fim):
+    return {
+        linha['dia']: linha['n']
+        for linha in queryset.filter(**{f'{campo}__date__gte': inicio, f'{campo}__date__lte': fim})
+        .annotate(dia=TruncDate(campo))
+        .values('dia')
+        .annotate(n=Count('id'))
+        .order_by()
+    }
+
+
+def _equipe_por_dia(inicio, fim):
+    """Diárias confirmadas e folha por data de início da temporada."""
+    grupos = totais_pagamento(
+        TemporadaEquipe.objects.filter(
+            status__in=['confirmado', 'concluido'],
+            temporada__data_inicio__gte=inicio,
+            temporada__data_inicio__lte=fim,
+        ),
+        'temporada__data_inicio',
+    )
+    diarias = {grupo['temporada__data_inicio']: grupo['numero_diarias'] for grupo in grupos}
+    folha = {grupo['temporada__data_inicio']: grupo['total'] for grupo in grupos}
+    return diarias, folha
+
+
+def _estado_atual():
+    aprovados = CustomUser.objects.filter(user_type='monitor', is_approved=True).count()
+    interesses = InteresseTemporada.objects.aggregate(
+        interessado=Count('id', filter=Q(status='interessado')),
+        aprovado=Count('id', filter=Q(status='aprovado')),
+        recusado=Count('id', filter=Q(status='recusado')),
+        confirmado=Count('id', filter=Q(status='confirmado')),
+    )
+    return {
+        'monitores_aprovados': aprovados,
+        'interesses_interessado': interesses['interessado'],
+        'interesses_aprovado': interesses['aprovado'],
+        'interesses_recusado': interesses['recusado'],
+        'interesses_confirmado': interesses['confirmado'],
+    }
+
+
+def atualizar_metricas(ate=None):
+    """Cria os snapshots que faltam até ``ate`` (padrão: ontem) e retorna quantos foram criados.
+
+    Só os dias posteriores ao último snapshot são calculados; as consultas
+    agrupam o intervalo inteiro de uma vez, então recuperar anos de histórico
+    custa o mesmo número de consultas que um único dia.
+    """
+    fim = ate or (timezone.localdate() - timedelta(days=1))
+    ultimo = MetricaDiaria.objects.order_by('-data').values_list('data', flat=True).first()
+    inicio = ultimo + timedelta(days=1) if ultimo else _primeiro_dia_com_dados()
+    if inicio is None or inicio > fim:
+        return 0
+
+    monitores = _contagem_por_dia(CustomUser.objects.filter(user_type='monitor'), 'date_joined', inicio, fim)
+    interesses = _contagem_por_dia(InteresseTemporada.objects.all(), 'data_interesse', inicio, fim)
+    diarias, folha = _equipe_por_dia(inicio, fim)
+    estado = _estado_atual()
+
+    linhas = []
+    dia = inicio
+    while dia <= fim:
+        linha = MetricaDiaria(
+            data=dia,
+            novos_monitores=monitores.get(dia, 0),
+            novos_interesses=interesses.get(dia, 0),
+            diarias_confirmadas=diarias.get(dia, 0),
+            folha_total=folha.get(dia, 0),
+        )
+        if dia == fim:
+            for campo, valor in estado.items():
+                setattr(linha, campo, valor)
+        linhas.append(linha)
+        dia += timedelta(days=1)
+
+    with transaction.atomic():
+        MetricaDiaria.objects.bulk_create(linhas, batch_size=500, ignore_conflicts=True)
+    return len(linhas)
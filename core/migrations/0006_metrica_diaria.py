@@ -0,0 +1,35 @@
+# Generated by Django 5.1.7 on 2026-10-18 13:26
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0005_categoria_ajuda_fk'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MetricaDiaria',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('data', models.DateField(unique=True)),
+                ('novos_monitores', models.PositiveIntegerField(default=0)),
+                ('novos_interesses', models.PositiveIntegerField(default=0)),
+                ('diarias_confirmadas', models.DecimalField(decimal_places=1, default=0, max_digits=10)),
+                ('folha_total', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('monitores_aprovados', models.PositiveIntegerField(blank=True, null=True)),
+                ('interesses_interessado', models.PositiveIntegerField(blank=True, null=True)),
+                ('interesses_aprovado', models.PositiveIntegerField(blank=True, null=True)),
+                ('interesses_recusado', models.PositiveIntegerField(blank=True, null=True)),
+                ('interesses_confirmado', models.PositiveIntegerField(blank=True, null=True)),
+                ('criado_em', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'verbose_name': 'Métrica Diária',
+                'verbose_name_plural': 'Métricas Diárias',
+                'ordering': ['data'],
+            },
+        ),
+    ]
@@ -0,0 +1,67 @@
+# Generated by Django 5.1.7 on 2026-10-18 13:32
+
+import unicodedata
+
+from django.db import migrations, models
+
+# Cópias do estado de core.busca quando esta migração foi escrita: migrações
+# não importam o código do app, que pode mudar depois
+TABELA_FTS = 'core_customuser_busca'
+CAMPOS_BUSCA = ('username', 'email', 'first_name', 'last_name', 'nome_completo')
+TAMANHO_LOTE = 500
+
+
+def normalizar(texto):
+    decomposto = unicodedata.normalize('NFKD', texto or '')
+    return ''.join(c for c in decomposto if not unicodedata.combining(c)).lower()
+
+
+def preencher_busca(apps, schema_editor):
+    CustomUser = apps.get_model('core', 'CustomUser')
+    lote = []
+    for usuario in CustomUser.objects.only('id', *CAMPOS_BUSCA).order_by('id').iterator(chunk_size=TAMANHO_LOTE):
+        usuario.busca_normalizada = normalizar(' '.join(getattr(usuario, campo) or '' for campo in CAMPOS_BUSCA))
+        lote.append(usuario)
+        if len(lote) >= TAMANHO_LOTE:
+            CustomUser.objects.bulk_update(lote, ['busca_normalizada'])
+            lote = []
+    if lote:
+        CustomUser.objects.bulk_update(lote, ['busca_normalizada'])
+
+
+def criar_indice(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'postgresql':
+        schema_editor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+        schema_editor.execute(
+            'CREATE INDEX IF NOT EXISTS core_customuser_busca_trgm '
+            'ON core_customuser USING gin (busca_normalizada gin_trgm_ops)'
+        )
+    elif vendor == 'sqlite':
+        schema_editor.execute(f"CREATE VIRTUAL TABLE IF NOT EXISTS {TABELA_FTS} USING fts5(texto, tokenize='unicode61')")
+        schema_editor.execute(f'INSERT INTO {TABELA_FTS} (rowid, texto) SELECT id, busca_normalizada FROM core_customuser')
+
+
+def remover_indice(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'postgresql':
+        schema_editor.execute('DROP INDEX IF EXISTS core_customuser_busca_trgm')
+    elif vendor == 'sqlite':
+        schema_editor.execute(f'DROP TABLE IF EXISTS {TABELA_FTS}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0006_metrica_diaria'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='customuser',
+            name='busca_normalizada',
+            field=models.TextField(blank=True, default='', editable=False),
+        ),
+        migrations.RunPython(preencher_busca, migrations.RunPython.noop),
+        migrations.RunPython(criar_indice, remover_indice),
+    ]
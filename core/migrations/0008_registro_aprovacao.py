@@ -0,0 +1,32 @@
+# Generated by Django 5.1.7 on 2026-10-18 13:35
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0007_busca_usuarios'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RegistroAprovacao',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('acao', models.CharField(choices=[('approve', 'Aprovado'), ('disapprove', 'Aprovação removida'), ('reject', 'Rejeitado')], max_length=10)),
+                ('aprovado_antes', models.BooleanField()),
+                ('ativo_antes', models.BooleanField()),
+                ('criado_em', models.DateTimeField(auto_now_add=True, db_index=True)),
+                ('gestor', models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='aprovacoes_realizadas', to=settings.AUTH_USER_MODEL)),
+                ('monitor', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='registros_aprovacao', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Registro de Aprovação',
+                'verbose_name_plural': 'Registros de Aprovação',
+                'ordering': ['-criado_em'],
+            },
+        ),
+    ]
@@ -0,0 +1,44 @@
+# Generated by Django 5.1.7 on 2026-10-18 13:44
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0008_registro_aprovacao'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ImportacaoUsuarios',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('arquivo', models.FileField(blank=True, upload_to='importacoes/')),
+                ('nome_arquivo', models.CharField(max_length=255)),
+                ('tamanho_bytes', models.PositiveBigIntegerField(default=0)),
+                ('codificacao', models.CharField(blank=True, max_length=20)),
+                ('tamanho_lote', models.PositiveIntegerField(default=200)),
+                ('status', models.CharField(choices=[('pendente', 'Pendente'), ('processando', 'Processando'), ('concluida', 'Concluída'), ('falhou', 'Falhou')], default='pendente', max_length=12)),
+                ('linhas_processadas', models.PositiveIntegerField(default=0)),
+                ('bytes_processados', models.PositiveBigIntegerField(default=0)),
+                ('usuarios_criados', models.PositiveIntegerField(default=0)),
+                ('total_erros', models.PositiveIntegerField(default=0)),
+                ('erros', models.JSONField(blank=True, default=list)),
+                ('ultimo_erro', models.TextField(blank=True)),
+                ('reservado_ate', models.DateTimeField(blank=True, null=True)),
+                ('criado_em', models.DateTimeField(auto_now_add=True)),
+                ('atualizado_em', models.DateTimeField(auto_now=True)),
+                ('concluido_em', models.DateTimeField(blank=True, null=True)),
+                ('criado_por', models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='importacoes', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Importação de Usuários',
+                'verbose_name_plural': 'Importações de Usuários',
+                'ordering': ['-criado_em'],
+                'indexes': [models.Index(fields=['status', 'reservado_ate'], name='importacao_fila_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,59 @@
+# Generated by Django 5.1.7 on 2026-10-18 14:23
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+TAMANHO_PARTE = 512 * 1024
+
+
+def copiar_arquivos_pendentes(apps, schema_editor):
+    """Leva para o banco os arquivos das importações ainda não terminadas."""
+    ImportacaoUsuarios = apps.get_model('core', 'ImportacaoUsuarios')
+    ParteImportacao = apps.get_model('core', 'ParteImportacao')
+    for importacao in ImportacaoUsuarios.objects.filter(status__in=['pendente', 'processando']).exclude(arquivo=''):
+        try:
+            with importacao.arquivo.open('rb') as arquivo:
+                partes = [
+                    ParteImportacao(importacao=importacao, ordem=ordem, dados=dados)
+                    for ordem, dados in enumerate(iter(lambda: arquivo.read(TAMANHO_PARTE), b''))
+                ]
+        except OSError as e:
+            importacao.status = 'falhou'
+            importacao.ultimo_erro = f'Arquivo indisponível na migração: {e}'
+            importacao.save(update_fields=['status', 'ultimo_erro'])
+            continue
+        ParteImportacao.objects.bulk_create(partes)
+        importacao.arquivo.delete(save=False)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0009_importacao_usuarios'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='importacaousuarios',
+            name='tentativas',
+            field=models.PositiveSmallIntegerField(default=0),
+        ),
+        migrations.CreateModel(
+            name='ParteImportacao',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('ordem', models.PositiveIntegerField()),
+                ('dados', models.BinaryField()),
+                ('importacao', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='partes', to='core.importacaousuarios')),
+            ],
+            options={
+                'ordering': ['importacao', 'ordem'],
+                'constraints': [models.UniqueConstraint(fields=('importacao', 'ordem'), name='parte_importacao_ordem_unica')],
+            },
+        ),
+        migrations.RunPython(copiar_arquivos_pendentes, migrations.RunPython.noop),
+        migrations.RemoveField(
+            model_name='importacaousuarios',
+            name='arquivo',
+        ),
+    ]
@@ -1,6 +1,8 @@
 from django.contrib.auth.models import AbstractUser
 from django.db import models
 
+from .busca import CAMPOS_BUSCA, texto_busca
+
 USER_TYPES = (
     ('admin', 'Admin'),
     ('gestor', 'Gestor'),
@@ -59,6 +61,8 @@ class CustomUser(AbstractUser):
     data_emissao_rg = models.DateField(blank=True, null=True, verbose_name='Data de Emissão do RG')
     pis = models.CharField(max_length=20, unique=True, blank=True, null=True, verbose_name='PIS')
     nome_completo = models.CharField(max_length=100, blank=True, null=True, verbose_name='Nome Completo')
+    # Texto normalizado para a busca de usuários (ver core/busca.py)
+    busca_normalizada = models.TextField(blank=True, default='', editable=False)
     nome_mae = models.CharField(max_length=100, blank=True, null=True, verbose_name='Nome da Mãe')
     estado_civil = models.CharField(max_length=20, choices=ESTADO_CIVIL_CHOICES, blank=True, null=True, verbose_name='Estado Civil')
     celular = models.CharField(max_length=15, blank=True, null=True, verbose_name='Celular')
@@ -210,5 +214,138 @@ class CustomUser(AbstractUser):
             # Para outros tipos de usuário, considerar sempre completo e aprovado
             self.cadastro_completo = True
             self.is_approved = True
-        
+
+        self.busca_normalizada = texto_busca(self)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and set(update_fields) & set(CAMPOS_BUSCA):
+            kwargs['update_fields'] = set(update_fields) | {'busca_normalizada'}
+
         super().save(*args, **kwargs)
+
+
+class MetricaDiaria(models.Model):
+    """Snapshot diário das métricas do BI, preenchido pelo comando ``atualizar_metricas``.
+
+    Os campos de fluxo (novos_*, diárias e folha) são calculados pelas datas
+    dos registros e podem ser preenchidos para dias passados. Os campos de
+    estado (aprovados e interesses por status) refletem o momento da execução
+    e ficam vazios em dias recuperados retroativamente.
+    """
+    data = models.DateField(unique=True)
+
+    novos_monitores = models.PositiveIntegerField(default=0)
+    novos_interesses = models.PositiveIntegerField(default=0)
+    diarias_confirmadas = models.DecimalField(max_digits=10, decimal_places=1, default=0)
+    folha_total = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+
+    monitores_aprovados = models.PositiveIntegerField(blank=True, null=True)
+    interesses_interessado = models.PositiveIntegerField(blank=True, null=True)
+    interesses_aprovado = models.PositiveIntegerField(blank=True, null=True)
+    interesses_recusado = models.PositiveIntegerField(blank=True, null=True)
+    interesses_confirmado = models.PositiveIntegerField(blank=True, null=True)
+
+    criado_em = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['data']
+        verbose_name = 'Métrica Diária'
+        verbose_name_plural = 'Métricas Diárias'
+
+    def __str__(self):
+        return f"Métricas de {self.data:%d/%m/%Y}"
+
+
+ACOES_APROVACAO = (
+    ('approve', 'Aprovado'),
+    ('disapprove', 'Aprovação removida'),
+    ('reject', 'Rejeitado'),
+)
+
+
+class RegistroAprovacao(models.Model):
+    """Trilha de auditoria das ações de aprovação de monitores."""
+    monitor = models.ForeignKey(CustomUser, on_delete=models.CASCADE, related_name='registros_aprovacao')
+    gestor = models.ForeignKey(CustomUser, on_delete=models.SET_NULL, null=True, related_name='aprovacoes_realizadas')
+    acao = models.CharField(max_length=10, choices=ACOES_APROVACAO)
+    aprovado_antes = models.BooleanField()
+    ativo_antes = models.BooleanField()
+    criado_em = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    class Meta:
+        ordering = ['-criado_em']
+        verbose_name = 'Registro de Aprovação'
+        verbose_name_plural = 'Registros de Aprovação'
+
+    def __str__(self):
+        return f"{self.monitor.username}: {self.get_acao_display()} em {self.criado_em:%d/%m/%Y %H:%M}"
+
+
+STATUS_IMPORTACAO = (
+    ('pendente', 'Pendente'),
+    ('processando', 'Processando'),
+    ('concluida', 'Concluída'),
+    ('falhou', 'Falhou'),
+)
+
+
+class ImportacaoUsuarios(models.Model):
+    """Importação de usuários via CSV processada em segundo plano (ver ``core/importacao.py``).
+
+    ``linhas_processadas`` só avança junto com o commit de cada lote, então
+    uma importação interrompida recomeça do último lote gravado. O conteúdo do
+    arquivo fica no banco (``ParteImportacao``), acessível ao worker em outro
+    contêiner.
+    """
+    criado_por = models.ForeignKey(CustomUser, on_delete=models.SET_NULL, null=True, related_name='importacoes')
+    nome_arquivo = models.CharField(max_length=255)
+    tamanho_bytes = models.PositiveBigIntegerField(default=0)
+    codificacao = models.CharField(max_length=20, blank=True)
+    tamanho_lote = models.PositiveIntegerField(default=200)
+    status = models.CharField(max_length=12, choices=STATUS_IMPORTACAO, default='pendente')
+    linhas_processadas = models.PositiveIntegerField(default=0)
+    bytes_processados = models.PositiveBigIntegerField(default=0)
+    usuarios_criados = models.PositiveIntegerField(default=0)
+    total_erros = models.PositiveIntegerField(default=0)
+    erros = models.JSONField(default=list, blank=True)
+    ultimo_erro = models.TextField(blank=True)
+    tentativas = models.PositiveSmallIntegerField(default=0)
+    reservado_ate = models.DateTimeField(blank=True, null=True)
+    criado_em = models.DateTimeField(auto_now_add=True)
+    atualizado_em = models.DateTimeField(auto_now=True)
+    concluido_em = models.DateTimeField(blank=True, null=True)
+
+    class Meta:
+        ordering = ['-criado_em']
+        verbose_name = 'Importação de Usuários'
+        verbose_name_plural = 'Importações de Usuários'
+        indexes = [
+            models.Index(fields=['status', 'reservado_ate'], name='importacao_fila_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.nome_arquivo} ({self.get_status_display()})"
+
+    @property
+    def percentual(self):
+        if self.status == 'concluida':
+            return 100
+        if not self.tamanho_bytes:
+            return 0
+        return min(99, int(self.bytes_processados * 100 / self.tamanho_bytes))
+
+
+class ParteImportacao(models.Model):
+    """Trecho do CSV de uma importação, guardado no banco até o processamento terminar.
+
+    O arquivo tem senhas em texto puro: as partes são apagadas quando a
+    importação conclui ou falha de vez.
+    """
+    importacao = models.ForeignKey(ImportacaoUsuarios, on_delete=models.CASCADE, related_name='partes')
+    ordem = models.PositiveIntegerField()
+    dados = models.BinaryField()
+
+    class Meta:
+        ordering = ['importacao', 'ordem']
+        constraints = [
+            models.UniqueConstraint(fields=['importacao', 'ordem'], name='parte_importacao_ordem_unica'),
+        ]
@@ -0,0 +1,160 @@
+"""Paginação por cursor (keyset) para listagens longas.
+
+Em vez de ``COUNT(*)`` + ``OFFSET``, cada página filtra a partir dos valores
+de ordenação da última (ou primeira) linha da página anterior, por exemplo
+``(date_joined, id) < (d, i)``. O custo não cresce com a profundidade da
+página. A ordenação precisa terminar em uma coluna única (normalmente ``id``).
+O total estimado é calculado só na primeira página e segue dentro do cursor.
+"""
+import json
+from datetime import date, datetime
+from decimal import Decimal
+
+from django.core import signing
+from django.db import connections
+from django.db.models import Q
+
+SALT_CURSOR = 'core.paginacao.cursor'
+# Abaixo disto a estimativa do planejador não compensa: conta de verdade
+LIMITE_CONTAGEM_EXATA = 1000
+
+
+def _serializar(valor):
+    if isinstance(valor, (datetime, date)):
+        return valor.isoformat()
+    if isinstance(valor, Decimal):
+        return str(valor)
+    return valor
+
+
+def _campo(ordem):
+    return ordem.lstrip('-'), ordem.startswith('-')
+
+
+def _inverter(ordem):
+    return ordem[1:] if ordem.startswith('-') else f'-{ordem}'
+
+
+def _filtro_cursor(ordem, valores, para_tras):
+    """Comparação lexicográfica: (a, b) > (x, y)  ==  a > x OR (a = x AND b > y)."""
+    filtro = Q()
+    iguais = Q()
+    for campo_ordem, valor in zip(ordem, valores):
+        nome, decrescente = _campo(campo_ordem)
+        lookup = 'gt' if decrescente == para_tras else 'lt'
+        filtro |= iguais & Q(**{f'{nome}__{lookup}': valor})
+        iguais &= Q(**{nome: valor})
+    return filtro
+
+
+def _ler_cursor(valor, ordem):
+    if not valor:
+        return None
+    try:
+        cursor = signing.loads(valor, salt=SALT_CURSOR)
+    except signing.BadSignature:
+        return None
+    if cursor.get('d') not in ('p', 'a') or len(cursor.get('v') or []) != len(ordem):
+        return None
+    return cursor
+
+
+def _gerar_cursor(direcao, objeto, ordem, total=None):
+    valores = [_serializar(getattr(objeto, _campo(o)[0])) for o in ordem]
+    dados = {'d': direcao, 'v': valores}
+    if total is not None:
+        dados['t'] = total
+    return signing.dumps(dados, salt=SALT_CURSOR, compress=True)
+
+
+def estimar_total(queryset):
+    """Total de linhas; no Postgres usa a estimativa do planejador para listas grandes."""
+    conexao = connections[queryset.db]
+    if conexao.vendor != 'postgresql':
+        return queryset.count()
+    sql, params = queryset.order_by().query.sql_with_params()
+    with conexao.cursor() as cursor:
+        cursor.execute(f'EXPLAIN (FORMAT JSON) {sql}', params)
+        plano = cursor.fetchone()[0]
+    if isinstance(plano, str):
+        plano = json.loads(plano)
+    estimado = int(plano[0]['Plan']['Plan Rows'])
+    return queryset.count() if estimado < LIMITE_CONTAGEM_EXATA else estimado
+
+
+class PaginaCursor:
+    """Página de resultados; iterável como uma lista de objetos."""
+
+    def __init__(self, itens, url_proxima=None, url_anterior=None, url_primeira=None, total_estimado=None):
+        self.itens = itens
+        self.url_proxima = url_proxima
+        self.url_anterior = url_anterior
+        self.url_primeira = url_primeira
+        self.total_estimado = total_estimado
+
+    def __iter__(self):
+        return iter(self.itens)
+
+    def __len__(self):
+        return len(self.itens)
+
+    @property
+    def has_next(self):
+        return self.url_proxima is not None
+
+    @property
+    def has_previous(self):
+        return self.url_anterior is not None
+
+    @property
+    def has_other_pages(self):
+        return self.has_next or self.has_previous
+
+
+def _url(request, cursor=None):
+    parametros = request.GET.copy()
+    parametros.pop('page', None)
+    parametros.pop('cursor', None)
+    if cursor:
+        parametros['cursor'] = cursor
+    return f'?{parametros.urlencode()}'
+
+
+def paginar_por_cursor(request, queryset, ordem, por_pagina=20, estimar=False):
+    """Página atual de ``queryset`` segundo o parâmetro ``cursor`` da requisição.
+
+    ``ordem`` é a sequência de campos (com ``-`` para decrescente) e deve
+    terminar em um campo único. Com ``estimar=True`` a página traz
+    ``total_estimado``, contado na primeira página e repassado pelo cursor às
+    seguintes (os filtros vão na URL; mudá-los volta à primeira página).
+    """
+    ordem = tuple(ordem)
+    cursor = _ler_cursor(request.GET.get('cursor'), ordem)
+    para_tras = cursor is not None and cursor['d'] == 'a'
+    total = None
+    if estimar:
+        total = cursor.get('t') if cursor else None
+        if not isinstance(total, int):
+            total = estimar_total(queryset)
+
+    filtrado = queryset
+    if cursor:
+        filtrado = filtrado.filter(_filtro_cursor(ordem, cursor['v'], para_tras))
+    ordenacao = [_inverter(o) for o in ordem] if para_tras else list(ordem)
+    itens = list(filtrado.order_by(*ordenacao)[:por_pagina + 1])
+    ha_mais = len(itens) > por_pagina
+    itens = itens[:por_pagina]
+
+    if para_tras:
+        itens.reverse()
+        tem_anterior, tem_proxima = ha_mais, True
+    else:
+        tem_anterior, tem_proxima = cursor is not None, ha_mais
+
+    return PaginaCursor(
+        itens,
+        url_proxima=_url(request, _gerar_cursor('p', itens[-1], ordem, total)) if tem_proxima and itens else None,
+        url_anterior=_url(request, _gerar_cursor('a', itens[0], ordem, total)) if tem_anterior and itens else None,
+        url_primeira=_url(request) if tem_anterior else None,
+        total_estimado=total,
+    )
@@ -0,0 +1,53 @@
+"""Hash de senhas em paralelo para a criação de usuários em lote.
+
+O PBKDF2 padrão do Django leva centenas de milissegundos por senha e é puro
+CPU. Para muitas senhas, o trabalho é distribuído em um
+``ProcessPoolExecutor`` com um processo por núcleo. Os sais são gerados no
+processo principal e o algoritmo é passado explicitamente, então cada
+resultado é exatamente o que ``make_password(senha, sal, algoritmo)``
+produziria aqui.
+"""
+import os
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from django.contrib.auth.hashers import get_hasher, make_password
+
+# Abaixo disto o custo de subir os processos não compensa
+MINIMO_PARALELO = 8
+
+
+def _iniciar_processo():
+    # Necessário quando o sistema cria processos com "spawn" em vez de "fork"
+    import django
+    from django.apps import apps
+    if not apps.ready:
+        django.setup()
+
+
+def _gerar_hash(item):
+    senha, sal, algoritmo = item
+    return make_password(senha, sal, algoritmo)
+
+
+def numero_de_processos():
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return os.cpu_count() or 1
+
+
+def gerar_hashes(senhas, processos=None):
+    """Hashes de ``senhas`` na mesma ordem, como ``make_password`` geraria."""
+    hasher = get_hasher()
+    itens = [(senha, hasher.salt(), hasher.algorithm) for senha in senhas]
+    processos = min(processos or numero_de_processos(), len(itens))
+
+    if processos > 1 and len(itens) >= MINIMO_PARALELO:
+        try:
+            with ProcessPoolExecutor(max_workers=processos, initializer=_iniciar_processo) as executor:
+                return list(executor.map(_gerar_hash, itens, chunksize=max(1, len(itens) // (processos * 4))))
+        except (BrokenProcessPool, OSError, NotImplementedError):
+            # Ambientes sem suporte a subprocessos caem no cálculo sequencial
+            pass
+    return [_gerar_hash(item) for item in itens]
@@ -0,0 +1,29 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from temporadas.models import InteresseTemporada, Temporada
+from .busca import CAMPOS_BUSCA, indexar_usuarios, remover_do_indice
+from .dashboard import invalidar_resumo_gestor
+from .models import CustomUser
+
+
+@receiver([post_save, post_delete], sender=CustomUser)
+@receiver([post_save, post_delete], sender=Temporada)
+@receiver([post_save, post_delete], sender=InteresseTemporada)
+def dados_do_painel_alterados(sender, update_fields=None, **kwargs):
+    # Login só grava last_login, que não aparece no painel
+    if update_fields and set(update_fields) <= {'last_login'}:
+        return
+    invalidar_resumo_gestor()
+
+
+@receiver(post_save, sender=CustomUser)
+def usuario_salvo(sender, instance, update_fields=None, **kwargs):
+    if update_fields and not set(update_fields) & set(CAMPOS_BUSCA):
+        return
+    indexar_usuarios([instance.pk])
+
+
+@receiver(post_delete, sender=CustomUser)
+def usuario_removido(sender, instance, **kwargs):
+    remover_do_indice([instance.pk])
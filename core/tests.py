@@ -1,3 +1,505 @@
-from django.test import TestCase
+import io
+import tempfile
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from django.urls import reverse
+
+from temporadas.models import InteresseTemporada, Temporada
+from .models import CustomUser
+
+
+class HomeGestorTests(TestCase):
+    def setUp(self):
+        # Os caches só são invalidados no commit, que os testes nunca fazem
+        cache.clear()
+        User = get_user_model()
+        self.gestor = User.objects.create_user(username='g', password='x', user_type='gestor')
+        self.monitor = User.objects.create_user(username='m', password='x', user_type='monitor')
+        self.temporada = Temporada.objects.create(nome='T', data_inicio='2025-01-01', data_fim='2025-01-02', tipo='ferias')
+        InteresseTemporada.objects.create(monitor=self.monitor, temporada=self.temporada)
+        self.client.login(username='g', password='x')
+
+    def test_contadores_e_cache(self):
+        resp = self.client.get(reverse('home'))
+        self.assertEqual(resp.context['total_temporadas'], 1)
+        self.assertEqual(resp.context['temporadas_sem_email'], 1)
+        self.assertEqual(resp.context['interesses_pendentes'], 1)
+        self.assertEqual(resp.context['monitores_pendentes_aprovacao'], 1)
+        self.assertEqual(resp.context['usuarios_por_tipo'], {'admin': 0, 'gestor': 1, 'monitor': 1})
+
+        with CaptureQueriesContext(connection) as ctx:
+            self.client.get(reverse('home'))
+        self.assertFalse([q for q in ctx.captured_queries if 'temporadas_' in q['sql']])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Temporada.objects.create(nome='T2', data_inicio='2025-02-01', data_fim='2025-02-02', tipo='ferias')
+        resp = self.client.get(reverse('home'))
+        self.assertEqual(resp.context['total_temporadas'], 2)
+
+
+class HomeMonitorTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        from datetime import timedelta
+        from django.utils import timezone
+        User = get_user_model()
+        self.monitor = User.objects.create_user(username='m', password='x', user_type='monitor')
+        User.objects.filter(pk=self.monitor.pk).update(is_approved=True)
+        self.futuro = timezone.now().date() + timedelta(days=30)
+        self.temporadas = [
+            Temporada.objects.create(nome=f'T{i}', data_inicio=self.futuro, data_fim=self.futuro, tipo='ferias')
+            for i in range(3)
+        ]
+        Temporada.objects.create(nome='Passada', data_inicio='2024-01-01', data_fim='2024-01-02', tipo='ferias')
+        InteresseTemporada.objects.create(monitor=self.monitor, temporada=self.temporadas[0], status='aprovado')
+        self.client.login(username='m', password='x')
+
+    def test_contadores_em_uma_consulta_e_cache_por_monitor(self):
+        with CaptureQueriesContext(connection) as ctx:
+            resp = self.client.get(reverse('home'))
+        self.assertEqual(resp.context['temporadas_disponiveis'], 2)
+        self.assertEqual(resp.context['minhas_temporadas'], 1)
+        self.assertEqual(len([q for q in ctx.captured_queries if 'temporadas_' in q['sql']]), 1)
+
+        with CaptureQueriesContext(connection) as ctx:
+            self.client.get(reverse('home'))
+        self.assertFalse([q for q in ctx.captured_queries if 'temporadas_' in q['sql']])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            InteresseTemporada.objects.create(monitor=self.monitor, temporada=self.temporadas[1], status='confirmado')
+        resp = self.client.get(reverse('home'))
+        self.assertEqual((resp.context['temporadas_disponiveis'], resp.context['minhas_temporadas']), (1, 2))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Temporada.objects.create(nome='Nova', data_inicio=self.futuro, data_fim=self.futuro, tipo='ferias')
+        self.assertEqual(self.client.get(reverse('home')).context['temporadas_disponiveis'], 2)
+
+
+class BuscaUsuariosTests(TestCase):
+    def setUp(self):
+        User = get_user_model()
+        User.objects.create_user(username='g', password='x', user_type='gestor')
+        self.jose = User.objects.create_user(
+            username='jsilva', email='js@x.com', password='x', user_type='monitor',
+            first_name='José', last_name='Silva',
+        )
+        self.maria = User.objects.create_user(
+            username='maria', password='x', user_type='monitor', nome_completo='Maria José Conceição',
+        )
+        self.client.login(username='g', password='x')
+
+    def buscar(self, termo):
+        resp = self.client.get(reverse('manage_users'), {'search': termo})
+        return [u.username for u in resp.context['page_obj']]
+
+    def test_busca_ignora_acentos_e_inclui_nome_completo(self):
+        self.assertCountEqual(self.buscar('jose'), ['jsilva', 'maria'])
+        self.assertEqual(self.buscar('CONCEICAO'), ['maria'])
+        self.assertEqual(self.buscar('jos silv'), ['jsilva'])
+        self.assertEqual(self.buscar('inexistente'), [])
+
+    def test_indice_acompanha_alteracoes(self):
+        self.maria.nome_completo = 'Maria Aparecida'
+        self.maria.save()
+        self.assertEqual(self.buscar('jose'), ['jsilva'])
+        self.jose.delete()
+        self.assertEqual(self.buscar('jose'), [])
+
+
+class PaginacaoCursorTests(TestCase):
+    def setUp(self):
+        from django.utils import timezone
+        User = get_user_model()
+        self.gestor = User.objects.create_user(username='g', password='x', user_type='gestor')
+        for i in range(7):
+            User.objects.create_user(username=f'u{i}', password='x', user_type='monitor')
+        # Datas repetidas obrigam o desempate pelo id
+        User.objects.update(date_joined=timezone.now())
+        self.client.login(username='g', password='x')
+
+    def test_percorre_ida_e_volta_sem_offset(self):
+        from .paginacao import paginar_por_cursor
+        from django.test import RequestFactory
+        ordem = ('-date_joined', '-id')
+        todos = list(CustomUser.objects.order_by(*ordem).values_list('username', flat=True))
+
+        fabrica = RequestFactory()
+        pagina = paginar_por_cursor(fabrica.get('/'), CustomUser.objects.all(), ordem, por_pagina=3, estimar=True)
+        self.assertEqual(pagina.total_estimado, 8)
+        self.assertFalse(pagina.has_previous)
+        vistos = [u.username for u in pagina]
+        while pagina.has_next:
+            with CaptureQueriesContext(connection) as ctx:
+                pagina = paginar_por_cursor(fabrica.get('/' + pagina.url_proxima), CustomUser.objects.all(), ordem, por_pagina=3, estimar=True)
+            # Uma consulta só: o total da primeira página vem no cursor
+            self.assertEqual(len(ctx.captured_queries), 1)
+            self.assertNotIn('OFFSET', ctx.captured_queries[0]['sql'])
+            self.assertEqual(pagina.total_estimado, 8)
+            vistos += [u.username for u in pagina]
+        self.assertEqual(vistos, todos)
+
+        pagina = paginar_por_cursor(fabrica.get('/' + pagina.url_anterior), CustomUser.objects.all(), ordem, por_pagina=3)
+        self.assertEqual([u.username for u in pagina], todos[3:6])
+        self.assertTrue(pagina.has_next and pagina.has_previous)
+
+    def test_cursor_invalido_volta_para_primeira_pagina(self):
+        resp = self.client.get(reverse('manage_users'), {'cursor': 'adulterado'})
+        self.assertEqual(len(resp.context['page_obj']), 8)
+
+    def test_links_mantem_filtros(self):
+        from .paginacao import paginar_por_cursor
+        from django.test import RequestFactory
+        request = RequestFactory().get('/', {'user_type': 'monitor', 'page': '3'})
+        monitores = CustomUser.objects.filter(user_type='monitor')
+        pagina = paginar_por_cursor(request, monitores, ('-date_joined', '-id'), por_pagina=5, estimar=True)
+        self.assertEqual(pagina.total_estimado, 7)
+        self.assertIn('user_type=monitor', pagina.url_proxima)
+        self.assertNotIn('page=', pagina.url_proxima)
+
+
+class FilaAprovacaoTests(TestCase):
+    def setUp(self):
+        User = get_user_model()
+        self.gestor = User.objects.create_user(username='g', password='x', user_type='gestor')
+        self.pendentes = [User.objects.create_user(username=f'p{i}', password='x', user_type='monitor') for i in range(3)]
+        self.aprovado = User.objects.create_user(username='a', password='x', user_type='monitor')
+        User.objects.filter(pk=self.aprovado.pk).update(is_approved=True)
+        self.client.login(username='g', password='x')
+
+    def test_filtros_e_contagens(self):
+        resp = self.client.get(reverse('approve_monitors'))
+        self.assertEqual(resp.context['filtro'], 'pendentes')
+        self.assertCountEqual([m.username for m in resp.context['monitores_pendentes']], ['p0', 'p1', 'p2'])
+        self.assertEqual(resp.context['contagens']['todos'], 4)
+        resp = self.client.get(reverse('approve_monitors'), {'filtro': 'todos'})
+        self.assertEqual(len(resp.context['monitores_pendentes']), 4)
+
+    def test_acao_em_lote_usa_um_update_e_audita(self):
+        from .models import RegistroAprovacao
+        ids = [m.id for m in self.pendentes[:2]]
+        with CaptureQueriesContext(connection) as ctx:
+            resp = self.client.post(reverse('approve_monitors_lote'), {'action': 'approve', 'monitores': ids, 'filtro': 'pendentes'})
+        self.assertRedirects(resp, reverse('approve_monitors') + '?filtro=pendentes', fetch_redirect_response=False)
+        updates = [q for q in ctx.captured_queries if q['sql'].startswith('UPDATE "core_customuser"')]
+        self.assertEqual(len(updates), 1)
+        self.assertEqual(CustomUser.objects.filter(id__in=ids, is_approved=True, is_active=True).count(), 2)
+        self.assertFalse(CustomUser.objects.get(pk=self.pendentes[2].pk).is_approved)
+
+        registros = RegistroAprovacao.objects.filter(acao='approve')
+        self.assertCountEqual(registros.values_list('monitor_id', flat=True), ids)
+        self.assertTrue(all(r.gestor_id == self.gestor.id and not r.aprovado_antes for r in registros))
+        self.assertEqual(self.client.get(reverse('approve_monitors')).context['aprovados_hoje'], 2)
+
+    def test_ids_invalidos_sao_ignorados(self):
+        dados = {'action': 'approve', 'monitores': ['abc', self.pendentes[0].id]}
+        self.assertEqual(self.client.post(reverse('approve_monitors_lote'), dados).status_code, 302)
+        self.assertTrue(CustomUser.objects.get(pk=self.pendentes[0].pk).is_approved)
+        resp = self.client.post(reverse('approve_monitors_lote'), {'action': 'approve', 'monitores': ['abc']})
+        self.assertEqual(resp.status_code, 302)
+
+    def test_rejeicao_individual_tambem_audita(self):
+        from .models import RegistroAprovacao
+        self.client.post(reverse('approve_monitor', args=[self.aprovado.id]), {'action': 'reject'})
+        monitor = CustomUser.objects.get(pk=self.aprovado.pk)
+        self.assertFalse(monitor.is_active or monitor.is_approved)
+        registro = RegistroAprovacao.objects.get(monitor=monitor)
+        self.assertEqual((registro.acao, registro.aprovado_antes, registro.ativo_antes), ('reject', True, True))
+
+
+@override_settings(
+    PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'],
+    MEDIA_ROOT=tempfile.mkdtemp(prefix='paiol-testes-'),
+)
+class ImportacaoCsvTests(TestCase):
+    CABECALHO = 'username,email,first_name,last_name,user_type,cpf,telefone,password\n'
+
+    def setUp(self):
+        User = get_user_model()
+        self.gestor = User.objects.create_user(username='g', email='g@x.com', password='x', user_type='gestor')
+        self.client.login(username='g', password='x')
+
+    def enviar(self, linhas, codificacao='utf-8'):
+        from django.core.files.uploadedfile import SimpleUploadedFile
+        arquivo = SimpleUploadedFile('u.csv', (self.CABECALHO + ''.join(linhas)).encode(codificacao))
+        return self.client.post(reverse('bulk_create_users'), {'csv_file': arquivo})
+
+    def test_importacao_em_segundo_plano_com_relatorio_por_linha(self):
+        from .importacao import processar_importacoes_pendentes
+        from .models import ImportacaoUsuarios
+        resp = self.enviar([
+            'ok,ok@x.com,,,monitor,,,s\n',
+            'g,novo@x.com,,,monitor,,,s\n',
+            'outro,ok@x.com,,,monitor,,,s\n',
+            'semsenha,ss@x.com,,,monitor,,,\n',
+        ])
+        importacao = ImportacaoUsuarios.objects.get()
+        self.assertRedirects(resp, reverse('importacao_status', args=[importacao.id]), fetch_redirect_response=False)
+        self.assertEqual(importacao.status, 'pendente')
+
+        self.assertEqual(processar_importacoes_pendentes(), 1)
+        importacao.refresh_from_db()
+        self.assertEqual(importacao.status, 'concluida')
+        self.assertEqual(importacao.erros, [
+            {'linha': 3, 'mensagem': 'Nome de usuário "g" já existe'},
+            {'linha': 4, 'mensagem': 'E-mail "ok@x.com" repetido no arquivo (linha 2)'},
+            {'linha': 5, 'mensagem': 'Campos obrigatórios faltando: password'},
+        ])
+        self.assertEqual((importacao.linhas_processadas, importacao.usuarios_criados), (4, 1))
+        self.assertFalse(importacao.partes.exists())
+        self.assertTrue(CustomUser.objects.filter(username='ok').exists())
+
+        estado = self.client.get(reverse('importacao_status', args=[importacao.id]), {'formato': 'json'}).json()
+        self.assertEqual((estado['percentual'], estado['finalizada']), (100, True))
+
+    def test_arquivo_latin1_do_excel(self):
+        from .importacao import processar_importacoes_pendentes
+        self.enviar(['jose,jose@x.com,José,Conceição,monitor,,,s\n'], codificacao='latin-1')
+        processar_importacoes_pendentes()
+        self.assertEqual(CustomUser.objects.get(username='jose').last_name, 'Conceição')
+
+    def test_byte_latin1_depois_da_amostra_em_arquivo_utf8(self):
+        from . import importacao as modulo
+        from .models import ImportacaoUsuarios
+        from django.core.files.uploadedfile import SimpleUploadedFile
+        linhas = [f'u{i},u{i}@x.com,Ana,,monitor,,,s\n' for i in range(2000)]
+        conteudo = (self.CABECALHO + ''.join(linhas)).encode('utf-8') + 'jose,jose@x.com,José,,monitor,,,s\n'.encode('latin-1')
+        self.assertGreater(len(conteudo), modulo.TAMANHO_AMOSTRA)
+        # Partes pequenas: a leitura atravessa várias linhas de ParteImportacao
+        with mock.patch.object(modulo, 'TAMANHO_PARTE', 4096):
+            self.client.post(reverse('bulk_create_users'), {'csv_file': SimpleUploadedFile('u.csv', conteudo)})
+        self.assertGreater(ImportacaoUsuarios.objects.get().partes.count(), 1)
+
+        modulo.processar_importacoes_pendentes()
+        importacao = ImportacaoUsuarios.objects.get()
+        self.assertEqual((importacao.status, importacao.codificacao, importacao.usuarios_criados), ('concluida', 'utf-8', 2001))
+        self.assertEqual(CustomUser.objects.get(username='jose').first_name, 'José')
+
+    def test_erro_inesperado_retenta_sem_apagar_o_arquivo(self):
+        from . import importacao as modulo
+        from .models import ImportacaoUsuarios
+        self.enviar(['ok,ok@x.com,,,monitor,,,s\n'])
+        with mock.patch.object(modulo, 'preparar_usuarios', side_effect=RuntimeError('banco fora do ar')):
+            self.assertEqual(modulo.processar_importacoes_pendentes(), 1)
+        importacao = ImportacaoUsuarios.objects.get()
+        self.assertEqual((importacao.status, importacao.tentativas), ('pendente', 1))
+        self.assertTrue(importacao.partes.exists())
+        # Só volta a ser processada depois da espera
+        self.assertEqual(modulo.processar_importacoes_pendentes(), 0)
+
+        ImportacaoUsuarios.objects.update(reservado_ate=timezone.now())
+        modulo.processar_importacoes_pendentes()
+        importacao.refresh_from_db()
+        self.assertEqual((importacao.status, importacao.usuarios_criados), ('concluida', 1))
+        self.assertFalse(importacao.partes.exists())
+
+    def test_importacao_interrompida_retoma_do_ultimo_lote(self):
+        from . import importacao as modulo
+        from .models import ImportacaoUsuarios
+        self.enviar([f'u{i},u{i}@x.com,,,monitor,,,s\n' for i in range(5)])
+        ImportacaoUsuarios.objects.update(tamanho_lote=2)
+
+        original = modulo.preparar_usuarios
+        chamadas = []
+
+        def cair_no_segundo_lote(validos):
+            chamadas.append(validos)
+            if len(chamadas) == 2:
+                raise KeyboardInterrupt  # simula o worker sendo encerrado
+            return original(validos)
+
+        with mock.patch.object(modulo, 'preparar_usuarios', cair_no_segundo_lote):
+            with self.assertRaises(KeyboardInterrupt):
+                modulo.processar_importacoes_pendentes()
+        importacao = ImportacaoUsuarios.objects.get()
+        self.assertEqual((importacao.status, importacao.linhas_processadas), ('processando', 2))
+        # Enquanto a reserva vale, outro worker não pega a importação
+        self.assertEqual(modulo.processar_importacoes_pendentes(), 0)
+
+        ImportacaoUsuarios.objects.update(reservado_ate=timezone.now())
+        self.assertEqual(modulo.processar_importacoes_pendentes(), 1)
+        importacao.refresh_from_db()
+        self.assertEqual((importacao.status, importacao.usuarios_criados, importacao.total_erros), ('concluida', 5, 0))
+        self.assertEqual(CustomUser.objects.filter(username__startswith='u').count(), 5)
+
+    def test_lote_desfeito_nao_avanca_os_contadores(self):
+        from django.db import DatabaseError
+        from . import importacao as modulo
+        from .models import ImportacaoUsuarios
+        self.enviar([f'u{i},u{i}@x.com,,,monitor,,,s\n' for i in range(5)])
+        ImportacaoUsuarios.objects.update(tamanho_lote=2)
+
+        original = ImportacaoUsuarios.save
+        gravacoes = []
+
+        def falhar_no_segundo_lote(instancia, *args, **kwargs):
+            # Só os saves de lote são completos; a reserva usa update_fields
+            if not kwargs.get('update_fields') and instancia.status == 'processando':
+                gravacoes.append(instancia.linhas_processadas)
+                if len(gravacoes) == 2:
+                    raise DatabaseError('conexão perdida')
+            return original(instancia, *args, **kwargs)
+
+        with mock.patch.object(ImportacaoUsuarios, 'save', falhar_no_segundo_lote):
+            modulo.processar_importacoes_pendentes()
+        importacao = ImportacaoUsuarios.objects.get()
+        self.assertEqual((importacao.status, importacao.tentativas), ('pendente', 1))
+        # O segundo lote foi desfeito junto com o save; só o primeiro conta
+        self.assertEqual((importacao.linhas_processadas, importacao.usuarios_criados), (2, 2))
+        self.assertEqual(CustomUser.objects.filter(username__startswith='u').count(), 2)
+
+        ImportacaoUsuarios.objects.update(reservado_ate=timezone.now())
+        modulo.processar_importacoes_pendentes()
+        importacao.refresh_from_db()
+        self.assertEqual((importacao.status, importacao.linhas_processadas, importacao.usuarios_criados), ('concluida', 5, 5))
+        self.assertEqual(CustomUser.objects.filter(username__startswith='u').count(), 5)
+
+    def test_consultas_nao_crescem_com_o_arquivo(self):
+        from .importacao import criar_usuarios, validar_linhas
+
+        def importar(quantidade, prefixo, primeiro_cpf):
+            linhas = [
+                {'username': f'{prefixo}{i}', 'email': f'{prefixo}{i}@x.com', 'first_name': 'José',
+                 'cpf': f'{primeiro_cpf + i:011d}', 'password': 's'}
+                for i in range(quantidade)
+            ]
+            with CaptureQueriesContext(connection) as ctx:
+                validos, erros = validar_linhas(linhas)
+                criar_usuarios(validos)
+            self.assertEqual(erros, [])
+            # O bulk_create divide os INSERTs conforme o limite de parâmetros do banco
+            return len([q for q in ctx.captured_queries if not q['sql'].startswith('INSERT INTO "core_customuser"')])
+
+        self.assertEqual(importar(2, 'a', 0), importar(40, 'b', 100))
+        monitor = CustomUser.objects.get(username='b7')
+        self.assertTrue(monitor.check_password('s'))
+        self.assertFalse(monitor.is_approved)
+        self.assertEqual(monitor.cpf, '00000000107')
+        resp = self.client.get(reverse('manage_users'), {'search': 'jose b7'})
+        self.assertEqual([u.username for u in resp.context['page_obj']], ['b7'])
+
+
+class SenhasTests(TestCase):
+    def test_hash_paralelo_identico_ao_make_password(self):
+        from django.contrib.auth.hashers import get_hasher, make_password
+        from .senhas import gerar_hashes
+        senhas = [f'senha-{i}' for i in range(10)]
+        hashes = gerar_hashes(senhas, processos=2)
+        hasher = get_hasher()
+        for senha, senha_hash in zip(senhas, hashes):
+            self.assertEqual(senha_hash, make_password(senha, hasher.decode(senha_hash)['salt']))
+        self.assertEqual(len(set(hashes)), len(senhas))
+
+
+class ExportacaoUsuariosTests(TestCase):
+    def setUp(self):
+        from .models import Endereco
+        User = get_user_model()
+        User.objects.create_user(username='g', password='x', user_type='gestor')
+        endereco = Endereco.objects.create(cep='01000-000', logradouro='Rua A', numero='1', bairro='B', cidade='São Paulo', estado='SP')
+        User.objects.create_user(
+            username='jose', email='jose@x.com', password='x', user_type='monitor',
+            first_name='José', categoria='monitor', endereco_completo=endereco,
+        )
+        User.objects.create_user(username='ana', password='x', user_type='monitor')
+        self.client.login(username='g', password='x')
+
+    def test_csv_respeita_filtros_e_inclui_endereco(self):
+        import csv
+        resp = self.client.get(reverse('export_users', args=['csv']), {'search': 'jose', 'user_type': 'monitor'})
+        self.assertTrue(resp.streaming)
+        conteudo = b''.join(resp.streaming_content).decode('utf-8-sig')
+        linhas = list(csv.reader(io.StringIO(conteudo)))
+        self.assertEqual(len(linhas), 2)
+        registro = dict(zip(linhas[0], linhas[1]))
+        self.assertEqual(registro['Usuário'], 'jose')
+        self.assertEqual(registro['Categoria'], 'Monitor')
+        self.assertEqual(registro['Cidade'], 'São Paulo')
+        self.assertEqual(registro['Aprovado'], 'Não')
+
+    def test_formulas_sao_neutralizadas(self):
+        import csv
+        CustomUser.objects.filter(username='ana').update(first_name='=HYPERLINK("http://x","y")', telefone='+5511')
+        resp = self.client.get(reverse('export_users', args=['csv']), {'search': 'ana'})
+        linhas = list(csv.reader(io.StringIO(b''.join(resp.streaming_content).decode('utf-8-sig'))))
+        registro = dict(zip(linhas[0], linhas[1]))
+        self.assertEqual(registro['Nome'], '\'=HYPERLINK("http://x","y")')
+        self.assertEqual(registro['Telefone'], "'+5511")
+
+    def test_formato_desconhecido(self):
+        self.assertEqual(self.client.get('/manage-users/exportar.pdf').status_code, 404)
+
+    def test_xlsx(self):
+        from .exportacao import xlsx_disponivel
+        if not xlsx_disponivel():
+            self.skipTest('openpyxl não instalado')
+        from openpyxl import load_workbook
+        resp = self.client.get(reverse('export_users', args=['xlsx']), {'user_type': 'monitor'})
+        planilha = load_workbook(io.BytesIO(b''.join(resp.streaming_content)), read_only=True)
+        linhas = list(planilha.active.iter_rows(values_only=True))
+        self.assertEqual([linha[0] for linha in linhas[1:]], ['ana', 'jose'])
+
+
+class BiDashboardTests(TestCase):
+    def setUp(self):
+        from .models import Endereco
+        User = get_user_model()
+        self.gestor = User.objects.create_user(username='g', password='x', user_type='gestor')
+        temporadas = [
+            Temporada.objects.create(nome=f'T{i}', data_inicio='2025-01-01', data_fim='2025-01-02', tipo='ferias')
+            for i in range(2)
+        ]
+        for i, (estado, confirmadas) in enumerate([('SP', 2), ('SP', 1), ('RJ', 0)]):
+            endereco = Endereco.objects.create(
+                cep='00000-000', logradouro='Rua', numero='1', bairro='B', cidade='C', estado=estado
+            )
+            monitor = User.objects.create_user(
+                username=f'm{i}', password='x', user_type='monitor', endereco_completo=endereco
+            )
+            for t in temporadas[:confirmadas]:
+                InteresseTemporada.objects.create(monitor=monitor, temporada=t, status='confirmado')
+        self.client.login(username='g', password='x')
+
+    def test_metricas_reais_com_consultas_constantes(self):
+        with CaptureQueriesContext(connection) as ctx:
+            resp = self.client.get(reverse('bi_dashboard'))
+        ranking = [(m.username, m.participacoes) for m in resp.context['ranking_monitores']]
+        self.assertEqual(ranking, [('m0', 2), ('m1', 1)])
+        self.assertEqual(
+            resp.context['monitores_por_regiao'],
+            [{'regiao': 'SP', 'count': 2}, {'regiao': 'RJ', 'count': 1}],
+        )
+        self.assertEqual(resp.context['cadastros_por_mes'][-1]['count'], 3)
+        consultas = len(ctx.captured_queries)
+
+        User = get_user_model()
+        User.objects.create_user(username='m9', password='x', user_type='monitor')
+        with CaptureQueriesContext(connection) as ctx:
+            self.client.get(reverse('bi_dashboard'))
+        self.assertEqual(len(ctx.captured_queries), consultas)
+
+
+class MetricaDiariaTests(TestCase):
+    def test_comando_preenche_apenas_dias_novos(self):
+        from datetime import date, datetime, timezone as dt_timezone
+        from django.core.management import call_command
+        from .models import MetricaDiaria
+        User = get_user_model()
+        monitor = User.objects.create_user(username='m', password='x', user_type='monitor')
+        User.objects.filter(id=monitor.id).update(date_joined=datetime(2025, 1, 2, 12, tzinfo=dt_timezone.utc))
+
+        call_command('atualizar_metricas', ate='2025-01-03', stdout=io.StringIO())
+        self.assertEqual(
+            list(MetricaDiaria.objects.values_list('data', 'novos_monitores')),
+            [(date(2025, 1, 2), 1), (date(2025, 1, 3), 0)],
+        )
+        self.assertIsNone(MetricaDiaria.objects.get(data='2025-01-02').monitores_aprovados)
+        self.assertEqual(MetricaDiaria.objects.get(data='2025-01-03').monitores_aprovados, 0)
+
+        call_command('atualizar_metricas', ate='2025-01-05', stdout=io.StringIO())
+        self.assertEqual(MetricaDiaria.objects.count(), 4)
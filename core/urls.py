@@ -1,4 +1,4 @@
-from django.urls import path
+from django.urls import path, re_path
 from . import views
 
 urlpatterns = [
@@ -11,16 +11,19 @@ urlpatterns = [
     
     # URLs de gerenciamento de usuários
     path('manage-users/', views.manage_users, name='manage_users'),
+    re_path(r'^manage-users/exportar\.(?P<formato>csv|xlsx)$', views.export_users, name='export_users'),
     path('create-user/', views.create_user, name='create_user'),
     path('edit-user/<int:user_id>/', views.edit_user, name='edit_user'),
     path('delete-user/<int:user_id>/', views.delete_user, name='delete_user'),
     path('user-detail/<int:user_id>/', views.user_detail, name='user_detail'),
     path('bulk-create-users/', views.bulk_create_users, name='bulk_create_users'),
+    path('importacoes/<int:importacao_id>/', views.importacao_status, name='importacao_status'),
     
     # Dashboard BI
     path('bi-dashboard/', views.bi_dashboard, name='bi_dashboard'),
     
     # Aprovação de monitores
     path('approve-monitors/', views.approve_monitors, name='approve_monitors'),
+    path('approve-monitors/lote/', views.approve_monitors_lote, name='approve_monitors_lote'),
     path('approve-monitor/<int:monitor_id>/', views.approve_monitor, name='approve_monitor'),
 ]
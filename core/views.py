@@ -2,12 +2,20 @@ from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth import login, logout, authenticate
 from django.contrib.auth.decorators import login_required, user_passes_test
 from .forms import CustomUserCreationForm, CompleteProfileForm, UserManagementForm, CSVUploadForm
-from temporadas.models import Temporada, InteresseTemporada
+from temporadas.models import EstatisticaMonitor, Temporada, InteresseTemporada
 from temporadas.utils import is_gestor, is_monitor
 from django.contrib import messages
-from django.core.paginator import Paginator
 from django.db.models import Q
-from .models import CustomUser
+from django.http import JsonResponse
+from django.urls import reverse
+from django.views.decorators.http import require_POST
+from .aprovacao import ACOES, FILTROS, aplicar_acao, contagens_fila
+from .busca import buscar_usuarios
+from .importacao import iniciar_importacao
+from .dashboard import resumo_gestor, resumo_monitor
+from .exportacao import resposta_csv, resposta_xlsx, xlsx_disponivel
+from .paginacao import paginar_por_cursor
+from .models import CustomUser, ImportacaoUsuarios, RegistroAprovacao
 from django.utils import timezone
 
 
@@ -89,45 +97,12 @@ def home(request):
 @login_required
 @user_passes_test(is_gestor)
 def home_gestor(request):
-    from .models import CustomUser
-    
-    total_temporadas = Temporada.objects.count()
-    interesses_pendentes = InteresseTemporada.objects.filter(status='pendente').count()
-    temporadas_sem_email = Temporada.objects.filter(email_enviado=False).count()
-    
-    # Monitores pendentes de aprovação
-    monitores_pendentes_aprovacao = CustomUser.objects.filter(
-        user_type='monitor',
-        is_approved=False
-    ).count()
-    
-    # Informações de todos os usuários para o dashboard do gestor
-    total_usuarios = CustomUser.objects.count()
-    usuarios_por_tipo = {
-        'admin': CustomUser.objects.filter(user_type='admin').count(),
-        'gestor': CustomUser.objects.filter(user_type='gestor').count(),
-        'monitor': CustomUser.objects.filter(user_type='monitor').count(),
-    }
-    
-    # Últimos usuários cadastrados
-    ultimos_usuarios = CustomUser.objects.order_by('-date_joined')[:5]
-
-    return render(request, 'home_gestor.html', {
-        'total_temporadas': total_temporadas,
-        'interesses_pendentes': interesses_pendentes,
-        'temporadas_sem_email': temporadas_sem_email,
-        'monitores_pendentes_aprovacao': monitores_pendentes_aprovacao,
-        'total_usuarios': total_usuarios,
-        'usuarios_por_tipo': usuarios_por_tipo,
-        'ultimos_usuarios': ultimos_usuarios,
-    })
+    return render(request, 'home_gestor.html', resumo_gestor())
 
 
 @login_required
 @user_passes_test(is_monitor)
 def home_monitor(request):
-    from temporadas.models import Temporada, InteresseTemporada
-
     # Verificar se o monitor foi aprovado
     if not request.user.is_approved:
         return render(request, 'home_monitor.html', {
@@ -136,35 +111,8 @@ def home_monitor(request):
             'aguardando_aprovacao': True
         })
 
-    # IDs das temporadas que o monitor já se envolveu (interesse ou confirmação)
-    temporadas_relacionadas = InteresseTemporada.objects.filter(
-        monitor=request.user
-    ).values_list('temporada_id', flat=True)
-
-    # Temporadas enviadas por email, mas que o monitor ainda não demonstrou interesse
-    temporadas_disponiveis = Temporada.objects.filter(
-        email_enviado=True
-    ).exclude(id__in=temporadas_relacionadas).count()
-
-    minhas_temporadas = InteresseTemporada.objects.filter(
-        monitor=request.user,
-        status='confirmado'
-    ).count()
-
-    # Ajuste: contador de temporadas disponíveis deve refletir a listagem real
-    hoje = timezone.now().date()
-    temporadas_disponiveis = Temporada.objects.filter(data_fim__gte=hoje).exclude(
-        interessetemporada__monitor=request.user
-    ).count()
-    # Após aprovação, já deve aparecer em "Minhas temporadas"
-    minhas_temporadas = InteresseTemporada.objects.filter(
-        monitor=request.user,
-        status__in=['aprovado', 'confirmado']
-    ).count()
-
     return render(request, 'home_monitor.html', {
-        'temporadas_disponiveis': temporadas_disponiveis,
-        'minhas_temporadas': minhas_temporadas,
+        **resumo_monitor(request.user),
         'aguardando_aprovacao': False
     })
 
@@ -188,42 +136,60 @@ def complete_profile(request):
 
 # Views de gerenciamento de usuários para gestores
 
+def _usuarios_filtrados(request):
+    """Usuários e ordenação conforme os filtros de busca e tipo da listagem"""
+    users = CustomUser.objects.all()
+    ordem = ('-date_joined', '-id')
+    
+    search_query = request.GET.get('search', '')
+    if search_query:
+        users = buscar_usuarios(users, search_query)
+        ordem = ('-relevancia',) + ordem
+    
+    user_type_filter = request.GET.get('user_type', '')
+    if user_type_filter:
+        users = users.filter(user_type=user_type_filter)
+    
+    return users, ordem
+
+
 @login_required
 @user_passes_test(is_gestor)
 def manage_users(request):
     """Lista todos os usuários com paginação e busca"""
     search_query = request.GET.get('search', '')
     user_type_filter = request.GET.get('user_type', '')
+    users, ordem = _usuarios_filtrados(request)
     
-    users = CustomUser.objects.all().order_by('-date_joined')
-    
-    # Aplicar filtros
-    if search_query:
-        users = users.filter(
-            Q(username__icontains=search_query) |
-            Q(email__icontains=search_query) |
-            Q(first_name__icontains=search_query) |
-            Q(last_name__icontains=search_query)
-        )
-    
-    if user_type_filter:
-        users = users.filter(user_type=user_type_filter)
-    
-    # Paginação
-    paginator = Paginator(users, 20)  # 20 usuários por página
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+    # Paginação por cursor, 20 usuários por página
+    page_obj = paginar_por_cursor(request, users, ordem, por_pagina=20, estimar=True)
     
     context = {
         'page_obj': page_obj,
         'search_query': search_query,
         'user_type_filter': user_type_filter,
         'user_types': CustomUser._meta.get_field('user_type').choices,
+        'xlsx_disponivel': xlsx_disponivel(),
     }
     
     return render(request, 'manage_users.html', context)
 
 
+@login_required
+@user_passes_test(is_gestor)
+def export_users(request, formato):
+    """Exporta a listagem de usuários (com os filtros atuais) em CSV ou XLSX"""
+    users, ordem = _usuarios_filtrados(request)
+    users = users.order_by(*ordem)
+    
+    if formato == 'xlsx':
+        if not xlsx_disponivel():
+            messages.error(request, 'Exportação em XLSX indisponível: instale o pacote openpyxl.')
+            return redirect(f"{reverse('manage_users')}?{request.GET.urlencode()}")
+        return resposta_xlsx(users)
+    return resposta_csv(users)
+
+
 @login_required
 @user_passes_test(is_gestor)
 def create_user(request):
@@ -286,39 +252,44 @@ def delete_user(request, user_id):
 @login_required
 @user_passes_test(is_gestor)
 def bulk_create_users(request):
-    """Criar usuários em lote via CSV"""
+    """Criar usuários em lote via CSV (processado em segundo plano)"""
     if request.method == 'POST':
         form = CSVUploadForm(request.POST, request.FILES)
         if form.is_valid():
-            try:
-                users_to_create, errors = form.process_csv()
-                
-                if errors:
-                    for error in errors:
-                        messages.error(request, error)
-                    return render(request, 'bulk_create_users.html', {'form': form})
-                
-                # Criar usuários
-                created_users = []
-                for user_data in users_to_create:
-                    password = user_data.pop('password')
-                    user = CustomUser(**user_data)
-                    user.set_password(password)
-                    user.save()
-                    created_users.append(user)
-                
-                messages.success(
-                    request, 
-                    f'{len(created_users)} usuário(s) criado(s) com sucesso!'
-                )
-                return redirect('manage_users')
-                
-            except Exception as e:
-                messages.error(request, f'Erro ao processar arquivo CSV: {str(e)}')
+            importacao = iniciar_importacao(form.cleaned_data['csv_file'], request.user)
+            messages.info(request, 'Arquivo recebido. A importação será processada em segundo plano.')
+            return redirect('importacao_status', importacao_id=importacao.id)
     else:
         form = CSVUploadForm()
     
-    return render(request, 'bulk_create_users.html', {'form': form})
+    importacoes = ImportacaoUsuarios.objects.filter(criado_por=request.user)[:5]
+    return render(request, 'bulk_create_users.html', {'form': form, 'importacoes': importacoes})
+
+
+def _estado_importacao(importacao):
+    return {
+        'status': importacao.status,
+        'status_display': importacao.get_status_display(),
+        'percentual': importacao.percentual,
+        'linhas_processadas': importacao.linhas_processadas,
+        'usuarios_criados': importacao.usuarios_criados,
+        'total_erros': importacao.total_erros,
+        'ultimo_erro': importacao.ultimo_erro,
+        'finalizada': importacao.status in ('concluida', 'falhou'),
+    }
+
+
+@login_required
+@user_passes_test(is_gestor)
+def importacao_status(request, importacao_id):
+    """Progresso de uma importação; com ?formato=json responde só o estado (polling)"""
+    importacao = get_object_or_404(ImportacaoUsuarios, id=importacao_id)
+    if request.GET.get('formato') == 'json':
+        return JsonResponse(_estado_importacao(importacao))
+    return render(request, 'importacao_status.html', {
+        'importacao': importacao,
+        'estado': _estado_importacao(importacao),
+    })
 
 
 @login_required
@@ -330,10 +301,7 @@ def user_detail(request, user_id):
     # Buscar informações adicionais se for monitor
     temporadas_info = None
     if user.user_type == 'monitor':
-        temporadas_info = {
-            'participacoes': InteresseTemporada.objects.filter(monitor=user, status='confirmado').count(),
-            'pendentes': InteresseTemporada.objects.filter(monitor=user, status='pendente').count(),
-        }
+        temporadas_info = EstatisticaMonitor.objects.filter(monitor=user).first() or EstatisticaMonitor(monitor=user)
     
     context = {
         'user_obj': user,
@@ -348,59 +316,100 @@ def user_detail(request, user_id):
 @user_passes_test(is_gestor)
 def bi_dashboard(request):
     """Dashboard de BI com métricas e performance dos monitores"""
-    from django.db.models import Count, Q
-    from datetime import datetime, timedelta
-    
-    # Estatísticas gerais
-    total_monitores = CustomUser.objects.filter(user_type='monitor').count()
-    monitores_ativos = CustomUser.objects.filter(
-        user_type='monitor', 
-        last_login__gte=datetime.now() - timedelta(days=30)
-    ).count()
-    
-    # Monitores com cadastro completo vs incompleto
-    monitores_completos = CustomUser.objects.filter(
-        user_type='monitor', 
-        cadastro_completo=True
-    ).count()
+    from datetime import date, timedelta
+    from django.db.models import Count, Q, Sum
+    from django.db.models.functions import TruncMonth
+    from .models import MetricaDiaria
+
+    monitores = CustomUser.objects.filter(user_type='monitor')
+    agora = timezone.now()
+
+    # Estatísticas gerais em uma única consulta
+    totais = monitores.aggregate(
+        total=Count('id'),
+        ativos=Count('id', filter=Q(last_login__gte=agora - timedelta(days=30))),
+        completos=Count('id', filter=Q(cadastro_completo=True)),
+    )
+    total_monitores = totais['total']
+    monitores_ativos = totais['ativos']
+    monitores_completos = totais['completos']
     monitores_incompletos = total_monitores - monitores_completos
-    
-    # Ranking de monitores por participações (simulado - será implementado quando houver temporadas)
-    ranking_monitores = CustomUser.objects.filter(user_type='monitor').annotate(
-        participacoes=Count('id')  # Placeholder - será substituído por participações reais
-    ).order_by('-participacoes')[:10]
-    
-    # Estatísticas de cadastro por mês (últimos 6 meses)
-    cadastros_por_mes = []
-    for i in range(6):
-        data_inicio = datetime.now().replace(day=1) - timedelta(days=30*i)
-        data_fim = data_inicio.replace(day=28) + timedelta(days=4)
-        data_fim = data_fim - timedelta(days=data_fim.day)
-        
-        count = CustomUser.objects.filter(
-            user_type='monitor',
-            date_joined__gte=data_inicio,
-            date_joined__lte=data_fim
-        ).count()
-        
-        cadastros_por_mes.append({
-            'mes': data_inicio.strftime('%b/%Y'),
-            'count': count
-        })
-    
-    cadastros_por_mes.reverse()
-    
-    # Monitores por região (baseado no endereço - simulado)
+
+    # Ranking por participações confirmadas (interesses confirmados e equipes concluídas)
+    ranking_monitores = monitores.annotate(
+        participacoes=Count(
+            'interessetemporada', filter=Q(interessetemporada__status='confirmado'), distinct=True
+        ),
+        concluidas=Count(
+            'temporadaequipe', filter=Q(temporadaequipe__status='concluido'), distinct=True
+        ),
+    ).filter(
+        Q(participacoes__gt=0) | Q(concluidas__gt=0)
+    ).order_by('-participacoes', '-concluidas', 'username')[:10]
+
+    # Cadastros por mês (últimos 6 meses), agrupados no banco
+    local = timezone.localtime(agora)
+    meses = []
+    ano, mes = local.year, local.month
+    for _ in range(6):
+        meses.append((ano, mes))
+        ano, mes = (ano, mes - 1) if mes > 1 else (ano - 1, 12)
+    meses.reverse()
+    inicio_periodo = local.replace(year=meses[0][0], month=meses[0][1], day=1, hour=0, minute=0, second=0, microsecond=0)
+
+    contagem_por_mes = {
+        (linha['mes'].year, linha['mes'].month): linha['count']
+        for linha in monitores.filter(date_joined__gte=inicio_periodo)
+        .annotate(mes=TruncMonth('date_joined'))
+        .values('mes')
+        .annotate(count=Count('id'))
+        .order_by()
+    }
+    cadastros_por_mes = [
+        {'mes': f'{m:02d}/{a}', 'count': contagem_por_mes.get((a, m), 0)}
+        for a, m in meses
+    ]
+
+    # Monitores por estado do endereço cadastrado
+    por_estado = list(
+        monitores.values('endereco_completo__estado')
+        .annotate(count=Count('id'))
+        .order_by('-count', 'endereco_completo__estado')
+    )
     monitores_por_regiao = [
-        {'regiao': 'São Paulo', 'count': total_monitores // 3},
-        {'regiao': 'Rio de Janeiro', 'count': total_monitores // 4},
-        {'regiao': 'Minas Gerais', 'count': total_monitores // 5},
-        {'regiao': 'Outros', 'count': total_monitores - (total_monitores // 3 + total_monitores // 4 + total_monitores // 5)},
+        {'regiao': linha['endereco_completo__estado'] or 'Não informado', 'count': linha['count']}
+        for linha in por_estado[:5]
     ]
-    
+    outros = sum(linha['count'] for linha in por_estado[5:])
+    if outros:
+        monitores_por_regiao.append({'regiao': 'Outros', 'count': outros})
+
+    # Tendência de longo prazo a partir dos snapshots diários (comando atualizar_metricas)
+    ano, mes = local.year - 2, local.month
+    ano, mes = (ano, mes + 1) if mes < 12 else (ano + 1, 1)
+    tendencia_mensal = [
+        {
+            'mes': f"{linha['mes']:%m/%Y}",
+            'novos_monitores': linha['novos_monitores'],
+            'novos_interesses': linha['novos_interesses'],
+            'diarias': linha['diarias'],
+            'folha': linha['folha'],
+        }
+        for linha in MetricaDiaria.objects.filter(data__gte=date(ano, mes, 1))
+        .annotate(mes=TruncMonth('data'))
+        .values('mes')
+        .annotate(
+            novos_monitores=Sum('novos_monitores'),
+            novos_interesses=Sum('novos_interesses'),
+            diarias=Sum('diarias_confirmadas'),
+            folha=Sum('folha_total'),
+        )
+        .order_by('mes')
+    ]
+
     # Taxa de completude de cadastro
     taxa_completude = (monitores_completos / total_monitores * 100) if total_monitores > 0 else 0
-    
+
     context = {
         'total_monitores': total_monitores,
         'monitores_ativos': monitores_ativos,
@@ -410,27 +419,60 @@ def bi_dashboard(request):
         'ranking_monitores': ranking_monitores,
         'cadastros_por_mes': cadastros_por_mes,
         'monitores_por_regiao': monitores_por_regiao,
+        'tendencia_mensal': tendencia_mensal,
     }
-    
+
     return render(request, 'bi_dashboard.html', context)
 
 
 @login_required
 @user_passes_test(is_gestor)
 def approve_monitors(request):
-    """Página para aprovar monitores - mostra todos os monitores para controle completo"""
-    # Mostrar todos os monitores para controle total do gestor
-    monitores_pendentes = CustomUser.objects.filter(
-        user_type='monitor'
-    ).order_by('-date_joined')
+    """Fila de aprovação de monitores, filtrável e paginada"""
+    filtro = request.GET.get('filtro', 'pendentes')
+    if filtro not in FILTROS:
+        filtro = 'pendentes'
+
+    monitores = CustomUser.objects.filter(user_type='monitor').filter(FILTROS[filtro])
+    monitores_pendentes = paginar_por_cursor(request, monitores, ('-date_joined', '-id'), por_pagina=50)
     
     context = {
         'monitores_pendentes': monitores_pendentes,
+        'filtro': filtro,
+        'contagens': contagens_fila(),
+        'aprovados_hoje': RegistroAprovacao.objects.filter(
+            acao='approve', criado_em__date=timezone.localdate()
+        ).count(),
     }
     
     return render(request, 'approve_monitors.html', context)
 
 
+@require_POST
+@login_required
+@user_passes_test(is_gestor)
+def approve_monitors_lote(request):
+    """Aprova, desaprova ou rejeita de uma vez os monitores selecionados"""
+    acao = request.POST.get('action')
+    # Ids não numéricos fariam o filtro id__in levantar ValueError
+    ids = [i for i in request.POST.getlist('monitores') if i.isdecimal()]
+    filtro = request.POST.get('filtro')
+    destino = reverse('approve_monitors') + (f'?filtro={filtro}' if filtro in FILTROS else '')
+
+    if acao not in ACOES or not ids:
+        messages.info(request, 'Selecione ao menos um monitor e uma ação.')
+        return redirect(destino)
+
+    alterados = aplicar_acao(ids, acao, request.user)
+    mensagens = {
+        'approve': f'✅ {alterados} monitor(es) aprovado(s).',
+        'disapprove': f'⚠️ Aprovação removida de {alterados} monitor(es).',
+        'reject': f'❌ {alterados} monitor(es) rejeitado(s) e desativado(s).',
+    }
+    messages.success(request, mensagens[acao])
+    return redirect(destino)
+
+
 @login_required
 @user_passes_test(is_gestor)
 def approve_monitor(request, monitor_id):
@@ -440,24 +482,19 @@ def approve_monitor(request, monitor_id):
     if request.method == 'POST':
         action = request.POST.get('action')
         
+        if action in ACOES:
+            aplicar_acao([monitor.id], action, request.user)
+
         if action == 'approve':
-            # Aprovar monitor
-            monitor.is_approved = True
-            monitor.is_active = True  # Garantir que está ativo também
-            monitor.save()
+            # Aprovar monitor (e garantir que está ativo também)
             messages.success(request, f'✅ Monitor "{monitor.username}" aprovado com sucesso! Agora pode acessar temporadas e receber emails.')
         
         elif action == 'disapprove':
             # Remover aprovação do monitor
-            monitor.is_approved = False
-            monitor.save()
             messages.warning(request, f'⚠️ Aprovação do monitor "{monitor.username}" foi removida. Ele não poderá mais acessar temporadas até nova aprovação.')
         
         elif action == 'reject':
             # Rejeitar monitor (desativar completamente)
-            monitor.is_active = False
-            monitor.is_approved = False
-            monitor.save()
             messages.error(request, f'❌ Monitor "{monitor.username}" foi rejeitado e desativado.')
         
         return redirect('approve_monitors')
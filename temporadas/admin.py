@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Temporada, ConfiguracaoValores, AjudaCustoClasse, TemporadaEquipe
+from .models import Temporada, ValorDiaria, AjudaCustoClasse, TemporadaEquipe, FilaEmail, EstatisticaMonitor, LancamentoPagamento
 
 
 class TemporadaEquipeInline(admin.TabularInline):
@@ -14,5 +14,42 @@ class TemporadaAdmin(admin.ModelAdmin):
     inlines = [TemporadaEquipeInline]
 
 
-admin.site.register(ConfiguracaoValores)
+@admin.register(ValorDiaria)
+class ValorDiariaAdmin(admin.ModelAdmin):
+    list_display = ('categoria', 'valor', 'vigente_desde', 'atualizado_em')
+    list_filter = ('categoria',)
+    date_hierarchy = 'vigente_desde'
+
+
 admin.site.register(AjudaCustoClasse)
+
+
+@admin.register(FilaEmail)
+class FilaEmailAdmin(admin.ModelAdmin):
+    list_display = ('destinatario', 'assunto', 'status', 'tentativas', 'proxima_tentativa', 'enviado_em')
+    list_filter = ('status',)
+    search_fields = ('destinatario', 'assunto')
+
+
+@admin.register(EstatisticaMonitor)
+class EstatisticaMonitorAdmin(admin.ModelAdmin):
+    list_display = ('monitor', 'participacoes', 'interesses_pendentes', 'temporadas_concluidas', 'ganhos_totais', 'ultima_temporada')
+    search_fields = ('monitor__username', 'monitor__first_name', 'monitor__last_name')
+
+
+@admin.register(LancamentoPagamento)
+class LancamentoPagamentoAdmin(admin.ModelAdmin):
+    list_display = ('data_inicio', 'monitor', 'temporada', 'tipo', 'numero_diarias', 'total', 'criado_em')
+    list_filter = ('tipo', 'tipo_temporada')
+    search_fields = ('monitor__username', 'monitor__first_name', 'monitor__last_name')
+    date_hierarchy = 'data_inicio'
+
+    # O livro só recebe inserções feitas pelo sistema
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class TemporadasConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'temporadas'
+
+    def ready(self):
+        from . import signals  # noqa: F401
@@ -0,0 +1,101 @@
+"""Cache dos payloads do calendário com chaves versionadas.
+
+Em vez de apagar chaves (o que exigiria conhecer todas as janelas já
+cacheadas), cada escopo tem um contador de versão que entra na chave do
+payload. Incrementar o contador invalida de uma vez todas as entradas
+antigas, que expiram sozinhas pelo timeout.
+"""
+import time
+
+from django.core.cache import cache
+from django.db import transaction
+
+TIMEOUT_CALENDARIO = 60 * 60 * 24
+TIMEOUT_FOLHA = 60 * 60 * 24
+
+VERSAO_TEMPORADAS = 'calendario:versao:temporadas'
+VERSAO_FOLHA = 'folha:versao'
+VERSAO_VALORES = 'valores:versao'
+
+
+def _versao_monitor(monitor_id):
+    return f'calendario:versao:monitor:{monitor_id}'
+
+
+def _versao_atual(chave):
+    versao = cache.get(chave)
+    if versao is None:
+        # Inicia com um valor baseado no relógio para nunca reaproveitar
+        # números de versão antigos caso o contador seja despejado do cache
+        cache.add(chave, time.time_ns(), None)
+        versao = cache.get(chave)
+    return versao
+
+
+def _incrementar(chave):
+    try:
+        cache.incr(chave)
+    except ValueError:
+        cache.set(chave, time.time_ns(), None)
+
+
+def chave_calendario(user, inicio, fim):
+    """Chave do payload por papel; monitores têm uma entrada própria."""
+    janela = f'{inicio or "-"}:{fim or "-"}'
+    versao = _versao_atual(VERSAO_TEMPORADAS)
+    if user.user_type == 'gestor':
+        return f'calendario:gestor:{versao}:{janela}'
+    versao_monitor = _versao_atual(_versao_monitor(user.id))
+    return f'calendario:monitor:{user.id}:{versao}:{versao_monitor}:{janela}'
+
+
+def chave_resumo_monitor(monitor_id, dia):
+    """Chave dos contadores da home do monitor; o dia entra porque "disponíveis" depende da data."""
+    versao = _versao_atual(VERSAO_TEMPORADAS)
+    versao_monitor = _versao_atual(_versao_monitor(monitor_id))
+    return f'dashboard:monitor:{monitor_id}:{versao}:{versao_monitor}:{dia}'
+
+
+def invalidar_calendario(monitor_id=None):
+    """Invalida o calendário de um monitor ou, sem argumento, de todos.
+
+    Como em ``invalidar_folha``, a versão só muda depois do commit.
+    """
+    chave = VERSAO_TEMPORADAS if monitor_id is None else _versao_monitor(monitor_id)
+    transaction.on_commit(lambda: _incrementar(chave))
+
+
+def invalidar_calendarios(monitor_ids):
+    """Invalida o calendário de vários monitores com uma única escrita, após o commit."""
+    chaves = {_versao_monitor(monitor_id) for monitor_id in monitor_ids}
+    if chaves:
+        # Um valor novo do relógio vale como incremento e cabe em um só set_many
+        transaction.on_commit(lambda: cache.set_many(dict.fromkeys(chaves, time.time_ns()), None))
+
+
+def chave_ics(monitor_id):
+    """Chave do feed .ics; muda quando a escala do monitor ou alguma temporada muda."""
+    versao = _versao_atual(VERSAO_TEMPORADAS)
+    versao_monitor = _versao_atual(_versao_monitor(monitor_id))
+    return f'calendario:ics:{monitor_id}:{versao}:{versao_monitor}'
+
+
+def chave_folha(assinatura):
+    """Chave dos totais da folha para um conjunto de filtros (``assinatura``)."""
+    return f'folha:{_versao_atual(VERSAO_FOLHA)}:{assinatura}'
+
+
+def invalidar_folha():
+    """Invalida os totais da folha de todos os períodos quando a transação atual confirmar."""
+    # Antes do commit, outro processo recalcularia com os dados antigos já sob a versão nova
+    transaction.on_commit(lambda: _incrementar(VERSAO_FOLHA))
+
+
+def versao_valores():
+    """Versão da tabela de valores de diária (ver ``pagamentos.tabela_valores``)."""
+    return _versao_atual(VERSAO_VALORES)
+
+
+def invalidar_valores():
+    """Como ``invalidar_folha``: a versão nova só vale depois do commit das vigências."""
+    transaction.on_commit(lambda: _incrementar(VERSAO_VALORES))
@@ -0,0 +1,198 @@
+"""Manutenção incremental de EstatisticaMonitor.
+
+Cada mudança de status aplica apenas a diferença com ``F()``; quando uma
+participação deixa de contar, ``ultima_temporada`` é recalculada só para o
+monitor afetado. ``recalcular_estatisticas`` refaz tudo a partir do zero.
+"""
+from collections import defaultdict
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import Case, Count, DateField, F, Max, Q, Value, When
+from django.db.models.functions import Coalesce, Greatest
+
+from core.models import CustomUser
+from . import lancamentos
+from .models import EstatisticaMonitor, InteresseTemporada, LancamentoPagamento, TemporadaEquipe
+from .pagamentos import calcular_pagamento
+
+STATUS_EQUIPE_TRABALHADO = 'concluido'
+
+
+def _aplicar(monitor_id, ultima_temporada=None, criar=True, **deltas):
+    # Exclusões só atualizam: na exclusão em cascata do próprio monitor, criar a
+    # linha deixaria uma estatística apontando para um usuário inexistente
+    if criar:
+        EstatisticaMonitor.objects.bulk_create([EstatisticaMonitor(monitor_id=monitor_id)], ignore_conflicts=True)
+    campos = {campo: F(campo) + valor for campo, valor in deltas.items() if valor}
+    if ultima_temporada:
+        data = Value(ultima_temporada, output_field=DateField())
+        campos['ultima_temporada'] = Greatest(Coalesce(F('ultima_temporada'), data), data)
+    if campos:
+        EstatisticaMonitor.objects.filter(monitor_id=monitor_id).update(**campos)
+
+
+def _ultima_temporada(monitor_ids):
+    """Data de início da temporada mais recente confirmada ou concluída, por monitor."""
+    ultimas = defaultdict(lambda: None)
+    consultas = [
+        InteresseTemporada.objects.filter(monitor_id__in=monitor_ids, status='confirmado'),
+        TemporadaEquipe.objects.filter(monitor_id__in=monitor_ids, status=STATUS_EQUIPE_TRABALHADO),
+    ]
+    for qs in consultas:
+        for linha in qs.values('monitor_id').annotate(ultima=Max('temporada__data_inicio')).order_by():
+            atual = ultimas[linha['monitor_id']]
+            if atual is None or linha['ultima'] > atual:
+                ultimas[linha['monitor_id']] = linha['ultima']
+    return ultimas
+
+
+def _recalcular_ultima_temporada(monitor_id):
+    EstatisticaMonitor.objects.filter(monitor_id=monitor_id).update(
+        ultima_temporada=_ultima_temporada([monitor_id])[monitor_id]
+    )
+
+
+def interesse_alterado(interesse, removido=False):
+    antes = getattr(interesse, '_status_original', None)
+    depois = None if removido else interesse.status
+    if antes == depois:
+        return
+
+    confirmou = (depois == 'confirmado') - (antes == 'confirmado')
+    _aplicar(
+        interesse.monitor_id,
+        participacoes=confirmou,
+        interesses_pendentes=(depois == 'interessado') - (antes == 'interessado'),
+        ultima_temporada=interesse.temporada.data_inicio if confirmou > 0 else None,
+        criar=not removido,
+    )
+    if confirmou < 0:
+        _recalcular_ultima_temporada(interesse.monitor_id)
+
+
+def interesses_alterados_em_lote(monitor_ids, antes, depois):
+    """Equivalente a ``interesse_alterado`` para ``update()`` em lote de um mesmo status."""
+    if not monitor_ids or antes == depois:
+        return
+    deltas = {
+        'participacoes': (depois == 'confirmado') - (antes == 'confirmado'),
+        'interesses_pendentes': (depois == 'interessado') - (antes == 'interessado'),
+    }
+    EstatisticaMonitor.objects.bulk_create(
+        [EstatisticaMonitor(monitor_id=i) for i in monitor_ids], ignore_conflicts=True
+    )
+    EstatisticaMonitor.objects.filter(monitor_id__in=monitor_ids).update(
+        **{campo: F(campo) + valor for campo, valor in deltas.items() if valor}
+    )
+
+
+def equipe_alterada(membro, removido=False, lancamento=None):
+    """``lancamento`` é o registro do livro gravado pela mesma mudança (já com sinal)."""
+    antes = getattr(membro, '_status_original', None)
+    depois = None if removido else membro.status
+    sinal = (depois == STATUS_EQUIPE_TRABALHADO) - (antes == STATUS_EQUIPE_TRABALHADO)
+    if not sinal:
+        return
+
+    if lancamento is not None:
+        dias, ganhos = lancamento.numero_diarias, lancamento.total
+    else:
+        pagamento = calcular_pagamento(membro)
+        dias, ganhos = sinal * pagamento['numero_diarias'], sinal * pagamento['total']
+    _aplicar(
+        membro.monitor_id,
+        temporadas_concluidas=sinal,
+        dias_trabalhados=dias,
+        ganhos_totais=ganhos,
+        ultima_temporada=membro.temporada.data_inicio if sinal > 0 else None,
+        criar=not removido,
+    )
+    if sinal < 0:
+        _recalcular_ultima_temporada(membro.monitor_id)
+
+
+def equipes_alteradas_em_lote(membros, lancamentos=None):
+    """Equivalente a ``equipe_alterada`` para participações gravadas com ``bulk_update``.
+
+    Os deltas de cada monitor entram em um único ``UPDATE`` com ``Case``;
+    ``lancamentos`` é o retorno de ``lancamentos.equipes_alteradas_em_lote``.
+    """
+    lancamentos = lancamentos or {}
+    deltas = defaultdict(lambda: {'temporadas_concluidas': 0, 'dias_trabalhados': Decimal('0'), 'ganhos_totais': Decimal('0')})
+    for membro in membros:
+        antes = getattr(membro, '_status_original', None)
+        sinal = (membro.status == STATUS_EQUIPE_TRABALHADO) - (antes == STATUS_EQUIPE_TRABALHADO)
+        if not sinal:
+            continue
+        lancamento = lancamentos.get(membro.pk)
+        if lancamento is not None:
+            dias, ganhos = lancamento.numero_diarias, lancamento.total
+        else:
+            pagamento = calcular_pagamento(membro)
+            dias, ganhos = sinal * pagamento['numero_diarias'], sinal * pagamento['total']
+        delta = deltas[membro.monitor_id]
+        delta['temporadas_concluidas'] += sinal
+        delta['dias_trabalhados'] += dias
+        delta['ganhos_totais'] += ganhos
+    if not deltas:
+        return
+
+    ids = list(deltas)
+    EstatisticaMonitor.objects.bulk_create([EstatisticaMonitor(monitor_id=i) for i in ids], ignore_conflicts=True)
+    EstatisticaMonitor.objects.filter(monitor_id__in=ids).update(**{
+        campo: F(campo) + Case(
+            *[When(monitor_id=monitor_id, then=Value(delta[campo])) for monitor_id, delta in deltas.items()],
+            output_field=EstatisticaMonitor._meta.get_field(campo),
+        )
+        for campo in ('temporadas_concluidas', 'dias_trabalhados', 'ganhos_totais')
+    })
+    ultimas = _ultima_temporada(ids)
+    EstatisticaMonitor.objects.bulk_update(
+        [EstatisticaMonitor(monitor_id=i, ultima_temporada=ultimas[i]) for i in ids], ['ultima_temporada']
+    )
+
+
+def recalcular_estatisticas(monitor_ids=None):
+    """Reconstrói as estatísticas dos monitores informados (ou de todos)."""
+    monitores = CustomUser.objects.filter(user_type='monitor')
+    if monitor_ids is not None:
+        monitores = monitores.filter(id__in=monitor_ids)
+    ids = list(monitores.values_list('id', flat=True))
+
+    contagens = {
+        linha['monitor_id']: linha
+        for linha in InteresseTemporada.objects.filter(monitor_id__in=ids)
+        .values('monitor_id')
+        .annotate(
+            participacoes=Count('id', filter=Q(status='confirmado')),
+            pendentes=Count('id', filter=Q(status='interessado')),
+        )
+        .order_by()
+    }
+
+    # Dias e ganhos vêm do livro de pagamentos, completado antes com o que faltar
+    lancamentos.lancar_pendentes(ids)
+    trabalho = {
+        grupo['monitor_id']: grupo
+        for grupo in lancamentos.somas_lancamentos(LancamentoPagamento.objects.filter(monitor_id__in=ids), 'monitor_id')
+    }
+
+    ultimas = _ultima_temporada(ids)
+    vazio = {'quantidade': 0, 'numero_diarias': Decimal('0'), 'total': Decimal('0')}
+    linhas = [
+        EstatisticaMonitor(
+            monitor_id=monitor_id,
+            participacoes=contagens.get(monitor_id, {}).get('participacoes', 0),
+            interesses_pendentes=contagens.get(monitor_id, {}).get('pendentes', 0),
+            temporadas_concluidas=trabalho.get(monitor_id, vazio)['quantidade'],
+            dias_trabalhados=trabalho.get(monitor_id, vazio)['numero_diarias'],
+            ganhos_totais=trabalho.get(monitor_id, vazio)['total'],
+            ultima_temporada=ultimas[monitor_id],
+        )
+        for monitor_id in ids
+    ]
+    with transaction.atomic():
+        EstatisticaMonitor.objects.filter(monitor_id__in=ids).delete()
+        EstatisticaMonitor.objects.bulk_create(linhas, batch_size=500)
+    return len(linhas)
@@ -0,0 +1,161 @@
+"""Folha de pagamento dos monitores por período ou conjunto de temporadas.
+
+Participações concluídas vêm do livro de pagamentos (``lancamentos``), com os
+valores congelados na conclusão. As demais (pendentes/confirmadas) são
+calculadas com ``pagamentos.somas_por_grupo``. As duas partes são somadas
+por monitor no banco e juntadas aqui. O resultado de cada filtro fica em
+cache com chave versionada (``cache.chave_folha``), invalidada pelos sinais de
+equipe, temporadas, valores, ajudas de custo e usuários. A exportação em CSV
+é enviada linha a linha.
+"""
+import csv
+import hashlib
+from decimal import Decimal
+
+from django.core.cache import cache
+from django.http import StreamingHttpResponse
+from django.utils import timezone
+
+from core.exportacao import Eco, texto_seguro
+from core.models import CATEGORIA_CHOICES
+from .cache import TIMEOUT_FOLHA, chave_folha
+from .lancamentos import STATUS_LANCADO, lancamentos_do_periodo, somas_lancamentos
+from .models import TemporadaEquipe
+from .pagamentos import somas_por_grupo
+
+STATUS_FOLHA = ('confirmado', 'concluido')
+
+# Ordem de agrupamento: nome primeiro para a listagem sair em ordem alfabética
+CAMPOS_MONITOR = (
+    'monitor__first_name', 'monitor__last_name', 'monitor__username', 'monitor_id',
+    'monitor__cpf', 'monitor__categoria',
+)
+SOMAS = ('quantidade', 'numero_diarias', 'ajuda', 'embarque', 'desembarque', 'total')
+
+COLUNAS_CSV = (
+    'Usuário', 'Nome', 'CPF', 'Categoria', 'Temporadas', 'Diárias',
+    'Ajuda de custo', 'Embarque', 'Desembarque', 'Total',
+)
+
+_CATEGORIAS = dict(CATEGORIA_CHOICES)
+
+
+def equipe_da_folha(inicio=None, fim=None, temporadas=None, status=STATUS_FOLHA):
+    """Participações pelo início da temporada no período e/ou nas temporadas escolhidas."""
+    equipe = TemporadaEquipe.objects.filter(status__in=status)
+    if inicio:
+        equipe = equipe.filter(temporada__data_inicio__gte=inicio)
+    if fim:
+        equipe = equipe.filter(temporada__data_inicio__lte=fim)
+    if temporadas:
+        equipe = equipe.filter(temporada_id__in=temporadas)
+    return equipe
+
+
+def _assinatura(inicio, fim, temporadas, status):
+    partes = [
+        str(inicio or ''),
+        str(fim or ''),
+        ','.join(str(t) for t in sorted(temporadas or [])),
+        ','.join(sorted(status)),
+    ]
+    return hashlib.sha256('|'.join(partes).encode()).hexdigest()[:32]
+
+
+def _linha_monitor(grupo):
+    # Lançamentos de usuários excluídos ficam sem monitor
+    username = grupo['monitor__username'] or 'Usuário excluído'
+    nome = f"{grupo['monitor__first_name'] or ''} {grupo['monitor__last_name'] or ''}".strip()
+    return {
+        'monitor_id': grupo['monitor_id'],
+        'username': username,
+        'nome': nome or username,
+        'cpf': grupo['monitor__cpf'] or '',
+        'categoria': _CATEGORIAS.get(grupo['monitor__categoria'], grupo['monitor__categoria'] or ''),
+        **{campo: grupo[campo] for campo in SOMAS},
+    }
+
+
+def _ordem(grupo):
+    return tuple(grupo[campo] or '' for campo in CAMPOS_MONITOR[:3]) + (grupo['monitor_id'] or 0,)
+
+
+def _grupos(inicio=None, fim=None, temporadas=None, status=STATUS_FOLHA):
+    """Somas por monitor: livro para os concluídos, cálculo atual para os demais status."""
+    fontes = []
+    em_aberto = [s for s in status if s != STATUS_LANCADO]
+    if em_aberto:
+        fontes.append(somas_por_grupo(equipe_da_folha(inicio, fim, temporadas, em_aberto), *CAMPOS_MONITOR))
+    if STATUS_LANCADO in status:
+        fontes.append(somas_lancamentos(lancamentos_do_periodo(inicio, fim, temporadas), *CAMPOS_MONITOR))
+
+    grupos = {}
+    for fonte in fontes:
+        for grupo in fonte.iterator(chunk_size=500):
+            if not grupo['quantidade'] and not grupo['total']:
+                continue  # lançamentos totalmente estornados
+            atual = grupos.get(grupo['monitor_id'])
+            if atual is None:
+                grupos[grupo['monitor_id']] = dict(grupo)
+            else:
+                for campo in SOMAS:
+                    atual[campo] += grupo[campo]
+    return sorted(grupos.values(), key=_ordem)
+
+
+def resumo_folha(inicio=None, fim=None, temporadas=None, status=STATUS_FOLHA):
+    """``{'monitores': [...], 'totais': {...}}`` do filtro, em cache até a próxima alteração."""
+    chave = chave_folha(_assinatura(inicio, fim, temporadas, status))
+    resumo = cache.get(chave)
+    if resumo is None:
+        monitores = [_linha_monitor(grupo) for grupo in _grupos(inicio, fim, temporadas, status)]
+        totais = {campo: sum((linha[campo] for linha in monitores), Decimal('0')) for campo in SOMAS}
+        totais['monitores'] = len(monitores)
+        resumo = {'monitores': monitores, 'totais': totais}
+        cache.set(chave, resumo, TIMEOUT_FOLHA)
+    return resumo
+
+
+def _decimal_br(valor):
+    return f'{valor:.2f}'.replace('.', ',')
+
+
+def _diarias_br(valor):
+    # 2,50 -> 2,5 e 3,00 -> 3
+    return _decimal_br(valor).rstrip('0').rstrip(',')
+
+
+def linhas_csv(**filtros):
+    """Cabeçalho, uma linha por monitor e a linha de total."""
+    yield COLUNAS_CSV
+    totais = dict.fromkeys(SOMAS, Decimal('0'))
+    for grupo in _grupos(**filtros):
+        linha = _linha_monitor(grupo)
+        for campo in SOMAS:
+            totais[campo] += linha[campo]
+        yield (
+            *(texto_seguro(linha[campo]) for campo in ('username', 'nome', 'cpf', 'categoria')),
+            linha['quantidade'],
+            _diarias_br(linha['numero_diarias']),
+            *(_decimal_br(linha[campo]) for campo in ('ajuda', 'embarque', 'desembarque', 'total')),
+        )
+    yield (
+        'TOTAL', '', '', '', totais['quantidade'],
+        _diarias_br(totais['numero_diarias']),
+        *(_decimal_br(totais[campo]) for campo in ('ajuda', 'embarque', 'desembarque', 'total')),
+    )
+
+
+def resposta_csv(**filtros):
+    # Ponto e vírgula e vírgula decimal: o formato que o Excel em português abre direto
+    escritor = csv.writer(Eco(), delimiter=';')
+
+    def conteudo():
+        yield '\ufeff'  # BOM para o Excel reconhecer UTF-8
+        for linha in linhas_csv(**filtros):
+            yield escritor.writerow(linha)
+
+    resposta = StreamingHttpResponse(conteudo(), content_type='text/csv; charset=utf-8')
+    nome = f'folha_pagamento_{timezone.localtime():%Y%m%d_%H%M}.csv'
+    resposta['Content-Disposition'] = f'attachment; filename="{nome}"'
+    return resposta
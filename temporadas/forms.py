@@ -1,6 +1,6 @@
 from django import forms
 from decimal import Decimal, InvalidOperation
-from .models import Temporada, ConfiguracaoValores, AjudaCustoClasse
+from .models import CATEGORIAS_VALOR, STATUS_EQUIPE, AjudaCustoClasse, Temporada, ValorDiaria
 
 
 class TemporadaForm(forms.ModelForm):
@@ -62,16 +62,73 @@ class TemporadaForm(forms.ModelForm):
         return cleaned
 
 
-class ConfiguracaoValoresForm(forms.ModelForm):
-    class Meta:
-        model = ConfiguracaoValores
-        fields = [
-            'conselheiro_senior', 'conselheiro', 'monitor', 'monitor_junior', 'estagiario',
-            'day_camp', 'enfermeira', 'enfermeira_estagiaria', 'fotografo_1', 'fotografo_2'
-        ]
+class ValoresDiariaForm(forms.Form):
+    """Novos valores de diária a partir de uma data; só as categorias alteradas ganham nova vigência."""
+
+    vigente_desde = forms.DateField(
+        label='Vigente a partir de',
+        widget=forms.DateInput(attrs={'type': 'date', 'class': 'form-control'}),
+        help_text='Temporadas que começam nesta data ou depois usam os novos valores.',
+    )
+
+    def __init__(self, *args, tabela, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.tabela = tabela
+        for categoria, rotulo in CATEGORIAS_VALOR:
+            self.fields[categoria] = forms.DecimalField(
+                label=rotulo, max_digits=8, decimal_places=2, min_value=0,
+                widget=forms.NumberInput(attrs={'class': 'form-control', 'step': '0.01'}),
+            )
+
+    def salvar(self):
+        """Grava as vigências que mudam o valor em ``vigente_desde``; retorna quantas."""
+        desde = self.cleaned_data['vigente_desde']
+        alteradas = 0
+        for categoria, _ in CATEGORIAS_VALOR:
+            valor = self.cleaned_data[categoria]
+            if valor == self.tabela.valor(categoria, desde):
+                continue
+            ValorDiaria.objects.update_or_create(categoria=categoria, vigente_desde=desde, defaults={'valor': valor})
+            alteradas += 1
+        return alteradas
 
 
 class AjudaCustoClasseForm(forms.ModelForm):
     class Meta:
         model = AjudaCustoClasse
         fields = ['nome', 'valor']
+
+
+class FolhaPagamentoForm(forms.Form):
+    """Filtros do relatório de folha: período pelo início da temporada e/ou temporadas específicas."""
+
+    inicio = forms.DateField(required=False, label='De', widget=forms.DateInput(attrs={'type': 'date', 'class': 'form-control'}))
+    fim = forms.DateField(required=False, label='Até', widget=forms.DateInput(attrs={'type': 'date', 'class': 'form-control'}))
+    temporadas = forms.ModelMultipleChoiceField(
+        queryset=Temporada.objects.order_by('-data_inicio'),
+        required=False,
+        widget=forms.SelectMultiple(attrs={'class': 'form-select', 'size': 6}),
+    )
+    status = forms.MultipleChoiceField(
+        choices=STATUS_EQUIPE,
+        required=False,
+        widget=forms.CheckboxSelectMultiple,
+        help_text='Sem seleção, considera confirmados e concluídos.',
+    )
+
+    def clean(self):
+        cleaned = super().clean()
+        inicio, fim = cleaned.get('inicio'), cleaned.get('fim')
+        if inicio and fim and inicio > fim:
+            raise forms.ValidationError('A data inicial deve ser anterior à final.')
+        return cleaned
+
+    def filtros(self):
+        """Argumentos para ``folha.resumo_folha`` / ``folha.resposta_csv``."""
+        from .folha import STATUS_FOLHA
+        return {
+            'inicio': self.cleaned_data['inicio'],
+            'fim': self.cleaned_data['fim'],
+            'temporadas': [t.id for t in self.cleaned_data['temporadas']],
+            'status': tuple(self.cleaned_data['status']) or STATUS_FOLHA,
+        }
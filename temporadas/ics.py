@@ -0,0 +1,109 @@
+"""Geração do feed iCalendar (RFC 5545) das temporadas confirmadas de um monitor."""
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.core import signing
+from django.utils.crypto import constant_time_compare, salted_hmac
+
+from core.models import CustomUser
+
+SALT_TOKEN_ICS = 'temporadas.calendario-ics'
+
+
+def _segredo(pk, senha):
+    """Derivado do hash da senha, como nos links de redefinição do Django."""
+    return salted_hmac(SALT_TOKEN_ICS, f'{pk}:{senha}').hexdigest()[:20]
+
+
+def token_calendario(user):
+    """Token assinado que identifica o monitor no link de assinatura.
+
+    Trocar a senha muda o segredo e revoga os links já distribuídos.
+    """
+    return signing.Signer(salt=SALT_TOKEN_ICS).sign(f'{user.pk}:{_segredo(user.pk, user.password)}')
+
+
+def monitor_id_do_token(token):
+    """Retorna o id do monitor ou ``None`` se o token não for válido ou o usuário estiver inativo."""
+    try:
+        pk, segredo = signing.Signer(salt=SALT_TOKEN_ICS).unsign(token).split(':')
+        pk = int(pk)
+    except (signing.BadSignature, ValueError):
+        return None
+    senha = CustomUser.objects.filter(pk=pk, is_active=True).values_list('password', flat=True).first()
+    if senha is None or not constant_time_compare(segredo, _segredo(pk, senha)):
+        return None
+    return pk
+
+
+def _escapar(texto):
+    return (
+        str(texto or '')
+        .replace('\\', '\\\\')
+        .replace(';', '\\;')
+        .replace(',', '\\,')
+        .replace('\r\n', '\\n')
+        .replace('\n', '\\n')
+    )
+
+
+def _dobrar(linha):
+    """Quebra linhas com mais de 75 octetos, como exige a RFC 5545."""
+    dados = linha.encode('utf-8')
+    if len(dados) <= 75:
+        return linha
+    partes = []
+    atual = ''
+    limite = 75
+    for caractere in linha:
+        if len((atual + caractere).encode('utf-8')) > limite:
+            partes.append(atual)
+            atual = ''
+            limite = 74  # a continuação começa com um espaço
+        atual += caractere
+    partes.append(atual)
+    return '\r\n '.join(partes)
+
+
+def _utc(momento):
+    return momento.astimezone(dt_timezone.utc).strftime('%Y%m%dT%H%M%SZ')
+
+
+def gerar_ics(temporadas):
+    """Monta o VCALENDAR a partir de dicionários vindos de ``.values()``.
+
+    Com horário de chegada/saída da equipe o evento usa hora local
+    (flutuante); sem eles, vira um evento de dia inteiro.
+    """
+    linhas = [
+        'BEGIN:VCALENDAR',
+        'VERSION:2.0',
+        'PRODID:-//Ferramenta Paiol//Temporadas//PT-BR',
+        'CALSCALE:GREGORIAN',
+        'METHOD:PUBLISH',
+        'X-WR-CALNAME:Minhas temporadas',
+    ]
+    for t in temporadas:
+        if t['hora_chegada_equipe'] and t['hora_saida_equipe']:
+            inicio = datetime.combine(t['data_inicio'], t['hora_chegada_equipe']).strftime('%Y%m%dT%H%M%S')
+            fim = datetime.combine(t['data_fim'], t['hora_saida_equipe']).strftime('%Y%m%dT%H%M%S')
+            dtstart, dtend = f'DTSTART:{inicio}', f'DTEND:{fim}'
+        else:
+            dtstart = f"DTSTART;VALUE=DATE:{t['data_inicio']:%Y%m%d}"
+            dtend = f"DTEND;VALUE=DATE:{t['data_fim'] + timedelta(days=1):%Y%m%d}"
+
+        descricao = f"Tipo: {t['tipo_display']}"
+        if t['cliente']:
+            descricao += f"\nCliente: {t['cliente']}"
+        linhas += [
+            'BEGIN:VEVENT',
+            f"UID:temporada-{t['id']}@ferramenta-paiol",
+            f"DTSTAMP:{_utc(t['atualizado_em'])}",
+            f"LAST-MODIFIED:{_utc(t['atualizado_em'])}",
+            dtstart,
+            dtend,
+            f"SUMMARY:{_escapar(t['nome'])}",
+            f"DESCRIPTION:{_escapar(descricao)}",
+            'END:VEVENT',
+        ]
+    linhas.append('END:VCALENDAR')
+    return '\r\n'.join(_dobrar(linha) for linha in linhas) + '\r\n'
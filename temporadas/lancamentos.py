@@ -0,0 +1,178 @@
+"""Livro de pagamentos das participações concluídas (``LancamentoPagamento``).
+
+``equipe_alterada`` é chamado pelos sinais de ``TemporadaEquipe``: quando
+a participação entra em ``concluido``, grava um lançamento com os valores de
+``calcular_pagamento`` daquele momento. Quando sai de ``concluido`` ou é
+excluída, grava um estorno com o saldo negativo. O livro nunca é alterado.
+``somas_lancamentos`` soma o livro por período e temporadas usando os índices
+de ``data_inicio``, sem refazer o cálculo.
+
+``ciclo`` é o número de estornos anteriores da participação: um lançamento e
+o seu estorno compartilham o ciclo, e a restrição única de
+(``membro``, ``tipo``, ``ciclo``) impede que a mesma conclusão seja lançada
+ou estornada duas vezes.
+"""
+from django.db.models import Case, Count, Exists, IntegerField, OuterRef, Subquery, Sum, Value, When
+from django.db.models.functions import Coalesce
+
+from .cache import invalidar_folha
+from .models import LancamentoPagamento, Temporada, TemporadaEquipe
+from .pagamentos import DIARIAS, DINHEIRO, ZERO, calcular_pagamento, tabela_valores
+
+STATUS_LANCADO = 'concluido'
+VALORES = ('numero_diarias', 'ajuda', 'embarque', 'desembarque', 'total')
+TAMANHO_LOTE = 500
+
+
+def _somas():
+    return {
+        # Estornos descontam a participação da contagem
+        'quantidade': Coalesce(
+            Sum(Case(When(tipo='estorno', then=Value(-1)), default=Value(1), output_field=IntegerField())), Value(0)
+        ),
+        'numero_diarias': Coalesce(Sum('numero_diarias'), Value(ZERO), output_field=DIARIAS),
+        **{
+            campo: Coalesce(Sum(campo), Value(ZERO), output_field=DINHEIRO)
+            for campo in ('ajuda', 'embarque', 'desembarque', 'total')
+        },
+    }
+
+
+def lancamentos_do_periodo(inicio=None, fim=None, temporadas=None):
+    lancamentos = LancamentoPagamento.objects.all()
+    if inicio:
+        lancamentos = lancamentos.filter(data_inicio__gte=inicio)
+    if fim:
+        lancamentos = lancamentos.filter(data_inicio__lte=fim)
+    if temporadas:
+        lancamentos = lancamentos.filter(temporada_id__in=temporadas)
+    return lancamentos
+
+
+def somas_lancamentos(lancamentos, *agrupar_por):
+    """Saldo do livro: dict sem ``agrupar_por``, senão queryset de ``values`` por grupo."""
+    if not agrupar_por:
+        return lancamentos.aggregate(**_somas())
+    return lancamentos.values(*agrupar_por).annotate(**_somas()).order_by(*agrupar_por)
+
+
+def _estornos_anteriores(membro_ids):
+    estornos = LancamentoPagamento.objects.filter(membro_id__in=membro_ids, tipo='estorno')
+    return dict(estornos.values('membro_id').annotate(n=Count('id')).values_list('membro_id', 'n').order_by())
+
+
+def _novo_lancamento(membro, tabela=None, ciclo=0):
+    pagamento = calcular_pagamento(membro, tabela)
+    temporada = membro.temporada
+    return LancamentoPagamento(
+        membro=membro,
+        ciclo=ciclo,
+        monitor_id=membro.monitor_id,
+        temporada_id=membro.temporada_id,
+        data_inicio=Temporada._meta.get_field('data_inicio').to_python(temporada.data_inicio),
+        tipo_temporada=temporada.tipo,
+        categoria=membro.monitor.categoria or '',
+        valor_diaria=pagamento['valor_diaria'],
+        **{campo: pagamento[campo] for campo in VALORES},
+    )
+
+
+def lancar(membro):
+    lancamento = _novo_lancamento(membro, ciclo=_estornos_anteriores([membro.pk]).get(membro.pk, 0))
+    lancamento.save()
+    return lancamento
+
+
+def _estorno(membro, saldo, ultimo, removido=False):
+    if not saldo or saldo['quantidade'] <= 0 or ultimo is None:
+        return None
+    return LancamentoPagamento(
+        tipo='estorno',
+        # Na exclusão o vínculo fica vazio: a participação não existirá mais
+        membro=None if removido else membro,
+        ciclo=ultimo.ciclo,
+        monitor_id=membro.monitor_id,
+        temporada_id=membro.temporada_id,
+        data_inicio=ultimo.data_inicio,
+        tipo_temporada=ultimo.tipo_temporada,
+        categoria=ultimo.categoria,
+        valor_diaria=ultimo.valor_diaria,
+        **{campo: -saldo[campo] for campo in VALORES},
+    )
+
+
+def estornar(membro, removido=False):
+    """Estorna o saldo da participação; ``None`` se não houver saldo."""
+    lancamentos = LancamentoPagamento.objects.filter(membro_id=membro.pk)
+    estorno = _estorno(
+        membro, somas_lancamentos(lancamentos), lancamentos.filter(tipo='lancamento').last(), removido=removido
+    )
+    if estorno is not None:
+        estorno.save()
+    return estorno
+
+
+def equipe_alterada(membro, removido=False):
+    """Lança ou estorna conforme a mudança de status; retorna o registro gravado, se houver."""
+    antes = getattr(membro, '_status_original', None)
+    depois = None if removido else membro.status
+    if depois == STATUS_LANCADO and antes != STATUS_LANCADO:
+        return lancar(membro)
+    if antes == STATUS_LANCADO and depois != STATUS_LANCADO:
+        return estornar(membro, removido=removido)
+    return None
+
+
+def equipes_alteradas_em_lote(membros):
+    """Equivalente a ``equipe_alterada`` para participações gravadas com ``bulk_update``.
+
+    Usa um ``bulk_create`` para os lançamentos e outro para os estornos;
+    retorna ``{membro_id: registro}``.
+    """
+    concluidos = [m for m in membros if m.status == STATUS_LANCADO and getattr(m, '_status_original', None) != STATUS_LANCADO]
+    reabertos = [m for m in membros if getattr(m, '_status_original', None) == STATUS_LANCADO and m.status != STATUS_LANCADO]
+    novos = []
+    if concluidos:
+        tabela = tabela_valores()
+        ciclos = _estornos_anteriores([membro.pk for membro in concluidos])
+        novos += [_novo_lancamento(membro, tabela, ciclos.get(membro.pk, 0)) for membro in concluidos]
+    if reabertos:
+        ids = [membro.pk for membro in reabertos]
+        lancamentos = LancamentoPagamento.objects.filter(membro_id__in=ids)
+        saldos = {saldo['membro_id']: saldo for saldo in somas_lancamentos(lancamentos, 'membro_id')}
+        ultimos = {}
+        for lancamento in lancamentos.filter(tipo='lancamento').order_by('criado_em', 'id'):
+            ultimos[lancamento.membro_id] = lancamento
+        estornos = (_estorno(membro, saldos.get(membro.pk), ultimos.get(membro.pk)) for membro in reabertos)
+        novos += [estorno for estorno in estornos if estorno is not None]
+    return {registro.membro_id: registro for registro in LancamentoPagamento.objects.bulk_create(novos)} if novos else {}
+
+
+def lancar_pendentes(monitor_ids=None):
+    """Lança as participações concluídas sem saldo no livro (ex.: anteriores ao livro)."""
+    saldo_aberto = LancamentoPagamento.objects.filter(membro=OuterRef('pk')).values('membro').annotate(
+        quantidade=_somas()['quantidade']
+    ).filter(quantidade__gt=0)
+    pendentes = TemporadaEquipe.objects.filter(status=STATUS_LANCADO).exclude(Exists(saldo_aberto))
+    if monitor_ids is not None:
+        pendentes = pendentes.filter(monitor_id__in=monitor_ids)
+    estornos = LancamentoPagamento.objects.filter(membro=OuterRef('pk'), tipo='estorno').values('membro').annotate(
+        n=Count('id')
+    ).values('n')
+    pendentes = pendentes.annotate(ciclo=Coalesce(Subquery(estornos), Value(0))).select_related(
+        'temporada', 'monitor', 'ajuda_custo_classe'
+    ).order_by('id')
+
+    tabela = tabela_valores()
+    total = 0
+    lote = []
+    for membro in pendentes.iterator(chunk_size=TAMANHO_LOTE):
+        lote.append(_novo_lancamento(membro, tabela, membro.ciclo))
+        if len(lote) >= TAMANHO_LOTE:
+            total += len(LancamentoPagamento.objects.bulk_create(lote))
+            lote = []
+    if lote:
+        total += len(LancamentoPagamento.objects.bulk_create(lote))
+    if total:
+        invalidar_folha()
+    return total
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from temporadas.lancamentos import lancar_pendentes
+
+
+class Command(BaseCommand):
+    help = 'Grava no livro de pagamentos as participações concluídas que ainda não têm lançamento.'
+
+    def handle(self, *args, **options):
+        total = lancar_pendentes()
+        self.stdout.write(f'{total} lançamento(s) gravado(s).')
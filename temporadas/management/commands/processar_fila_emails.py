@@ -0,0 +1,34 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from temporadas.utils import processar_fila_emails
+
+
+class Command(BaseCommand):
+    help = 'Envia os e-mails pendentes da fila em lotes, reaproveitando a conexão SMTP.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--lote', type=int, default=100, help='Quantidade de e-mails por lote/conexão.')
+        parser.add_argument('--max-tentativas', type=int, default=5, help='Tentativas antes de marcar como falho.')
+        parser.add_argument('--backoff', type=int, default=60, help='Espera base (segundos) entre tentativas.')
+        parser.add_argument('--continuo', action='store_true', help='Permanece rodando e verifica a fila periodicamente.')
+        parser.add_argument('--intervalo', type=int, default=10, help='Segundos de espera com a fila vazia (modo contínuo).')
+
+    def handle(self, *args, **options):
+        while True:
+            resumo = processar_fila_emails(
+                lote=options['lote'],
+                max_tentativas=options['max_tentativas'],
+                backoff_segundos=options['backoff'],
+            )
+            processados = sum(resumo.values())
+            if processados:
+                self.stdout.write(
+                    f"Enviados: {resumo['enviados']} | Reagendados: {resumo['reagendados']} | Falhos: {resumo['falhos']}"
+                )
+                # Ainda pode haver itens aguardando: segue drenando sem esperar
+                continue
+            if not options['continuo']:
+                break
+            time.sleep(options['intervalo'])
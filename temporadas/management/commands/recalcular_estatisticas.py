@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from temporadas.estatisticas import recalcular_estatisticas
+
+
+class Command(BaseCommand):
+    help = 'Reconstrói do zero a tabela de estatísticas por monitor.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('monitor_ids', nargs='*', type=int, help='Limita o recálculo a estes monitores.')
+
+    def handle(self, *args, **options):
+        total = recalcular_estatisticas(options['monitor_ids'] or None)
+        self.stdout.write(f'Estatísticas recalculadas para {total} monitor(es).')
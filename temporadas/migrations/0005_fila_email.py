@@ -0,0 +1,41 @@
+# Generated by Django 5.1.7 on 2026-10-18 13:18
+
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('temporadas', '0004_extend_models'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='temporada',
+            name='monitores',
+            field=models.ManyToManyField(related_name='temporadas', through='temporadas.TemporadaEquipe', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.CreateModel(
+            name='FilaEmail',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('destinatario', models.EmailField(max_length=254)),
+                ('assunto', models.CharField(max_length=255)),
+                ('mensagem', models.TextField()),
+                ('status', models.CharField(choices=[('pendente', 'Pendente'), ('enviado', 'Enviado'), ('falhou', 'Falhou')], default='pendente', max_length=10)),
+                ('tentativas', models.PositiveSmallIntegerField(default=0)),
+                ('proxima_tentativa', models.DateTimeField(default=django.utils.timezone.now)),
+                ('ultimo_erro', models.TextField(blank=True)),
+                ('criado_em', models.DateTimeField(auto_now_add=True)),
+                ('enviado_em', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'verbose_name': 'E-mail na Fila',
+                'verbose_name_plural': 'Fila de E-mails',
+                'indexes': [models.Index(fields=['status', 'proxima_tentativa'], name='fila_email_pendentes_idx')],
+            },
+        ),
+    ]
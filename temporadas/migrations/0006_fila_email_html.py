@@ -0,0 +1,18 @@
+# Generated by Django 5.1.7 on 2026-10-18 13:19
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('temporadas', '0005_fila_email'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='filaemail',
+            name='mensagem_html',
+            field=models.TextField(blank=True),
+        ),
+    ]
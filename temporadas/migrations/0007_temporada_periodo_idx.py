@@ -0,0 +1,19 @@
+# Generated by Django 5.1.7 on 2026-10-18 13:20
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('temporadas', '0006_fila_email_html'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='temporada',
+            index=models.Index(fields=['data_inicio', 'data_fim'], name='temporada_periodo_idx'),
+        ),
+    ]
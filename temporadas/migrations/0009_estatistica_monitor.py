@@ -0,0 +1,32 @@
+# Generated by Django 5.1.7 on 2026-10-18 13:27
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0006_metrica_diaria'),
+        ('temporadas', '0008_atualizado_em'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EstatisticaMonitor',
+            fields=[
+                ('monitor', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='estatisticas', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('participacoes', models.IntegerField(db_index=True, default=0)),
+                ('interesses_pendentes', models.IntegerField(default=0)),
+                ('temporadas_concluidas', models.IntegerField(default=0)),
+                ('dias_trabalhados', models.DecimalField(decimal_places=1, default=0, max_digits=8)),
+                ('ganhos_totais', models.DecimalField(db_index=True, decimal_places=2, default=0, max_digits=12)),
+                ('ultima_temporada', models.DateField(blank=True, db_index=True, null=True)),
+            ],
+            options={
+                'verbose_name': 'Estatística do Monitor',
+                'verbose_name_plural': 'Estatísticas dos Monitores',
+            },
+        ),
+    ]
@@ -0,0 +1,69 @@
+# Generated by Django 5.1.7 on 2026-10-18 13:56
+
+import datetime
+
+from django.db import migrations, models
+
+CATEGORIAS = (
+    'conselheiro_senior', 'conselheiro', 'monitor', 'monitor_junior', 'estagiario',
+    'enfermeira', 'enfermeira_estagiaria', 'fotografo_1', 'fotografo_2', 'day_camp',
+)
+# A configuração antiga valia para todas as temporadas: a vigência copiada
+# começa antes de qualquer uma delas para os totais já calculados não mudarem
+VIGENCIA_INICIAL = datetime.date(2000, 1, 1)
+
+
+def copiar_configuracao(apps, schema_editor):
+    ConfiguracaoValores = apps.get_model('temporadas', 'ConfiguracaoValores')
+    ValorDiaria = apps.get_model('temporadas', 'ValorDiaria')
+    config = ConfiguracaoValores.objects.order_by('-atualizado_em').first()
+    if config is None:
+        return
+    ValorDiaria.objects.bulk_create([
+        ValorDiaria(categoria=categoria, valor=getattr(config, categoria), vigente_desde=VIGENCIA_INICIAL)
+        for categoria in CATEGORIAS
+    ])
+
+
+def restaurar_configuracao(apps, schema_editor):
+    ConfiguracaoValores = apps.get_model('temporadas', 'ConfiguracaoValores')
+    ValorDiaria = apps.get_model('temporadas', 'ValorDiaria')
+    valores = {}
+    for vigencia in ValorDiaria.objects.order_by('vigente_desde'):
+        valores[vigencia.categoria] = vigencia.valor
+    if valores:
+        ConfiguracaoValores.objects.create(**valores)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('temporadas', '0009_estatistica_monitor'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ValorDiaria',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('categoria', models.CharField(choices=[('conselheiro_senior', 'Conselheiro Senior'), ('conselheiro', 'Conselheiro'), ('monitor', 'Monitor'), ('monitor_junior', 'Monitor Junior'), ('estagiario', 'Estagiário'), ('enfermeira', 'Enfermeira'), ('enfermeira_estagiaria', 'Enfermeira Estagiária'), ('fotografo_1', 'Fotógrafo 1'), ('fotografo_2', 'Fotógrafo 2'), ('day_camp', 'Day Camp (Day Use)')], max_length=30)),
+                ('valor', models.DecimalField(decimal_places=2, max_digits=8)),
+                ('vigente_desde', models.DateField()),
+                ('criado_em', models.DateTimeField(auto_now_add=True)),
+                ('atualizado_em', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Valor de Diária',
+                'verbose_name_plural': 'Valores de Diária',
+                'ordering': ['categoria', '-vigente_desde'],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='valordiaria',
+            constraint=models.UniqueConstraint(fields=('categoria', 'vigente_desde'), name='valor_diaria_vigencia_unica'),
+        ),
+        migrations.RunPython(copiar_configuracao, restaurar_configuracao),
+        migrations.DeleteModel(
+            name='ConfiguracaoValores',
+        ),
+    ]
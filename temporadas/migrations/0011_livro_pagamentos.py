@@ -0,0 +1,42 @@
+# Generated by Django 5.1.7 on 2026-10-18 13:59
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('temporadas', '0010_valores_diaria_vigencia'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LancamentoPagamento',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('tipo', models.CharField(choices=[('lancamento', 'Lançamento'), ('estorno', 'Estorno')], default='lancamento', max_length=10)),
+                ('data_inicio', models.DateField()),
+                ('tipo_temporada', models.CharField(choices=[('escola', 'Escola'), ('dayuse', 'Day Use'), ('familia', 'Família'), ('ferias', 'Férias'), ('evento', 'Evento Especial')], max_length=20)),
+                ('categoria', models.CharField(blank=True, max_length=30)),
+                ('valor_diaria', models.DecimalField(decimal_places=2, max_digits=8)),
+                ('numero_diarias', models.DecimalField(decimal_places=1, max_digits=6)),
+                ('ajuda', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('embarque', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('desembarque', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('total', models.DecimalField(decimal_places=2, max_digits=12)),
+                ('criado_em', models.DateTimeField(auto_now_add=True)),
+                ('membro', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='lancamentos', to='temporadas.temporadaequipe')),
+                ('monitor', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='lancamentos_pagamento', to=settings.AUTH_USER_MODEL)),
+                ('temporada', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='lancamentos', to='temporadas.temporada')),
+            ],
+            options={
+                'verbose_name': 'Lançamento de Pagamento',
+                'verbose_name_plural': 'Lançamentos de Pagamento',
+                'ordering': ['criado_em', 'id'],
+                'indexes': [models.Index(fields=['data_inicio'], name='lancamento_data_idx'), models.Index(fields=['monitor', 'data_inicio'], name='lancamento_monitor_data_idx')],
+            },
+        ),
+    ]
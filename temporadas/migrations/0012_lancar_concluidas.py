@@ -0,0 +1,78 @@
+from decimal import Decimal
+
+from django.db import migrations
+
+ZERO = Decimal('0')
+TAMANHO_LOTE = 500
+
+
+def lancar_concluidas(apps, schema_editor):
+    """Lança no livro as participações já concluídas antes dele existir.
+
+    Repete as regras de ``pagamentos.calcular_pagamento`` com os modelos
+    históricos: migrações não importam o código do app.
+    """
+    TemporadaEquipe = apps.get_model('temporadas', 'TemporadaEquipe')
+    ValorDiaria = apps.get_model('temporadas', 'ValorDiaria')
+    LancamentoPagamento = apps.get_model('temporadas', 'LancamentoPagamento')
+
+    vigencias = {}
+    for categoria, desde, valor in ValorDiaria.objects.order_by('vigente_desde').values_list(
+        'categoria', 'vigente_desde', 'valor'
+    ):
+        vigencias.setdefault(categoria, []).append((desde, valor))
+
+    def valor_diaria(categoria, data):
+        valor = ZERO
+        for desde, vigente in vigencias.get(categoria, []):
+            if desde > data:
+                break
+            valor = vigente
+        return valor
+
+    concluidas = (
+        TemporadaEquipe.objects.filter(status='concluido', lancamentos__isnull=True)
+        .select_related('temporada', 'monitor', 'ajuda_custo_classe')
+        .order_by('id')
+    )
+    lote = []
+    for membro in concluidas.iterator(chunk_size=TAMANHO_LOTE):
+        temporada = membro.temporada
+        categoria = 'day_camp' if temporada.tipo == 'dayuse' else membro.monitor.categoria
+        diaria = valor_diaria(categoria, temporada.data_inicio)
+        diarias = temporada.numero_diarias or ZERO
+        ajuda = membro.ajuda_custo_classe.valor if (membro.recebe_ajuda_custo and membro.ajuda_custo_classe) else ZERO
+        embarque = membro.valor_embarque_especial or ZERO
+        desembarque = membro.valor_desembarque_especial or ZERO
+        lote.append(LancamentoPagamento(
+            membro=membro,
+            monitor_id=membro.monitor_id,
+            temporada_id=membro.temporada_id,
+            data_inicio=temporada.data_inicio,
+            tipo_temporada=temporada.tipo,
+            categoria=membro.monitor.categoria or '',
+            valor_diaria=diaria,
+            numero_diarias=diarias,
+            ajuda=ajuda,
+            embarque=embarque,
+            desembarque=desembarque,
+            total=(diaria * diarias) + ajuda + embarque + desembarque,
+        ))
+        if len(lote) >= TAMANHO_LOTE:
+            LancamentoPagamento.objects.bulk_create(lote)
+            lote = []
+    if lote:
+        LancamentoPagamento.objects.bulk_create(lote)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0005_categoria_ajuda_fk'),
+        ('temporadas', '0011_livro_pagamentos'),
+    ]
+
+    operations = [
+        # Desfazer só precisa reverter 0011, que apaga a tabela inteira
+        migrations.RunPython(lancar_concluidas, migrations.RunPython.noop),
+    ]
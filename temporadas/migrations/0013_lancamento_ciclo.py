@@ -0,0 +1,40 @@
+# Generated by Django 5.1.7 on 2026-10-18 14:20
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+def numerar_ciclos(apps, schema_editor):
+    """Ciclo de cada registro existente: estornos anteriores do mesmo membro."""
+    LancamentoPagamento = apps.get_model('temporadas', 'LancamentoPagamento')
+    estornos = {}
+    alterados = []
+    registros = LancamentoPagamento.objects.filter(membro__isnull=False).order_by('criado_em', 'id')
+    for registro in registros.iterator(chunk_size=500):
+        registro.ciclo = estornos.get(registro.membro_id, 0)
+        if registro.tipo == 'estorno':
+            estornos[registro.membro_id] = registro.ciclo + 1
+        if registro.ciclo:
+            alterados.append(registro)
+    LancamentoPagamento.objects.bulk_update(alterados, ['ciclo'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('temporadas', '0012_lancar_concluidas'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='lancamentopagamento',
+            name='ciclo',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(numerar_ciclos, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='lancamentopagamento',
+            constraint=models.UniqueConstraint(fields=('membro', 'tipo', 'ciclo'), name='lancamento_ciclo_unico'),
+        ),
+    ]
@@ -1,5 +1,6 @@
 from django.db import models
-from core.models import CustomUser
+from django.utils import timezone
+from core.models import CATEGORIA_CHOICES, CustomUser
 
 # Tipos de temporada (Escola no topo)
 TIPO_TEMPORADA = (
@@ -11,28 +12,33 @@ TIPO_TEMPORADA = (
 )
 
 
-class ConfiguracaoValores(models.Model):
-    """Valores de diária por função, incluindo Day Camp (Day Use)."""
+# Categorias com valor de diária: as funções dos monitores mais o Day Camp,
+# usado em qualquer temporada do tipo Day Use
+CATEGORIAS_VALOR = CATEGORIA_CHOICES + (('day_camp', 'Day Camp (Day Use)'),)
+
+
+class ValorDiaria(models.Model):
+    """Valor da diária de uma categoria a partir de ``vigente_desde``.
+
+    Alterar um valor cria uma nova vigência em vez de sobrescrever a anterior:
+    cada temporada é paga com o valor vigente na sua data de início.
+    """
+    categoria = models.CharField(max_length=30, choices=CATEGORIAS_VALOR)
+    valor = models.DecimalField(max_digits=8, decimal_places=2)
+    vigente_desde = models.DateField()
     criado_em = models.DateTimeField(auto_now_add=True)
     atualizado_em = models.DateTimeField(auto_now=True)
 
-    conselheiro_senior = models.DecimalField(max_digits=8, decimal_places=2, default=0)
-    conselheiro = models.DecimalField(max_digits=8, decimal_places=2, default=0)
-    monitor = models.DecimalField(max_digits=8, decimal_places=2, default=0)
-    monitor_junior = models.DecimalField(max_digits=8, decimal_places=2, default=0)
-    estagiario = models.DecimalField(max_digits=8, decimal_places=2, default=0)
-    day_camp = models.DecimalField(max_digits=8, decimal_places=2, default=0, help_text='Valor usado para tipo Day Use')
-    enfermeira = models.DecimalField(max_digits=8, decimal_places=2, default=0)
-    enfermeira_estagiaria = models.DecimalField(max_digits=8, decimal_places=2, default=0)
-    fotografo_1 = models.DecimalField(max_digits=8, decimal_places=2, default=0)
-    fotografo_2 = models.DecimalField(max_digits=8, decimal_places=2, default=0)
-
     class Meta:
-        verbose_name = 'Configuração de Valores'
-        verbose_name_plural = 'Configurações de Valores'
+        verbose_name = 'Valor de Diária'
+        verbose_name_plural = 'Valores de Diária'
+        ordering = ['categoria', '-vigente_desde']
+        constraints = [
+            models.UniqueConstraint(fields=['categoria', 'vigente_desde'], name='valor_diaria_vigencia_unica'),
+        ]
 
     def __str__(self):
-        return f"Configuração #{self.id} - {self.atualizado_em:%d/%m/%Y}"
+        return f"{self.get_categoria_display()} - R$ {self.valor} desde {self.vigente_desde:%d/%m/%Y}"
 
 
 class AjudaCustoClasse(models.Model):
@@ -62,6 +68,12 @@ class Temporada(models.Model):
 
     # Equipe (monitores) da temporada
     monitores = models.ManyToManyField(CustomUser, through='TemporadaEquipe', related_name='temporadas')
+    atualizado_em = models.DateTimeField(auto_now=True, db_index=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['data_inicio', 'data_fim'], name='temporada_periodo_idx'),
+        ]
 
     def __str__(self):
         return f"{self.nome} ({self.data_inicio} - {self.data_fim})"
@@ -80,6 +92,7 @@ class InteresseTemporada(models.Model):
     temporada = models.ForeignKey(Temporada, on_delete=models.CASCADE)
     status = models.CharField(max_length=20, choices=STATUS_INTERESSE, default='interessado')
     data_interesse = models.DateTimeField(auto_now_add=True)
+    atualizado_em = models.DateTimeField(auto_now=True)
 
     class Meta:
         unique_together = ('monitor', 'temporada')
@@ -87,6 +100,13 @@ class InteresseTemporada(models.Model):
     def __str__(self):
         return f"{self.monitor.username} - {self.temporada.nome} ({self.status})"
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Status lido do banco, usado para atualizar EstatisticaMonitor por diferença
+        instance._status_original = dict(zip(field_names, values)).get('status')
+        return instance
+
 
 STATUS_EQUIPE = (
     ('pendente', 'Pendente'),
@@ -109,9 +129,133 @@ class TemporadaEquipe(models.Model):
     recebe_desembarque = models.BooleanField(default=False)
     valor_desembarque_especial = models.DecimalField(max_digits=8, decimal_places=2, blank=True, null=True)
 
+    atualizado_em = models.DateTimeField(auto_now=True)
+
     class Meta:
         unique_together = ('temporada', 'monitor')
 
     def __str__(self):
         return f"{self.monitor.username} em {self.temporada.nome} ({self.get_status_display()})"
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._status_original = dict(zip(field_names, values)).get('status')
+        return instance
+
+
+class EstatisticaMonitor(models.Model):
+    """Contadores por monitor mantidos de forma incremental (ver ``estatisticas.py``).
+
+    Participações contam interesses confirmados; dias trabalhados e ganhos
+    somam as escalas concluídas. ``recalcular_estatisticas`` reconstrói tudo.
+    """
+    monitor = models.OneToOneField(CustomUser, on_delete=models.CASCADE, primary_key=True, related_name='estatisticas')
+    participacoes = models.IntegerField(default=0, db_index=True)
+    interesses_pendentes = models.IntegerField(default=0)
+    temporadas_concluidas = models.IntegerField(default=0)
+    dias_trabalhados = models.DecimalField(max_digits=8, decimal_places=1, default=0)
+    ganhos_totais = models.DecimalField(max_digits=12, decimal_places=2, default=0, db_index=True)
+    ultima_temporada = models.DateField(blank=True, null=True, db_index=True)
+
+    class Meta:
+        verbose_name = 'Estatística do Monitor'
+        verbose_name_plural = 'Estatísticas dos Monitores'
+
+    def __str__(self):
+        return f"Estatísticas de {self.monitor.username}"
+
+
+TIPOS_LANCAMENTO = (
+    ('lancamento', 'Lançamento'),
+    ('estorno', 'Estorno'),
+)
+
+
+class LancamentoPagamento(models.Model):
+    """Livro de pagamentos: o valor devido por cada participação concluída.
+
+    Só recebe inserções. Concluir uma ``TemporadaEquipe`` grava um
+    lançamento com os componentes calculados naquele momento; se ela deixar de
+    estar concluída (ou for excluída), entra um estorno com os mesmos valores
+    negativos. Relatórios históricos somam o livro e não mudam quando valores
+    de diária, ajudas ou a própria equipe são editados depois.
+    """
+    tipo = models.CharField(max_length=10, choices=TIPOS_LANCAMENTO, default='lancamento')
+    membro = models.ForeignKey(TemporadaEquipe, on_delete=models.SET_NULL, null=True, blank=True, related_name='lancamentos')
+    # Estornos anteriores do membro: o lançamento e o seu estorno têm o mesmo ciclo
+    ciclo = models.PositiveIntegerField(default=0)
+    monitor = models.ForeignKey(CustomUser, on_delete=models.SET_NULL, null=True, blank=True, related_name='lancamentos_pagamento')
+    temporada = models.ForeignKey(Temporada, on_delete=models.SET_NULL, null=True, blank=True, related_name='lancamentos')
+    # Cópias do momento do lançamento, para o registro sobreviver a edições e exclusões
+    data_inicio = models.DateField()
+    tipo_temporada = models.CharField(max_length=20, choices=TIPO_TEMPORADA)
+    categoria = models.CharField(max_length=30, blank=True)
+
+    valor_diaria = models.DecimalField(max_digits=8, decimal_places=2)
+    numero_diarias = models.DecimalField(max_digits=6, decimal_places=1)
+    ajuda = models.DecimalField(max_digits=10, decimal_places=2)
+    embarque = models.DecimalField(max_digits=10, decimal_places=2)
+    desembarque = models.DecimalField(max_digits=10, decimal_places=2)
+    total = models.DecimalField(max_digits=12, decimal_places=2)
+    criado_em = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        verbose_name = 'Lançamento de Pagamento'
+        verbose_name_plural = 'Lançamentos de Pagamento'
+        ordering = ['criado_em', 'id']
+        indexes = [
+            models.Index(fields=['data_inicio'], name='lancamento_data_idx'),
+            models.Index(fields=['monitor', 'data_inicio'], name='lancamento_monitor_data_idx'),
+        ]
+        constraints = [
+            # No máximo um lançamento em aberto (e um estorno dele) por participação
+            models.UniqueConstraint(fields=['membro', 'tipo', 'ciclo'], name='lancamento_ciclo_unico'),
+        ]
+
+    def __str__(self):
+        return f"{self.get_tipo_display()} de R$ {self.total} em {self.data_inicio:%d/%m/%Y}"
+
+    def save(self, *args, **kwargs):
+        if not self._state.adding:
+            raise ValueError('Lançamentos de pagamento não podem ser alterados; registre um estorno.')
+        super().save(*args, **kwargs)
+
+    def delete(self, *args, **kwargs):
+        raise ValueError('Lançamentos de pagamento não podem ser excluídos; registre um estorno.')
+
+
+
+STATUS_FILA_EMAIL = (
+    ('pendente', 'Pendente'),
+    ('enviado', 'Enviado'),
+    ('falhou', 'Falhou'),
+)
+
+
+class FilaEmail(models.Model):
+    """Caixa de saída persistente: uma linha por destinatário por mensagem.
+
+    As views apenas enfileiram; o comando ``processar_fila_emails`` drena a
+    fila em lotes reaproveitando uma única conexão SMTP.
+    """
+    destinatario = models.EmailField()
+    assunto = models.CharField(max_length=255)
+    mensagem = models.TextField()
+    mensagem_html = models.TextField(blank=True)
+    status = models.CharField(max_length=10, choices=STATUS_FILA_EMAIL, default='pendente')
+    tentativas = models.PositiveSmallIntegerField(default=0)
+    proxima_tentativa = models.DateTimeField(default=timezone.now)
+    ultimo_erro = models.TextField(blank=True)
+    criado_em = models.DateTimeField(auto_now_add=True)
+    enviado_em = models.DateTimeField(blank=True, null=True)
+
+    class Meta:
+        verbose_name = 'E-mail na Fila'
+        verbose_name_plural = 'Fila de E-mails'
+        indexes = [
+            models.Index(fields=['status', 'proxima_tentativa'], name='fila_email_pendentes_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.destinatario} - {self.assunto} ({self.get_status_display()})"
@@ -0,0 +1,181 @@
+"""Cálculo do pagamento de monitores por temporada.
+
+Os valores de diária são vigências (``ValorDiaria``): cada temporada usa o
+valor vigente na sua ``data_inicio``. ``tabela_valores`` mantém todas as
+vigências em memória no processo, associadas a uma versão no cache
+compartilhado que muda a cada alteração. Uma consulta rápida à versão decide
+se a tabela ainda vale, e os valores em si não voltam a ser lidos do banco.
+
+``anotar_pagamento`` calcula os componentes de qualquer queryset de
+``TemporadaEquipe`` em uma única consulta (``Case/When`` sobre a categoria do
+monitor, o tipo e a data de início da temporada); ``totais_pagamento`` soma
+os mesmos componentes, agrupados ou não. ``calcular_pagamento`` aplica as
+mesmas regras a uma instância já carregada.
+"""
+from bisect import bisect_right
+from decimal import Decimal
+
+from django.db.models import Case, Count, DecimalField, ExpressionWrapper, F, Q, Sum, Value, When
+from django.db.models.functions import Coalesce
+
+from .cache import versao_valores
+
+ZERO = Decimal('0')
+
+# Categoria de ValorDiaria usada em qualquer temporada Day Use
+CATEGORIA_DAY_USE = 'day_camp'
+
+COMPONENTES = ('valor_diaria', 'numero_diarias', 'ajuda', 'embarque', 'desembarque', 'total')
+
+DINHEIRO = DecimalField(max_digits=12, decimal_places=2)
+DIARIAS = DecimalField(max_digits=6, decimal_places=1)
+
+
+class TabelaValores:
+    """Vigências por categoria, em ordem crescente de ``vigente_desde``."""
+
+    def __init__(self, versao, vigencias):
+        self.versao = versao
+        self.vigencias = {}
+        for categoria, desde, valor in vigencias:
+            self.vigencias.setdefault(categoria, []).append((desde, valor))
+        for lista in self.vigencias.values():
+            lista.sort()
+
+    def valor(self, categoria, data):
+        """Valor vigente em ``data``; zero antes da primeira vigência."""
+        lista = self.vigencias.get(categoria, [])
+        posicao = bisect_right(lista, data, key=lambda vigencia: vigencia[0])
+        return lista[posicao - 1][1] if posicao else ZERO
+
+
+_tabela_em_memoria = None
+
+
+def tabela_valores():
+    """Tabela de vigências do processo, recarregada só quando a versão muda."""
+    global _tabela_em_memoria
+    versao = versao_valores()
+    if _tabela_em_memoria is None or _tabela_em_memoria.versao != versao:
+        from .models import ValorDiaria
+        _tabela_em_memoria = TabelaValores(
+            versao, ValorDiaria.objects.values_list('categoria', 'vigente_desde', 'valor')
+        )
+    return _tabela_em_memoria
+
+
+def descartar_tabela_valores():
+    """Descarta a tabela deste processo; os demais percebem pela versão."""
+    global _tabela_em_memoria
+    _tabela_em_memoria = None
+
+
+def categoria_do_valor(categoria, tipo_temporada):
+    return CATEGORIA_DAY_USE if tipo_temporada == 'dayuse' else categoria
+
+
+def valor_diaria(tabela, categoria, tipo_temporada, data):
+    """Valor da diária vigente em ``data``; Day Use usa sempre o valor de Day Camp."""
+    return tabela.valor(categoria_do_valor(categoria, tipo_temporada), data)
+
+
+def calcular_pagamento(membro, tabela=None):
+    """Componentes e total do pagamento de um ``TemporadaEquipe``.
+
+    Espera ``temporada``, ``monitor`` e ``ajuda_custo_classe`` já carregados.
+    """
+    tabela = tabela or tabela_valores()
+    temporada = membro.temporada
+    # to_python: a instância pode ter sido criada com a data em texto
+    inicio = temporada._meta.get_field('data_inicio').to_python(temporada.data_inicio)
+    diaria = valor_diaria(tabela, membro.monitor.categoria, temporada.tipo, inicio)
+    diarias = temporada.numero_diarias or ZERO
+    ajuda = membro.ajuda_custo_classe.valor if (membro.recebe_ajuda_custo and membro.ajuda_custo_classe) else ZERO
+    embarque = membro.valor_embarque_especial or ZERO
+    desembarque = membro.valor_desembarque_especial or ZERO
+    return {
+        'valor_diaria': diaria,
+        'numero_diarias': diarias,
+        'ajuda': ajuda,
+        'embarque': embarque,
+        'desembarque': desembarque,
+        'total': (diaria * diarias) + ajuda + embarque + desembarque,
+    }
+
+
+def _dinheiro(valor):
+    return Value(valor or ZERO, output_field=DINHEIRO)
+
+
+def expressao_valor_diaria(tabela, prefixo=''):
+    """``Case`` com o valor vigente no início da temporada.
+
+    Para cada categoria, as vigências entram da mais recente para a mais
+    antiga, então o primeiro ``When`` verdadeiro é o valor vigente. ``prefixo``
+    permite partir de outro modelo (ex.: ``'temporadaequipe__'``).
+    """
+    inicio = f'{prefixo}temporada__data_inicio'
+    dayuse = Q(**{f'{prefixo}temporada__tipo': 'dayuse'})
+    condicoes = []
+    for categoria, vigencias in tabela.vigencias.items():
+        if categoria == CATEGORIA_DAY_USE:
+            da_categoria = dayuse
+        else:
+            da_categoria = ~dayuse & Q(**{f'{prefixo}monitor__categoria': categoria})
+        for desde, valor in reversed(vigencias):
+            condicoes.append(When(da_categoria & Q(**{f'{inicio}__gte': desde}), then=_dinheiro(valor)))
+    if not condicoes:
+        return _dinheiro(ZERO)
+    return Case(*condicoes, default=_dinheiro(ZERO), output_field=DINHEIRO)
+
+
+def expressoes_pagamento(tabela=None):
+    """Expressões de cada componente por linha de ``TemporadaEquipe``."""
+    diaria = expressao_valor_diaria(tabela or tabela_valores())
+    diarias = Coalesce(F('temporada__numero_diarias'), Value(ZERO), output_field=DIARIAS)
+    ajuda = Case(
+        When(Q(recebe_ajuda_custo=True, ajuda_custo_classe__isnull=False), then=F('ajuda_custo_classe__valor')),
+        default=_dinheiro(ZERO),
+        output_field=DINHEIRO,
+    )
+    embarque = Coalesce(F('valor_embarque_especial'), _dinheiro(ZERO), output_field=DINHEIRO)
+    desembarque = Coalesce(F('valor_desembarque_especial'), _dinheiro(ZERO), output_field=DINHEIRO)
+    return {
+        'valor_diaria': diaria,
+        'numero_diarias': diarias,
+        'ajuda': ajuda,
+        'embarque': embarque,
+        'desembarque': desembarque,
+        'total': ExpressionWrapper(diaria * diarias + ajuda + embarque + desembarque, output_field=DINHEIRO),
+    }
+
+
+def anotar_pagamento(queryset, tabela=None):
+    """Anota ``valor_diaria``, ``numero_diarias``, ``ajuda``, ``embarque``, ``desembarque`` e ``total``."""
+    return queryset.annotate(**expressoes_pagamento(tabela))
+
+
+def _somas(tabela):
+    # Soma as expressões diretamente: agregar pelo nome de uma anotação homônima
+    # geraria SUM("ajuda") sem a expressão por trás
+    expressoes = expressoes_pagamento(tabela)
+    return {
+        'quantidade': Count('id'),
+        'numero_diarias': Coalesce(Sum(expressoes['numero_diarias']), Value(ZERO), output_field=DIARIAS),
+        **{
+            nome: Coalesce(Sum(expressoes[nome]), _dinheiro(ZERO), output_field=DINHEIRO)
+            for nome in ('ajuda', 'embarque', 'desembarque', 'total')
+        },
+    }
+
+
+def somas_por_grupo(queryset, *agrupar_por, tabela=None):
+    """Queryset de ``values`` com ``quantidade`` e as somas dos componentes por grupo."""
+    return queryset.values(*agrupar_por).annotate(**_somas(tabela)).order_by(*agrupar_por)
+
+
+def totais_pagamento(queryset, *agrupar_por, tabela=None):
+    """``quantidade`` e somas dos componentes; sem ``agrupar_por`` retorna um dict, senão uma lista por grupo."""
+    if not agrupar_por:
+        return queryset.aggregate(**_somas(tabela))
+    return list(somas_por_grupo(queryset, *agrupar_por, tabela=tabela))
@@ -0,0 +1,65 @@
+from django.db.models.signals import post_delete, post_save, pre_delete
+from django.dispatch import receiver
+
+from core.models import CustomUser
+from . import estatisticas, lancamentos
+from .cache import invalidar_calendario, invalidar_folha, invalidar_valores
+from .models import AjudaCustoClasse, InteresseTemporada, Temporada, TemporadaEquipe, ValorDiaria
+from .pagamentos import descartar_tabela_valores
+
+
+@receiver([post_save, post_delete], sender=Temporada)
+def temporada_alterada(sender, instance, **kwargs):
+    invalidar_calendario()
+    invalidar_folha()
+
+
+def _monitor_excluido(instance, origin=None, **kwargs):
+    """Exclusão em cascata a partir do próprio monitor: a estatística sai junto."""
+    return isinstance(origin, CustomUser) and origin.pk == instance.monitor_id
+
+
+@receiver([post_save, post_delete], sender=InteresseTemporada)
+def interesse_alterado(sender, instance, **kwargs):
+    invalidar_calendario(monitor_id=instance.monitor_id)
+    if not _monitor_excluido(instance, **kwargs):
+        estatisticas.interesse_alterado(instance, removido=kwargs['signal'] is post_delete)
+    instance._status_original = instance.status
+
+
+@receiver(pre_delete, sender=TemporadaEquipe)
+def equipe_sera_removida(sender, instance, **kwargs):
+    # O estorno precisa ler o livro antes de a exclusão desvincular os lançamentos
+    instance._lancamento = lancamentos.equipe_alterada(instance, removido=True)
+
+
+@receiver([post_save, post_delete], sender=TemporadaEquipe)
+def equipe_alterada(sender, instance, **kwargs):
+    removido = kwargs['signal'] is post_delete
+    lancamento = getattr(instance, '_lancamento', None) if removido else lancamentos.equipe_alterada(instance)
+    if not _monitor_excluido(instance, **kwargs):
+        estatisticas.equipe_alterada(instance, removido=removido, lancamento=lancamento)
+    instance._status_original = instance.status
+    invalidar_folha()
+
+
+@receiver([post_save, post_delete], sender=ValorDiaria)
+def valor_diaria_alterado(sender, **kwargs):
+    # As versões mudam no commit; a tabela deste processo é descartada já para
+    # o restante da transação enxergar as vigências novas
+    invalidar_valores()
+    descartar_tabela_valores()
+    invalidar_folha()
+
+
+@receiver([post_save, post_delete], sender=AjudaCustoClasse)
+def ajuda_custo_alterada(sender, **kwargs):
+    invalidar_folha()
+
+
+@receiver([post_save, post_delete], sender=CustomUser)
+def usuario_alterado(sender, update_fields=None, **kwargs):
+    # Nome, CPF e categoria aparecem na folha; login só grava last_login
+    if update_fields and set(update_fields) <= {'last_login'}:
+        return
+    invalidar_folha()
@@ -1,10 +1,17 @@
+import io
+import json
 from django.test import TestCase, override_settings
 from django.urls import reverse
 from django.utils import timezone
 from django.contrib.auth import get_user_model
-from .models import Temporada, InteresseTemporada
+from django.core.cache import cache
+from .models import Temporada, InteresseTemporada, FilaEmail
 from .forms import TemporadaForm
 from django.core import mail
+from django.core.management import call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from unittest import mock
 
 
 class TemporadaFormTests(TestCase):
@@ -31,6 +38,8 @@ class TemporadaFormTests(TestCase):
 
 class MonitorDashboardCountsTests(TestCase):
     def setUp(self):
+        # Os caches versionados só mudam no commit, que os testes nunca fazem
+        cache.clear()
         User = get_user_model()
         self.monitor = User.objects.create_user(username='m1', password='x', user_type='monitor', is_approved=True)
         self.gestor = User.objects.create_user(username='g1', password='x', user_type='gestor')
@@ -62,4 +71,694 @@ class EnvioEmailsFeedbackTests(TestCase):
         self.client.login(username='g', password='x')
         resp = self.client.post(reverse('enviar_emails_temporadas'), {'temporadas': [t.id]})
         self.assertEqual(resp.status_code, 302)
-        self.assertTrue(mail.outbox)
+        # A view apenas enfileira; nada é enviado durante a requisição
+        self.assertFalse(mail.outbox)
+        self.assertEqual(FilaEmail.objects.filter(status='pendente').count(), 1)
+        t.refresh_from_db()
+        self.assertTrue(t.email_enviado)
+
+        call_command('processar_fila_emails')
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertEqual(mail.outbox[0].to, ['m@x.com'])
+        self.assertEqual(FilaEmail.objects.get().status, 'enviado')
+
+    def test_modo_digest_um_email_por_monitor(self):
+        User = get_user_model()
+        User.objects.create_user(username='m2', password='x', user_type='monitor', email='m2@x.com', first_name='Ana')
+        t1 = Temporada.objects.create(nome='T1', data_inicio='2025-01-01', data_fim='2025-01-02', tipo='ferias')
+        t2 = Temporada.objects.create(nome='T2', data_inicio='2025-02-01', data_fim='2025-02-02', tipo='escola')
+        self.client.login(username='g', password='x')
+        resp = self.client.post(reverse('enviar_emails_temporadas'), {'temporadas': [t1.id, t2.id], 'digest': '1'}, follow=True)
+
+        self.assertEqual(FilaEmail.objects.count(), 2)
+        # O aviso reflete o que foi para a fila: um resumo por monitor, não envios por temporada
+        avisos = [str(m) for m in resp.context['messages']]
+        self.assertIn('2 e-mail(s) enfileirado(s) para 2 monitores. O envio ocorre em segundo plano.', avisos)
+        self.assertIn('Cada monitor recebe um único e-mail com as 2 temporadas.', avisos)
+        self.assertFalse(any('envios na fila' in aviso for aviso in avisos))
+        item = FilaEmail.objects.get(destinatario='m2@x.com')
+        self.assertIn('Ana', item.mensagem)
+        self.assertIn('T1', item.mensagem)
+        self.assertIn('T2', item.mensagem_html)
+
+        call_command('processar_fila_emails')
+        self.assertEqual(len(mail.outbox), 2)
+        self.assertEqual(mail.outbox[0].alternatives[0][1], 'text/html')
+
+
+@override_settings(EMAIL_BACKEND='django.core.mail.backends.locmem.EmailBackend')
+class FilaEmailTests(TestCase):
+    def test_falha_reagenda_com_backoff_e_desiste_apos_limite(self):
+        item = FilaEmail.objects.create(destinatario='a@x.com', assunto='A', mensagem='corpo')
+        with mock.patch('django.core.mail.EmailMultiAlternatives.send', side_effect=OSError('smtp fora')):
+            call_command('processar_fila_emails', max_tentativas=2)
+            item.refresh_from_db()
+            self.assertEqual(item.status, 'pendente')
+            self.assertEqual(item.tentativas, 1)
+            self.assertGreater(item.proxima_tentativa, timezone.now())
+
+            FilaEmail.objects.filter(id=item.id).update(proxima_tentativa=timezone.now())
+            call_command('processar_fila_emails', max_tentativas=2)
+            item.refresh_from_db()
+            self.assertEqual(item.status, 'falhou')
+            self.assertEqual(item.ultimo_erro, 'smtp fora')
+        self.assertFalse(mail.outbox)
+
+
+
+@override_settings(EMAIL_BACKEND='django.core.mail.backends.locmem.EmailBackend')
+class AprovacaoEmLoteTests(TestCase):
+    def setUp(self):
+        User = get_user_model()
+        self.gestor = User.objects.create_user(username='g', password='x', user_type='gestor')
+        self.temporada = Temporada.objects.create(nome='T', data_inicio='2025-01-01', data_fim='2025-01-02', tipo='ferias')
+        self.interesses = [
+            InteresseTemporada.objects.create(
+                monitor=User.objects.create_user(username=f'm{i}', password='x', user_type='monitor', email=f'm{i}@x.com'),
+                temporada=self.temporada,
+            )
+            for i in range(3)
+        ]
+
+    def test_aprova_selecionados_cria_equipe_e_enfileira_emails(self):
+        from .models import TemporadaEquipe
+        ja_recusado = self.interesses[2]
+        InteresseTemporada.objects.filter(id=ja_recusado.id).update(status='recusado')
+        self.client.login(username='g', password='x')
+        resp = self.client.post(
+            reverse('alterar_status_interesses_lote', args=[self.temporada.id]),
+            {'interesses': [i.id for i in self.interesses], 'status': 'aprovado'},
+        )
+        self.assertEqual(resp.status_code, 302)
+        self.assertEqual(InteresseTemporada.objects.filter(status='aprovado').count(), 2)
+        self.assertEqual(InteresseTemporada.objects.get(id=ja_recusado.id).status, 'recusado')
+        self.assertEqual(TemporadaEquipe.objects.filter(temporada=self.temporada).count(), 2)
+        self.assertEqual(FilaEmail.objects.count(), 2)
+        self.assertFalse(mail.outbox)
+
+    def test_ids_invalidos_sao_ignorados(self):
+        self.client.login(username='g', password='x')
+        url = reverse('alterar_status_interesses_lote', args=[self.temporada.id])
+        resp = self.client.post(url, {'interesses': ['abc', self.interesses[0].id], 'status': 'recusado'})
+        self.assertEqual(resp.status_code, 302)
+        self.assertEqual(InteresseTemporada.objects.filter(status='recusado').count(), 1)
+        self.assertEqual(self.client.post(url, {'interesses': ['abc'], 'status': 'recusado'}).status_code, 302)
+
+    def test_calendarios_dos_monitores_invalidados_no_commit(self):
+        from .cache import chave_ics
+        monitores = [i.monitor_id for i in self.interesses]
+        antes = [chave_ics(m) for m in monitores]
+        self.client.login(username='g', password='x')
+        url = reverse('alterar_status_interesses_lote', args=[self.temporada.id])
+        with mock.patch('django.core.cache.cache.set_many', wraps=cache.set_many) as set_many:
+            with self.captureOnCommitCallbacks() as callbacks:
+                self.client.post(url, {'interesses': [i.id for i in self.interesses], 'status': 'aprovado'})
+            self.assertEqual([chave_ics(m) for m in monitores], antes)
+            for callback in callbacks:
+                callback()
+        # Uma escrita para todos os monitores do lote
+        self.assertEqual(set_many.call_count, 1)
+        self.assertTrue(all(chave_ics(m) != chave for m, chave in zip(monitores, antes)))
+
+
+class CalendarioApiTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        User = get_user_model()
+        self.gestor = User.objects.create_user(username='g', password='x', user_type='gestor')
+        Temporada.objects.create(nome='Antiga', data_inicio='2024-01-10', data_fim='2024-01-12', tipo='ferias')
+        Temporada.objects.create(nome='Virada', data_inicio='2025-02-27', data_fim='2025-03-02', tipo='escola')
+        Temporada.objects.create(nome='Março', data_inicio='2025-03-15', data_fim='2025-03-15', tipo='dayuse')
+
+    def test_retorna_apenas_temporadas_na_janela(self):
+        self.client.login(username='g', password='x')
+        resp = self.client.get(reverse('api_temporadas_json'), {
+            'start': '2025-03-01T00:00:00-03:00', 'end': '2025-04-01T00:00:00-03:00',
+        })
+        self.assertEqual(resp.status_code, 200)
+        titulos = [e['title'] for e in resp.json()]
+        self.assertEqual(titulos, ['Virada', 'Março'])
+        self.assertEqual(resp.json()[1]['end'], '2025-03-16')
+
+    def test_janela_invalida(self):
+        self.client.login(username='g', password='x')
+        resp = self.client.get(reverse('api_temporadas_json'), {'start': 'ontem'})
+        self.assertEqual(resp.status_code, 400)
+
+    # Cache fora do banco, como o Redis de produção
+    @override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+    def test_payload_cacheado_ate_temporada_mudar(self):
+        self.client.login(username='g', password='x')
+        params = {'start': '2025-03-01', 'end': '2025-04-01'}
+        self.client.get(reverse('api_temporadas_json'), params)
+
+        with CaptureQueriesContext(connection) as ctx:
+            resp = self.client.get(reverse('api_temporadas_json'), params)
+        self.assertEqual(len(resp.json()), 2)
+        # Sessão, usuário e a consulta agregada do ETag; eventos e versões vêm do cache, sem SQL
+        self.assertEqual(len(ctx.captured_queries), 3)
+        self.assertFalse([q for q in ctx.captured_queries if '"temporadas_temporada"."nome"' in q['sql']])
+
+        # As versões mudam no commit
+        with self.captureOnCommitCallbacks(execute=True):
+            Temporada.objects.create(nome='Nova', data_inicio='2025-03-20', data_fim='2025-03-21', tipo='evento')
+        resp = self.client.get(reverse('api_temporadas_json'), params)
+        self.assertEqual(len(resp.json()), 3)
+
+    def test_monitor_ve_confirmacao_nova(self):
+        User = get_user_model()
+        monitor = User.objects.create_user(username='m', password='x', user_type='monitor')
+        self.client.login(username='m', password='x')
+        self.assertEqual(self.client.get(reverse('api_temporadas_json')).json(), [])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            InteresseTemporada.objects.create(
+                monitor=monitor, temporada=Temporada.objects.get(nome='Março'), status='confirmado'
+            )
+        titulos = [e['title'] for e in self.client.get(reverse('api_temporadas_json')).json()]
+        self.assertEqual(titulos, ['Março'])
+
+
+class RespostaCondicionalTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        User = get_user_model()
+        self.gestor = User.objects.create_user(username='g', password='x', user_type='gestor')
+        self.temporada = Temporada.objects.create(nome='T', data_inicio='2025-01-01', data_fim='2025-01-02', tipo='ferias')
+        self.client.login(username='g', password='x')
+
+    def test_lista_responde_304_ate_haver_mudanca(self):
+        self.client.get(reverse('lista_temporadas'))  # define o cookie CSRF
+        resp = self.client.get(reverse('lista_temporadas'))
+        self.assertEqual(resp.status_code, 200)
+        etag = resp['ETag']
+
+        resp = self.client.get(reverse('lista_temporadas'), HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(resp.status_code, 304)
+
+        Temporada.objects.filter(id=self.temporada.id).update(email_enviado=True, atualizado_em=timezone.now())
+        resp = self.client.get(reverse('lista_temporadas'), HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(resp.status_code, 200)
+        self.assertNotEqual(resp['ETag'], etag)
+
+    def test_if_modified_since_sozinho_nao_gera_304(self):
+        outra = Temporada.objects.create(nome='U', data_inicio='2025-02-01', data_fim='2025-02-02', tipo='ferias')
+        resp = self.client.get(reverse('api_temporadas_json'))
+        self.assertNotIn('Last-Modified', resp)
+        etag = resp['ETag']
+
+        resp = self.client.get(reverse('api_temporadas_json'), HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(resp.status_code, 304)
+
+        # Apagar a mais recente faz o maior atualizado_em recuar; o ETag muda pela contagem
+        with self.captureOnCommitCallbacks(execute=True):
+            outra.delete()
+        resp = self.client.get(
+            reverse('api_temporadas_json'),
+            HTTP_IF_NONE_MATCH=etag, HTTP_IF_MODIFIED_SINCE='Thu, 01 Jan 2099 00:00:00 GMT',
+        )
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(len(resp.json()), 1)
+
+
+class CalendarioIcsTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        from .ics import token_calendario
+        User = get_user_model()
+        self.monitor = User.objects.create_user(username='m', password='x', user_type='monitor')
+        self.token = token_calendario(self.monitor)
+        self.temporada = Temporada.objects.create(
+            nome='Férias, Julho', data_inicio='2025-07-10', data_fim='2025-07-12', tipo='ferias',
+            hora_chegada_equipe='08:00', hora_saida_equipe='17:30',
+        )
+
+    def test_feed_lista_confirmadas_e_regenera_quando_escala_muda(self):
+        url = reverse('calendario_ics', args=[self.token])
+        resp = self.client.get(url)
+        self.assertEqual(resp['Content-Type'], 'text/calendar; charset=utf-8')
+        self.assertNotIn(b'BEGIN:VEVENT', resp.content)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            interesse = InteresseTemporada.objects.create(monitor=self.monitor, temporada=self.temporada, status='confirmado')
+        resp = self.client.get(url)
+        self.assertIn(b'SUMMARY:F\xc3\xa9rias\\, Julho', resp.content)
+        self.assertIn(b'DTSTART:20250710T080000', resp.content)
+        self.assertIn(b'DTEND:20250712T173000', resp.content)
+
+        resp_304 = self.client.get(url, HTTP_IF_NONE_MATCH=resp['ETag'])
+        self.assertEqual(resp_304.status_code, 304)
+
+        interesse.status = 'recusado'
+        with self.captureOnCommitCallbacks(execute=True):
+            interesse.save()
+        self.assertNotIn(b'BEGIN:VEVENT', self.client.get(url).content)
+
+    def test_token_invalido(self):
+        resp = self.client.get(reverse('calendario_ics', args=[f'{self.monitor.pk}:forjado']))
+        self.assertEqual(resp.status_code, 404)
+
+    def test_token_revogado_por_troca_de_senha_ou_inativacao(self):
+        from django.core import signing
+        from .ics import SALT_TOKEN_ICS
+        url = reverse('calendario_ics', args=[self.token])
+        self.assertEqual(self.client.get(url).status_code, 200)
+        # Só o pk assinado (formato antigo) não basta
+        antigo = signing.Signer(salt=SALT_TOKEN_ICS).sign(str(self.monitor.pk))
+        self.assertEqual(self.client.get(reverse('calendario_ics', args=[antigo])).status_code, 404)
+
+        self.monitor.is_active = False
+        self.monitor.save()
+        self.assertEqual(self.client.get(url).status_code, 404)
+
+        self.monitor.is_active = True
+        self.monitor.set_password('nova')
+        self.monitor.save()
+        self.assertEqual(self.client.get(url).status_code, 404)
+
+
+class EstatisticaMonitorTests(TestCase):
+    def setUp(self):
+        from .models import ValorDiaria
+        User = get_user_model()
+        self.monitor = User.objects.create_user(username='m', password='x', user_type='monitor', categoria='monitor')
+        ValorDiaria.objects.create(categoria='monitor', valor=100, vigente_desde='2000-01-01')
+        self.t1 = Temporada.objects.create(nome='T1', data_inicio='2025-01-10', data_fim='2025-01-12', tipo='ferias', numero_diarias=2)
+        self.t2 = Temporada.objects.create(nome='T2', data_inicio='2025-03-10', data_fim='2025-03-12', tipo='ferias', numero_diarias=3)
+
+    def estatisticas(self):
+        from .models import EstatisticaMonitor
+        return EstatisticaMonitor.objects.get(monitor=self.monitor)
+
+    def test_contadores_acompanham_mudancas_de_status(self):
+        from .models import TemporadaEquipe
+        i1 = InteresseTemporada.objects.create(monitor=self.monitor, temporada=self.t1, status='interessado')
+        i2 = InteresseTemporada.objects.create(monitor=self.monitor, temporada=self.t2, status='interessado')
+        self.assertEqual(self.estatisticas().interesses_pendentes, 2)
+
+        i1.status = 'confirmado'
+        i1.save()
+        i2 = InteresseTemporada.objects.get(pk=i2.pk)
+        i2.status = 'confirmado'
+        i2.save()
+        est = self.estatisticas()
+        self.assertEqual((est.participacoes, est.interesses_pendentes), (2, 0))
+        self.assertEqual(str(est.ultima_temporada), '2025-03-10')
+
+        membro = TemporadaEquipe.objects.create(temporada=self.t2, monitor=self.monitor, status='pendente')
+        membro.status = 'concluido'
+        membro.save()
+        est = self.estatisticas()
+        self.assertEqual(est.temporadas_concluidas, 1)
+        self.assertEqual(est.dias_trabalhados, 3)
+        self.assertEqual(est.ganhos_totais, 300)
+
+        i2.delete()
+        membro.delete()
+        est = self.estatisticas()
+        self.assertEqual((est.participacoes, est.temporadas_concluidas, est.ganhos_totais), (1, 0, 0))
+        self.assertEqual(str(est.ultima_temporada), '2025-01-10')
+
+    def test_recalculo_reproduz_contadores_incrementais(self):
+        InteresseTemporada.objects.create(monitor=self.monitor, temporada=self.t1, status='confirmado')
+        InteresseTemporada.objects.create(monitor=self.monitor, temporada=self.t2, status='interessado')
+        incremental = self.estatisticas()
+        call_command('recalcular_estatisticas', stdout=io.StringIO())
+        recalculado = self.estatisticas()
+        for campo in ('participacoes', 'interesses_pendentes', 'temporadas_concluidas', 'ganhos_totais', 'ultima_temporada'):
+            self.assertEqual(getattr(recalculado, campo), getattr(incremental, campo))
+
+    def test_excluir_monitor_com_equipe_e_interesses(self):
+        from .models import EstatisticaMonitor, TemporadaEquipe
+        User = get_user_model()
+        outro = User.objects.create_user(username='o', password='x', user_type='monitor', categoria='monitor')
+        for monitor in (self.monitor, outro):
+            InteresseTemporada.objects.create(monitor=monitor, temporada=self.t1, status='confirmado')
+            membro = TemporadaEquipe.objects.create(temporada=self.t1, monitor=monitor, status='confirmado')
+            membro.status = 'concluido'
+            membro.save()
+
+        self.monitor.delete()
+        User.objects.filter(pk=outro.pk).delete()
+        connection.check_constraints()
+        self.assertFalse(EstatisticaMonitor.objects.exists())
+
+
+class PagamentoSqlTests(TestCase):
+    def setUp(self):
+        from .models import AjudaCustoClasse, TemporadaEquipe, ValorDiaria
+        User = get_user_model()
+        for categoria, valor in (('monitor', 100), ('conselheiro', 150), ('day_camp', 80)):
+            ValorDiaria.objects.create(categoria=categoria, valor=valor, vigente_desde='2000-01-01')
+        ajuda = AjudaCustoClasse.objects.create(nome='A', valor=50)
+        self.monitor = User.objects.create_user(username='m', password='x', user_type='monitor', categoria='monitor')
+        conselheiro = User.objects.create_user(username='c', password='x', user_type='monitor', categoria='conselheiro')
+        ferias = Temporada.objects.create(nome='F', data_inicio='2025-01-10', data_fim='2025-01-12', tipo='ferias', numero_diarias=2.5)
+        dayuse = Temporada.objects.create(nome='D', data_inicio='2025-02-10', data_fim='2025-02-10', tipo='dayuse', numero_diarias=1)
+        TemporadaEquipe.objects.create(temporada=ferias, monitor=self.monitor, recebe_ajuda_custo=True,
+                                       ajuda_custo_classe=ajuda, valor_embarque_especial=20)
+        TemporadaEquipe.objects.create(temporada=dayuse, monitor=self.monitor, valor_desembarque_especial=15)
+        # Marcado sem receber ajuda: a classe não entra no total
+        TemporadaEquipe.objects.create(temporada=ferias, monitor=conselheiro, ajuda_custo_classe=ajuda)
+
+    def test_anotacoes_iguais_ao_calculo_em_python(self):
+        from .models import TemporadaEquipe
+        from .pagamentos import COMPONENTES, anotar_pagamento, calcular_pagamento, tabela_valores
+        tabela = tabela_valores()
+        esperado = {
+            m.pk: calcular_pagamento(m, tabela)
+            for m in TemporadaEquipe.objects.select_related('temporada', 'monitor', 'ajuda_custo_classe')
+        }
+        with self.assertNumQueries(1):
+            anotados = list(anotar_pagamento(TemporadaEquipe.objects.all(), tabela))
+        for membro in anotados:
+            for componente in COMPONENTES:
+                self.assertEqual(getattr(membro, componente), esperado[membro.pk][componente], componente)
+
+    def test_totais_agrupados_em_uma_consulta(self):
+        from .models import TemporadaEquipe
+        from .pagamentos import tabela_valores, totais_pagamento
+        tabela = tabela_valores()
+        with self.assertNumQueries(1):
+            grupos = totais_pagamento(TemporadaEquipe.objects.all(), 'monitor_id', tabela=tabela)
+        por_monitor = {grupo['monitor_id']: grupo for grupo in grupos}
+        # 100 * 2.5 + 50 + 20 (férias) e 80 + 15 (Day Use)
+        self.assertEqual(por_monitor[self.monitor.pk]['total'], 415)
+        self.assertEqual(por_monitor[self.monitor.pk]['quantidade'], 2)
+        self.assertEqual(totais_pagamento(TemporadaEquipe.objects.all())['total'], 790)
+
+    def test_relatorio_monitor(self):
+        get_user_model().objects.filter(pk=self.monitor.pk).update(is_approved=True, cadastro_completo=True)
+        self.client.force_login(self.monitor)
+        resposta = self.client.get(reverse('relatorio_monitor'))
+        self.assertEqual(resposta.status_code, 200)
+        # Linha de totais do relatório
+        self.assertContains(resposta, 'R$ 415')
+
+
+class FolhaPagamentoTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        from .models import TemporadaEquipe, ValorDiaria
+        User = get_user_model()
+        self.gestor = User.objects.create_user(username='g', password='x', user_type='gestor')
+        ValorDiaria.objects.create(categoria='monitor', valor=100, vigente_desde='2000-01-01')
+        self.ana = User.objects.create_user(username='ana', password='x', user_type='monitor', categoria='monitor', first_name='Ana')
+        bia = User.objects.create_user(username='bia', password='x', user_type='monitor', categoria='monitor', first_name='Bia')
+        jan = Temporada.objects.create(nome='Jan', data_inicio='2025-01-10', data_fim='2025-01-12', tipo='ferias', numero_diarias=2)
+        fev = Temporada.objects.create(nome='Fev', data_inicio='2025-02-10', data_fim='2025-02-12', tipo='ferias', numero_diarias=3)
+        self.membro = TemporadaEquipe.objects.create(temporada=jan, monitor=self.ana, status='confirmado')
+        TemporadaEquipe.objects.create(temporada=fev, monitor=self.ana, status='concluido')
+        TemporadaEquipe.objects.create(temporada=jan, monitor=bia, status='pendente')
+        self.client.force_login(self.gestor)
+        self.filtro = {'inicio': '2025-01-01', 'fim': '2025-02-28'}
+
+    def test_totais_por_monitor_em_cache(self):
+        resp = self.client.get(reverse('folha_pagamento'), self.filtro)
+        resumo = resp.context['resumo']
+        self.assertEqual([m['username'] for m in resumo['monitores']], ['ana'])
+        self.assertEqual(resumo['totais']['total'], 500)
+
+        with CaptureQueriesContext(connection) as consultas:
+            self.client.get(reverse('folha_pagamento'), self.filtro)
+        self.assertFalse(any('temporadas_temporadaequipe' in q['sql'] for q in consultas.captured_queries))
+
+        # Alterar a equipe invalida o cache, depois do commit
+        self.membro.valor_embarque_especial = 30
+        with self.captureOnCommitCallbacks(execute=True):
+            self.membro.save()
+        resp = self.client.get(reverse('folha_pagamento'), self.filtro)
+        self.assertEqual(resp.context['resumo']['totais']['total'], 530)
+
+    def test_filtro_por_temporada_e_status(self):
+        jan = Temporada.objects.get(nome='Jan')
+        resp = self.client.get(reverse('folha_pagamento'), {'temporadas': [jan.id], 'status': ['pendente', 'confirmado']})
+        resumo = resp.context['resumo']
+        self.assertEqual(sorted(m['username'] for m in resumo['monitores']), ['ana', 'bia'])
+        self.assertEqual(resumo['totais']['total'], 400)
+
+    def test_exportacao_csv(self):
+        resp = self.client.get(reverse('exportar_folha_pagamento'), self.filtro)
+        linhas = b''.join(resp.streaming_content).decode('utf-8-sig').splitlines()
+        self.assertEqual(linhas[0].split(';')[0], 'Usuário')
+        self.assertEqual(linhas[1].split(';'), ['ana', 'Ana', '', 'Monitor', '2', '5', '0,00', '0,00', '0,00', '500,00'])
+        self.assertEqual(linhas[-1].split(';')[-1], '500,00')
+
+        # Nome digitado pelo monitor não vira fórmula na planilha
+        get_user_model().objects.filter(pk=self.ana.pk).update(first_name='=1+1')
+        resp = self.client.get(reverse('exportar_folha_pagamento'), self.filtro)
+        linhas = b''.join(resp.streaming_content).decode('utf-8-sig').splitlines()
+        self.assertEqual(linhas[1].split(';')[1], "'=1+1")
+
+    def test_somente_gestores(self):
+        self.client.force_login(self.ana)
+        self.assertEqual(self.client.get(reverse('folha_pagamento')).status_code, 302)
+
+
+class ValoresDiariaVigenciaTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        from .models import TemporadaEquipe, ValorDiaria
+        User = get_user_model()
+        self.gestor = User.objects.create_user(username='g', password='x', user_type='gestor')
+        monitor = User.objects.create_user(username='m', password='x', user_type='monitor', categoria='monitor')
+        ValorDiaria.objects.create(categoria='monitor', valor=100, vigente_desde='2000-01-01')
+        ValorDiaria.objects.create(categoria='day_camp', valor=80, vigente_desde='2000-01-01')
+        jan = Temporada.objects.create(nome='Jan', data_inicio='2025-01-10', data_fim='2025-01-12', tipo='ferias', numero_diarias=2)
+        mar = Temporada.objects.create(nome='Mar', data_inicio='2025-03-10', data_fim='2025-03-12', tipo='ferias', numero_diarias=2)
+        TemporadaEquipe.objects.create(temporada=jan, monitor=monitor)
+        TemporadaEquipe.objects.create(temporada=mar, monitor=monitor)
+
+    def totais_por_inicio(self):
+        from .models import TemporadaEquipe
+        from .pagamentos import totais_pagamento
+        return {str(g['temporada__data_inicio']): g['total'] for g in totais_pagamento(TemporadaEquipe.objects.all(), 'temporada__data_inicio')}
+
+    def test_temporada_usa_valor_vigente_no_inicio(self):
+        from .models import CATEGORIAS_VALOR, ValorDiaria
+        self.assertEqual(self.totais_por_inicio(), {'2025-01-10': 200, '2025-03-10': 200})
+        self.client.force_login(self.gestor)
+        self.client.post(reverse('configurar_valores'), {
+            'vigente_desde': '2025-02-01',
+            **{categoria: 0 for categoria, _ in CATEGORIAS_VALOR},
+            'monitor': '150', 'day_camp': '80',
+        })
+        # Só o valor de monitor mudou; Day Camp e as demais categorias (zero) seguem iguais
+        self.assertEqual(list(ValorDiaria.objects.filter(vigente_desde='2025-02-01').values_list('categoria', flat=True)), ['monitor'])
+        self.assertEqual(self.totais_por_inicio(), {'2025-01-10': 200, '2025-03-10': 300})
+
+    def test_tabela_em_memoria_so_recarrega_quando_a_versao_muda(self):
+        from .cache import versao_valores
+        from .models import ValorDiaria
+        from .pagamentos import tabela_valores
+        tabela = tabela_valores()
+        with CaptureQueriesContext(connection) as consultas:
+            self.assertIs(tabela_valores(), tabela)
+        self.assertFalse(any('temporadas_valordiaria' in q['sql'] for q in consultas.captured_queries))
+
+        versao = versao_valores()
+        with self.captureOnCommitCallbacks() as callbacks:
+            ValorDiaria.objects.create(categoria='monitor', valor=120, vigente_desde='2025-03-01')
+            # Outros processos só veem a versão nova quando a vigência já está gravada
+            self.assertEqual(versao_valores(), versao)
+        for callback in callbacks:
+            callback()
+        self.assertNotEqual(versao_valores(), versao)
+        nova = tabela_valores()
+        self.assertIsNot(nova, tabela)
+        self.assertEqual(nova.valor('monitor', timezone.datetime(2025, 3, 1).date()), 120)
+        self.assertEqual(nova.valor('monitor', timezone.datetime(2025, 2, 28).date()), 100)
+
+
+class LivroPagamentosTests(TestCase):
+    def setUp(self):
+        from .models import TemporadaEquipe, ValorDiaria
+        User = get_user_model()
+        self.monitor = User.objects.create_user(username='m', password='x', user_type='monitor', categoria='monitor')
+        ValorDiaria.objects.create(categoria='monitor', valor=100, vigente_desde='2000-01-01')
+        self.temporada = Temporada.objects.create(nome='T', data_inicio='2025-01-10', data_fim='2025-01-12', tipo='ferias', numero_diarias=2)
+        self.membro = TemporadaEquipe.objects.create(temporada=self.temporada, monitor=self.monitor, valor_embarque_especial=20)
+
+    def concluir(self, status='concluido'):
+        from .models import TemporadaEquipe
+        membro = TemporadaEquipe.objects.get(pk=self.membro.pk)
+        membro.status = status
+        membro.save()
+        return membro
+
+    def saldo(self):
+        from .lancamentos import somas_lancamentos
+        from .models import LancamentoPagamento
+        return somas_lancamentos(LancamentoPagamento.objects.all())
+
+    def test_conclusao_congela_o_valor(self):
+        from .models import ValorDiaria
+        from .folha import resumo_folha
+        self.concluir()
+        self.assertEqual((self.saldo()['quantidade'], self.saldo()['total']), (1, 220))
+
+        # Um reajuste retroativo não altera o que já foi lançado
+        ValorDiaria.objects.create(categoria='monitor', valor=200, vigente_desde='2025-01-01')
+        self.assertEqual(resumo_folha(status=('concluido',))['totais']['total'], 220)
+        self.assertEqual(self.monitor.estatisticas.ganhos_totais, 220)
+
+    def test_reabrir_e_excluir_estornam(self):
+        from .models import LancamentoPagamento
+        self.concluir()
+        self.concluir('confirmado')
+        self.assertEqual((self.saldo()['quantidade'], self.saldo()['total']), (0, 0))
+
+        membro = self.concluir()
+        membro.delete()
+        self.assertEqual(self.saldo()['total'], 0)
+        self.assertEqual(LancamentoPagamento.objects.filter(tipo='estorno').count(), 2)
+        self.assertEqual(LancamentoPagamento.objects.count(), 4)
+        self.monitor.estatisticas.refresh_from_db()
+        self.assertEqual(self.monitor.estatisticas.ganhos_totais, 0)
+
+    def test_mesma_conclusao_nao_e_lancada_duas_vezes(self):
+        from django.db import IntegrityError, transaction
+        from .models import LancamentoPagamento, TemporadaEquipe
+        # Duas leituras antigas do mesmo membro, como em envios simultâneos
+        primeira = TemporadaEquipe.objects.get(pk=self.membro.pk)
+        segunda = TemporadaEquipe.objects.get(pk=self.membro.pk)
+        primeira.status = segunda.status = 'concluido'
+        primeira.save()
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            segunda.save()
+        self.assertEqual(LancamentoPagamento.objects.count(), 1)
+
+        # Depois de um estorno, uma nova conclusão abre outro ciclo
+        self.concluir('confirmado')
+        self.concluir()
+        self.assertEqual(list(LancamentoPagamento.objects.values_list('tipo', 'ciclo')), [
+            ('lancamento', 0), ('estorno', 0), ('lancamento', 1),
+        ])
+
+    def test_lancamentos_sao_imutaveis(self):
+        self.concluir()
+        from .models import LancamentoPagamento
+        lancamento = LancamentoPagamento.objects.get()
+        lancamento.total = 0
+        with self.assertRaises(ValueError):
+            lancamento.save()
+        with self.assertRaises(ValueError):
+            lancamento.delete()
+
+    def test_lancar_pendentes_completa_o_livro(self):
+        from .models import TemporadaEquipe
+        # update() não dispara sinais, como uma conclusão anterior ao livro
+        TemporadaEquipe.objects.filter(pk=self.membro.pk).update(status='concluido')
+        call_command('lancar_pagamentos', stdout=io.StringIO())
+        call_command('lancar_pagamentos', stdout=io.StringIO())
+        self.assertEqual((self.saldo()['quantidade'], self.saldo()['total']), (1, 220))
+
+
+class GerenciarEquipeTests(TestCase):
+    def setUp(self):
+        from .models import AjudaCustoClasse, TemporadaEquipe, ValorDiaria
+        User = get_user_model()
+        self.gestor = User.objects.create_user(username='g', password='x', user_type='gestor')
+        ValorDiaria.objects.create(categoria='monitor', valor=100, vigente_desde='2000-01-01')
+        self.ajuda = AjudaCustoClasse.objects.create(nome='A', valor=50)
+        self.temporada = Temporada.objects.create(nome='T', data_inicio='2025-01-10', data_fim='2025-01-12', tipo='ferias', numero_diarias=2)
+        monitores = User.objects.bulk_create([
+            User(username=f'm{i}', user_type='monitor', categoria='monitor') for i in range(50)
+        ])
+        self.equipe = TemporadaEquipe.objects.bulk_create([
+            TemporadaEquipe(temporada=self.temporada, monitor=monitor, status='confirmado') for monitor in monitores
+        ])
+        self.client.force_login(self.gestor)
+
+    def dados(self, alteracoes):
+        """POST equivalente ao formulário sem mudanças, com ``alteracoes`` por id do membro."""
+        dados = {}
+        for membro in self.equipe:
+            dados[f'm_{membro.id}_status'] = alteracoes.get(membro.id, {}).get('status', membro.status)
+            for campo, valor in alteracoes.get(membro.id, {}).items():
+                if campo != 'status':
+                    dados[f'm_{membro.id}_{campo}'] = valor
+        return dados
+
+    def test_uma_alteracao_em_50_membros_usa_um_bulk_update(self):
+        from .models import TemporadaEquipe
+        url = reverse('gerenciar_equipe_temporada', args=[self.temporada.id])
+        alvo = self.equipe[7]
+        dados = self.dados({alvo.id: {'recebe_ajuda_custo': 'on', 'ajuda_custo_classe': str(self.ajuda.id)}})
+        with CaptureQueriesContext(connection) as consultas:
+            resposta = self.client.post(url, dados)
+        self.assertEqual(resposta.status_code, 302)
+        sqls = [q['sql'] for q in consultas.captured_queries]
+        self.assertEqual(sum(sql.startswith('UPDATE "temporadas_temporadaequipe"') for sql in sqls), 1)
+        self.assertFalse(any('FROM "temporadas_ajudacustoclasse" WHERE' in sql for sql in sqls))
+        self.assertLessEqual(len(sqls), 15)
+        alvo = TemporadaEquipe.objects.get(pk=alvo.pk)
+        self.assertTrue(alvo.recebe_ajuda_custo)
+        self.assertEqual(alvo.ajuda_custo_classe, self.ajuda)
+
+    def test_concluir_a_equipe_inteira_lanca_em_lote(self):
+        from .models import EstatisticaMonitor, LancamentoPagamento
+        url = reverse('gerenciar_equipe_temporada', args=[self.temporada.id])
+        dados = self.dados({membro.id: {'status': 'concluido'} for membro in self.equipe})
+        with CaptureQueriesContext(connection) as consultas:
+            self.client.post(url, dados)
+        self.assertLessEqual(len(consultas.captured_queries), 25)
+        self.assertEqual(LancamentoPagamento.objects.count(), 50)
+        self.assertEqual(EstatisticaMonitor.objects.get(monitor=self.equipe[0].monitor).ganhos_totais, 200)
+        self.assertEqual(str(EstatisticaMonitor.objects.get(monitor=self.equipe[0].monitor).ultima_temporada), '2025-01-10')
+
+        # Reabrir estorna o que foi lançado
+        self.client.post(url, self.dados({membro.id: {'status': 'confirmado'} for membro in self.equipe}))
+        self.assertEqual(LancamentoPagamento.objects.filter(tipo='estorno').count(), 50)
+        self.assertEqual(EstatisticaMonitor.objects.get(monitor=self.equipe[0].monitor).ganhos_totais, 0)
+
+    def test_pagina_renderiza(self):
+        resposta = self.client.get(reverse('gerenciar_equipe_temporada', args=[self.temporada.id]))
+        self.assertContains(resposta, f'name="m_{self.equipe[0].id}_status"')
+        # A lista de ajudas de custo aparece uma vez, não uma por linha
+        self.assertContains(resposta, '(R$ 50.00)', count=1)
+
+    def patch(self, membro, dados):
+        url = reverse('membro_equipe_temporada', args=[self.temporada.id, membro.id])
+        return self.client.patch(url, json.dumps(dados), content_type='application/json')
+
+    def test_patch_altera_um_membro_e_devolve_o_pagamento(self):
+        from .models import TemporadaEquipe
+        alvo = self.equipe[3]
+        with CaptureQueriesContext(connection) as consultas:
+            resposta = self.patch(alvo, {'recebe_ajuda_custo': True, 'ajuda_custo_classe': self.ajuda.id, 'valor_embarque_especial': '12,50'})
+        self.assertEqual(resposta.status_code, 200)
+        sqls = [q['sql'] for q in consultas.captured_queries]
+        self.assertEqual(sum(sql.startswith('UPDATE "temporadas_temporadaequipe"') for sql in sqls), 1)
+        dados = resposta.json()
+        self.assertEqual(sorted(dados['alterados']), ['ajuda_custo_classe', 'recebe_ajuda_custo', 'valor_embarque_especial'])
+        self.assertEqual(dados['pagamento']['total'], '262.50')
+        alvo = TemporadaEquipe.objects.get(pk=alvo.pk)
+        self.assertEqual((alvo.ajuda_custo_classe, str(alvo.valor_embarque_especial)), (self.ajuda, '12.50'))
+        # Campos não enviados ficam como estavam
+        self.assertEqual(alvo.status, 'confirmado')
+
+    def test_patch_de_status_lanca_no_livro(self):
+        from .models import EstatisticaMonitor, LancamentoPagamento
+        alvo = self.equipe[0]
+        self.assertEqual(self.patch(alvo, {'status': 'concluido'}).status_code, 200)
+        self.assertEqual(LancamentoPagamento.objects.get().total, 200)
+        self.assertEqual(EstatisticaMonitor.objects.get(monitor=alvo.monitor).ganhos_totais, 200)
+        self.assertEqual(self.patch(alvo, {'status': 'concluido'}).json()['alterados'], [])
+        self.assertEqual(LancamentoPagamento.objects.count(), 1)
+
+    def test_patch_invalido(self):
+        alvo = self.equipe[0]
+        resposta = self.patch(alvo, {'status': 'x', 'valor_desembarque_especial': 'abc', 'monitor': 1})
+        self.assertEqual(resposta.status_code, 400)
+        self.assertEqual(set(resposta.json()['erros']), {'status', 'valor_desembarque_especial', 'monitor'})
+        outra = Temporada.objects.create(nome='O', data_inicio='2025-02-10', data_fim='2025-02-12', tipo='ferias')
+        url = reverse('membro_equipe_temporada', args=[outra.id, alvo.id])
+        self.assertEqual(self.client.patch(url, '{"status": "concluido"}', content_type='application/json').status_code, 404)
+
+    def test_linha_parcial(self):
+        alvo = self.equipe[0]
+        resposta = self.client.get(reverse('membro_equipe_temporada', args=[self.temporada.id, alvo.id]))
+        self.assertContains(resposta, f'name="m_{alvo.id}_status"')
+        self.assertContains(resposta, '200.00')
+        self.assertNotContains(resposta, '<html')
@@ -8,12 +8,14 @@ urlpatterns = [
     path('interesse/<int:temporada_id>/', views.demonstrar_interesse, name='demonstrar_interesse'),
     path('<int:temporada_id>/interessados/', views.interessados_por_temporada, name='interessados_por_temporada'),
     path('interesse/<int:interesse_id>/alterar/', views.alterar_status_interesse, name='alterar_status_interesse'),
+    path('<int:temporada_id>/interessados/lote/', views.alterar_status_interesses_lote, name='alterar_status_interesses_lote'),
     path('minhas/', views.minhas_participacoes, name='minhas_participacoes'),
     path('responder/<int:interesse_id>/', views.resposta_participacao, name='resposta_participacao'),
     path('enviar_emails/', views.enviar_emails_temporadas, name='enviar_emails_temporadas'),
     path('habilitar-reenvio-email/<int:temporada_id>/', views.habilitar_reenvio_email, name='habilitar_reenvio_email'),
     path('calendario/', views.calendario_novo_view, name='calendario'),
     path('api/temporadas/', views.api_temporadas_json, name='api_temporadas_json'),
+    path('calendario/<str:token>.ics', views.calendario_ics, name='calendario_ics'),
     path('<int:temporada_id>/', views.detalhes_temporada, name='detalhes_temporada'),
     path('<int:temporada_id>/visualizar/', views.visualizar_temporada_monitor, name='visualizar_temporada_monitor'),
     # Configurações de valores e ajudas (somente gestores)
@@ -23,6 +25,10 @@ urlpatterns = [
     path('ajudas-custo/<int:ajuda_id>/', views.editar_ajuda_custo, name='editar_ajuda_custo'),
     # Gestão de equipe por temporada
     path('<int:temporada_id>/equipe/', views.gerenciar_equipe_temporada, name='gerenciar_equipe_temporada'),
+    path('<int:temporada_id>/equipe/<int:membro_id>/', views.membro_equipe_temporada, name='membro_equipe_temporada'),
+    # Folha de pagamento (somente gestores)
+    path('folha/', views.folha_pagamento, name='folha_pagamento'),
+    path('folha/exportar.csv', views.exportar_folha_pagamento, name='exportar_folha_pagamento'),
     # Relatório do monitor
     path('relatorio/', views.relatorio_monitor, name='relatorio_monitor'),
 ]
@@ -1,53 +1,190 @@
-from django.core.mail import send_mail
+import hashlib
+from datetime import timedelta
+from functools import wraps
+
+from django.conf import settings
+from django.contrib.messages import get_messages
+from django.core.mail import EmailMultiAlternatives, get_connection
+from django.db import transaction
+from django.db.models import Count, Max
+from django.template.loader import get_template
+from django.utils import timezone
+from django.utils.cache import patch_cache_control
+from django.utils.safestring import mark_safe
+from django.views.decorators.http import condition
+from core.dashboard import invalidar_resumo_gestor
 from core.models import CustomUser
+from .models import FilaEmail, Temporada
+
+
+def _monitores_para_anuncio():
+    """Pares (email, nome) dos monitores, sem e-mails repetidos."""
+    monitores = {}
+    for email, first_name, username in (
+        CustomUser.objects.filter(user_type='monitor')
+        .exclude(email='')
+        .values_list('email', 'first_name', 'username')
+        .order_by('id')
+    ):
+        monitores.setdefault(email, first_name or username)
+    return list(monitores.items())
+
+
+def _renderizar_blocos(temporadas):
+    """Renderiza o bloco texto/HTML de cada temporada uma única vez."""
+    bloco_txt = get_template('emails/temporada_bloco.txt')
+    bloco_html = get_template('emails/temporada_bloco.html')
+    return [
+        (bloco_txt.render({'temporada': t}).strip(), bloco_html.render({'temporada': t}))
+        for t in temporadas
+    ]
+
+
+def _mensagens_anuncio(blocos, monitores):
+    """Monta uma mensagem por monitor a partir dos blocos já renderizados."""
+    corpo_txt = get_template('emails/anuncio_temporadas.txt')
+    corpo_html = get_template('emails/anuncio_temporadas.html')
+    blocos_txt = '\n\n'.join(txt for txt, _ in blocos)
+    blocos_html = mark_safe(''.join(html for _, html in blocos))
+    for email, nome in monitores:
+        yield (
+            email,
+            corpo_txt.render({'nome': nome, 'total': len(blocos), 'blocos': blocos_txt}),
+            corpo_html.render({'nome': nome, 'total': len(blocos), 'blocos': blocos_html}),
+        )
+
 
+def enviar_email_temporadas_abertas(temporadas, digest=False):
+    """Enfileira os e-mails de anúncio e retorna um resumo do que foi enfileirado.
 
-def enviar_email_temporadas_abertas(temporadas):
-    """Envia e-mails e retorna um resumo do envio."""
-    monitores = CustomUser.objects.filter(user_type='monitor').exclude(email='').distinct()
-    destinatarios = [m.email for m in monitores]
+    Com ``digest=True`` cada monitor recebe um único e-mail com todas as
+    temporadas selecionadas; caso contrário, um e-mail por temporada.
+    ``por_temporada`` só traz os e-mails individuais de cada temporada, e fica
+    vazio quando tudo vai no resumo.
+    """
+    temporadas = list(temporadas)
+    monitores = _monitores_para_anuncio()
+    blocos = _renderizar_blocos(temporadas)
 
-    resumo = {
-        'total_monitores': len(destinatarios),
-        'por_temporada': []
+    digest = digest and len(temporadas) > 1
+    if digest:
+        grupos = [(f"Novas temporadas disponíveis ({len(temporadas)})", blocos, None)]
+    else:
+        grupos = [
+            (f"Nova temporada disponível: {t.nome}", [bloco], t)
+            for t, bloco in zip(temporadas, blocos)
+        ]
+
+    total_mensagens = 0
+    por_temporada = []
+    with transaction.atomic():
+        for assunto, blocos_grupo, temporada in grupos:
+            itens = [
+                FilaEmail(destinatario=email, assunto=assunto, mensagem=txt, mensagem_html=html)
+                for email, txt, html in _mensagens_anuncio(blocos_grupo, monitores)
+            ]
+            FilaEmail.objects.bulk_create(itens, batch_size=500)
+            total_mensagens += len(itens)
+            if temporada is not None:
+                por_temporada.append({'id': temporada.id, 'nome': temporada.nome, 'enviados': len(itens)})
+
+        Temporada.objects.filter(id__in=[t.id for t in temporadas]).update(
+            email_enviado=True, atualizado_em=timezone.now()
+        )
+        # update() não dispara sinais; "temporadas sem e-mail" sai do resumo
+        invalidar_resumo_gestor()
+
+    return {
+        'total_monitores': len(monitores),
+        'total_mensagens': total_mensagens,
+        'total_temporadas': len(temporadas),
+        'digest': digest,
+        'por_temporada': por_temporada,
     }
 
-    for temporada in temporadas:
-        assunto = f"Nova temporada disponível: {temporada.nome}"
-        mensagem = f"""
-Olá! Uma nova temporada foi aberta:
 
-Nome: {temporada.nome}
-Data: {temporada.data_inicio} a {temporada.data_fim}
-Cliente: {temporada.cliente or '-'}
-Tipo: {temporada.get_tipo_display()}
+def _backoff(tentativas, base_segundos):
+    """Espera exponencial entre tentativas (base, 2x base, 4x base, ...)."""
+    return timedelta(seconds=base_segundos * (2 ** max(tentativas - 1, 0)))
 
-Acesse o sistema para demonstrar interesse.
 
-Equipe do Acampamento.
-"""
-        send_mail(
-            assunto,
-            mensagem,
-            None,
-            destinatarios,
-            fail_silently=False
+def processar_fila_emails(lote=100, max_tentativas=5, backoff_segundos=60, reserva_segundos=600):
+    """Envia um lote da fila por uma única conexão SMTP.
+
+    Os itens são reservados adiando ``proxima_tentativa`` antes do envio, de modo
+    que workers concorrentes não peguem o mesmo item e um worker interrompido
+    não perca mensagens: a reserva expira e o item volta para a fila.
+    Retorna um dicionário com as contagens de enviados, reagendados e falhos.
+    """
+    agora = timezone.now()
+    resumo = {'enviados': 0, 'reagendados': 0, 'falhos': 0}
+
+    with transaction.atomic():
+        itens = list(
+            FilaEmail.objects.select_for_update(skip_locked=True)
+            .filter(status='pendente', proxima_tentativa__lte=agora)
+            .order_by('proxima_tentativa', 'id')[:lote]
+        )
+        if not itens:
+            return resumo
+        FilaEmail.objects.filter(id__in=[i.id for i in itens]).update(
+            proxima_tentativa=agora + timedelta(seconds=reserva_segundos)
         )
-        temporada.email_enviado = True
-        temporada.save()
-        resumo['por_temporada'].append({
-            'id': temporada.id,
-            'nome': temporada.nome,
-            'enviados': len(destinatarios),
-        })
+
+    enviados = []
+    erros = {}
+    connection = get_connection()
+    try:
+        connection.open()
+    except Exception as e:
+        erros = {item.id: str(e) for item in itens}
+    else:
+        try:
+            for item in itens:
+                mensagem = EmailMultiAlternatives(
+                    item.assunto, item.mensagem, None, [item.destinatario], connection=connection
+                )
+                if item.mensagem_html:
+                    mensagem.attach_alternative(item.mensagem_html, 'text/html')
+                try:
+                    mensagem.send()
+                except Exception as e:
+                    erros[item.id] = str(e)
+                else:
+                    enviados.append(item.id)
+        finally:
+            connection.close()
+
+    agora = timezone.now()
+    if enviados:
+        FilaEmail.objects.filter(id__in=enviados).update(
+            status='enviado', enviado_em=agora, ultimo_erro=''
+        )
+        resumo['enviados'] = len(enviados)
+
+    for item in itens:
+        if item.id not in erros:
+            continue
+        item.tentativas += 1
+        item.ultimo_erro = erros[item.id]
+        if item.tentativas >= max_tentativas:
+            item.status = 'falhou'
+            resumo['falhos'] += 1
+        else:
+            item.proxima_tentativa = agora + _backoff(item.tentativas, backoff_segundos)
+            resumo['reagendados'] += 1
+        item.save(update_fields=['tentativas', 'ultimo_erro', 'status', 'proxima_tentativa'])
 
     return resumo
 
 
-def enviar_email_aprovacao(interesse):
-    send_mail(
-        f"Você foi aprovado para: {interesse.temporada.nome}",
-        f"""
+def enfileirar_emails_aprovacao(interesses):
+    """Enfileira o aviso de aprovação de cada interesse (com monitor e temporada carregados)."""
+    itens = [
+        FilaEmail(
+            destinatario=interesse.monitor.email,
+            assunto=f"Você foi aprovado para: {interesse.temporada.nome}",
+            mensagem=f"""
 Parabéns! Você foi aprovado para participar da temporada: {interesse.temporada.nome}
 
 Data: {interesse.temporada.data_inicio} a {interesse.temporada.data_fim}
@@ -56,10 +193,62 @@ Por favor, acesse sua conta para confirmar ou recusar a participação.
 
 Equipe do Acampamento.
 """,
-        None,
-        [interesse.monitor.email],
-        fail_silently=False
-    )
+        )
+        for interesse in interesses
+        if interesse.monitor.email
+    ]
+    FilaEmail.objects.bulk_create(itens, batch_size=500)
+    return len(itens)
+
+
+def enviar_email_aprovacao(interesse):
+    return enfileirar_emails_aprovacao([interesse])
+
+
+def impressao_digital(*querysets):
+    """Contagem total e maior ``atualizado_em`` dos querysets (uma consulta cada)."""
+    total, ultimo = 0, None
+    for qs in querysets:
+        dados = qs.aggregate(total=Count('id'), ultimo=Max('atualizado_em'))
+        total += dados['total']
+        if dados['ultimo'] and (ultimo is None or dados['ultimo'] > ultimo):
+            ultimo = dados['ultimo']
+    return total, ultimo
+
+
+def resposta_condicional(querysets_da_view):
+    """Responde 304 quando nada mudou desde a última visita (ETag).
+
+    ``querysets_da_view(request, *args, **kwargs)`` devolve os querysets cujo
+    estado determina o conteúdo da página. O ETag também considera o usuário e
+    o cookie CSRF, pois as páginas trazem formulários com o token. Requisições
+    com mensagens pendentes sempre recebem a página completa.
+
+    Não há Last-Modified: apagar a linha mais recente faz o ``Max('atualizado_em')``
+    voltar no tempo, e um If-Modified-Since sozinho receberia um 304 indevido.
+    A contagem no ETag cobre as exclusões.
+    """
+    def decorator(view):
+        @wraps(view)
+        def _view(request, *args, **kwargs):
+            if request.method not in ('GET', 'HEAD') or len(get_messages(request)):
+                return view(request, *args, **kwargs)
+
+            total, ultimo = impressao_digital(*querysets_da_view(request, *args, **kwargs))
+            base = '|'.join([
+                str(request.user.pk),
+                request.get_full_path(),
+                request.COOKIES.get(settings.CSRF_COOKIE_NAME, ''),
+                str(total),
+                ultimo.isoformat() if ultimo else '',
+            ])
+            etag = hashlib.md5(base.encode()).hexdigest()
+
+            resposta = condition(etag_func=lambda *a, **k: etag)(view)(request, *args, **kwargs)
+            patch_cache_control(resposta, private=True, no_cache=True)
+            return resposta
+        return _view
+    return decorator
 
 
 def is_gestor(user):
@@ -1,19 +1,59 @@
+import hashlib
+import json
+
+from core.dashboard import invalidar_resumo_gestor
+from core.paginacao import paginar_por_cursor
 from django.shortcuts import render, redirect
 from django.contrib.auth.decorators import login_required, user_passes_test
-from django.views.decorators.http import require_POST
+from django.views.decorators.http import require_http_methods, require_POST
 from django.contrib import messages
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from . import estatisticas, lancamentos
+from .cache import TIMEOUT_CALENDARIO, chave_calendario, chave_ics, invalidar_calendarios, invalidar_folha
 from .forms import TemporadaForm
-from .models import Temporada, InteresseTemporada
+from .ics import gerar_ics, monitor_id_do_token, token_calendario
+from .models import STATUS_EQUIPE, Temporada, InteresseTemporada, TIPO_TEMPORADA
 from django.utils import timezone
-from .utils import enviar_email_aprovacao, enviar_email_temporadas_abertas, is_gestor, is_monitor
-from datetime import timedelta
-from django.http import JsonResponse
+from .utils import (
+    enfileirar_emails_aprovacao, enviar_email_aprovacao, enviar_email_temporadas_abertas, is_gestor, is_monitor,
+    resposta_condicional,
+)
+from datetime import date, timedelta
+from django.http import Http404, HttpResponse, HttpResponseNotModified, JsonResponse
+from django.urls import reverse
+from django.utils.http import urlencode
 from django.shortcuts import render, redirect, get_object_or_404
 
 
 def is_gestor(user):
     return user.is_authenticated and user.user_type == 'gestor'
 
+
+def _estado_temporadas(request, *args, **kwargs):
+    return [Temporada.objects.all()]
+
+
+def _estado_participacoes(request, *args, **kwargs):
+    return [
+        InteresseTemporada.objects.filter(monitor=request.user),
+        Temporada.objects.filter(interessetemporada__monitor=request.user),
+    ]
+
+
+def _estado_interessados(request, temporada_id):
+    return [
+        InteresseTemporada.objects.filter(temporada_id=temporada_id),
+        Temporada.objects.filter(id=temporada_id),
+    ]
+
+
+def _estado_calendario(request):
+    if request.user.user_type == 'gestor':
+        return _estado_temporadas(request)
+    return _estado_participacoes(request)
+
 @login_required
 @user_passes_test(is_gestor)
 def criar_temporada(request):
@@ -28,8 +68,9 @@ def criar_temporada(request):
 
 @login_required
 @user_passes_test(is_gestor)
+@resposta_condicional(_estado_temporadas)
 def listar_temporadas(request):
-    temporadas = Temporada.objects.all().order_by('data_inicio')
+    temporadas = paginar_por_cursor(request, Temporada.objects.all(), ('data_inicio', 'id'), por_pagina=50, estimar=True)
     return render(request, 'lista_temporadas.html', {'temporadas': temporadas})
 
 @login_required
@@ -56,9 +97,10 @@ def demonstrar_interesse(request, temporada_id):
 
 @login_required
 @user_passes_test(is_gestor)
+@resposta_condicional(_estado_interessados)
 def interessados_por_temporada(request, temporada_id):
     temporada = Temporada.objects.get(id=temporada_id)
-    interessados = InteresseTemporada.objects.filter(temporada=temporada)
+    interessados = InteresseTemporada.objects.filter(temporada=temporada).select_related('monitor')
 
     return render(request, 'interessados_por_temporada.html', {
         'temporada': temporada,
@@ -87,13 +129,58 @@ def alterar_status_interesse(request, interesse_id):
 
     return redirect('interessados_por_temporada', temporada_id=interesse.temporada.id)
 
+@require_POST
+@login_required
+@user_passes_test(is_gestor)
+def alterar_status_interesses_lote(request, temporada_id):
+    """Aprova ou recusa de uma vez os interesses selecionados da temporada."""
+    from .models import TemporadaEquipe
+    temporada = get_object_or_404(Temporada, id=temporada_id)
+    novo_status = request.POST.get('status')
+    # Ids não numéricos fariam o filtro id__in levantar ValueError
+    ids = [i for i in request.POST.getlist('interesses') if i.isdecimal()]
+
+    if novo_status not in ['aprovado', 'recusado'] or not ids:
+        messages.info(request, 'Selecione ao menos um interessado e uma ação.')
+        return redirect('interessados_por_temporada', temporada_id=temporada.id)
+
+    with transaction.atomic():
+        # Só interesses ainda em aberto mudam de status; os demais já foram processados
+        interesses = list(
+            # of=('self',): trava só os interesses, não os usuários do JOIN
+            InteresseTemporada.objects.select_for_update(of=('self',))
+            .filter(temporada=temporada, id__in=ids, status='interessado')
+            .select_related('monitor')
+        )
+        alterados = InteresseTemporada.objects.filter(
+            id__in=[i.id for i in interesses], status='interessado'
+        ).update(status=novo_status, atualizado_em=timezone.now())
+        invalidar_resumo_gestor()
+        estatisticas.interesses_alterados_em_lote([i.monitor_id for i in interesses], 'interessado', novo_status)
+        invalidar_calendarios(i.monitor_id for i in interesses)
+
+        if novo_status == 'aprovado' and interesses:
+            TemporadaEquipe.objects.bulk_create(
+                [TemporadaEquipe(temporada=temporada, monitor=i.monitor, status='pendente') for i in interesses],
+                ignore_conflicts=True,
+            )
+            invalidar_folha()
+            for interesse in interesses:
+                interesse.temporada = temporada
+            enfileirar_emails_aprovacao(interesses)
+
+    acao = 'aprovado(s)' if novo_status == 'aprovado' else 'recusado(s)'
+    messages.success(request, f'{alterados} interessado(s) {acao}.')
+    return redirect('interessados_por_temporada', temporada_id=temporada.id)
+
 @login_required
 @user_passes_test(is_monitor)
+@resposta_condicional(_estado_participacoes)
 def minhas_participacoes(request):
     interesses = InteresseTemporada.objects.filter(
         monitor=request.user,
         status__in=['aprovado', 'confirmado']
-    )
+    ).select_related('temporada')
     temporadas = [i.temporada for i in interesses]
 
     return render(request, 'minhas_participacoes.html', {
@@ -127,10 +214,17 @@ def enviar_emails_temporadas(request):
         messages.info(request, 'Nenhuma temporada selecionada para envio ou já enviada anteriormente.')
         return redirect('lista_temporadas')
 
-    resumo = enviar_email_temporadas_abertas(temporadas)
-    messages.success(request, f"E-mails enviados para {resumo['total_monitores']} monitores.")
+    digest = bool(request.POST.get('digest'))
+    resumo = enviar_email_temporadas_abertas(temporadas, digest=digest)
+    messages.success(
+        request,
+        f"{resumo['total_mensagens']} e-mail(s) enfileirado(s) para {resumo['total_monitores']} monitores. "
+        "O envio ocorre em segundo plano."
+    )
+    if resumo['digest']:
+        messages.info(request, f"Cada monitor recebe um único e-mail com as {resumo['total_temporadas']} temporadas.")
     for item in resumo['por_temporada']:
-        messages.info(request, f"Temporada '{item['nome']}': {item['enviados']} envios.")
+        messages.info(request, f"Temporada '{item['nome']}': {item['enviados']} envios na fila.")
     return redirect('lista_temporadas')
 
 @login_required
@@ -154,50 +248,122 @@ def habilitar_reenvio_email(request, temporada_id):
             'message': f'Erro ao habilitar reenvio: {str(e)}'
         })
 
+CORES_CALENDARIO = [
+    {"bg": "#0865AF", "border": "#054a7e"},
+    {"bg": "#FEBD02", "border": "#d4a901"},
+    {"bg": "#28a745", "border": "#1e7e34"},
+    {"bg": "#dc3545", "border": "#a71d2a"},
+    {"bg": "#6f42c1", "border": "#5936a2"},
+    {"bg": "#20c997", "border": "#159b7e"},
+]
+
+
+def _parse_data_calendario(valor):
+    """Aceita as datas ISO do FullCalendar (com ou sem horário/fuso)."""
+    if not valor:
+        return None
+    try:
+        return date.fromisoformat(valor[:10])
+    except ValueError:
+        return None
+
+
 @login_required
+@resposta_condicional(_estado_calendario)
 def api_temporadas_json(request):
-    if request.user.user_type == 'gestor':
-        temporadas = Temporada.objects.all()
-    else:
+    inicio = _parse_data_calendario(request.GET.get('start'))
+    fim = _parse_data_calendario(request.GET.get('end'))
+    if (request.GET.get('start') and not inicio) or (request.GET.get('end') and not fim):
+        return JsonResponse({'error': 'Parâmetros start/end inválidos.'}, status=400)
+
+    chave = chave_calendario(request.user, inicio, fim)
+    eventos = cache.get(chave)
+    if eventos is None:
+        eventos = _eventos_calendario(request.user, inicio, fim)
+        cache.set(chave, eventos, TIMEOUT_CALENDARIO)
+
+    return JsonResponse(eventos, safe=False)
+
+
+def _eventos_calendario(user, inicio, fim):
+    temporadas = Temporada.objects.all()
+    if user.user_type != 'gestor':
         temporadas_ids = InteresseTemporada.objects.filter(
-            monitor=request.user,
+            monitor=user,
             status='confirmado'
         ).values_list('temporada', flat=True)
-        temporadas = Temporada.objects.filter(id__in=temporadas_ids)
-
-    cores = [
-        {"bg": "#0865AF", "border": "#054a7e"},
-        {"bg": "#FEBD02", "border": "#d4a901"},
-        {"bg": "#28a745", "border": "#1e7e34"},
-        {"bg": "#dc3545", "border": "#a71d2a"},
-        {"bg": "#6f42c1", "border": "#5936a2"},
-        {"bg": "#20c997", "border": "#159b7e"},
-    ]
+        temporadas = temporadas.filter(id__in=temporadas_ids)
+
+    # Apenas temporadas que se sobrepõem à janela visível ('end' é exclusivo)
+    if fim:
+        temporadas = temporadas.filter(data_inicio__lt=fim)
+    if inicio:
+        temporadas = temporadas.filter(data_fim__gte=inicio)
 
+    tipos = dict(TIPO_TEMPORADA)
     eventos = []
-    for idx, t in enumerate(temporadas):
-        cor = cores[idx % len(cores)]  # troca as cores ciclicamente
+    for t in temporadas.order_by('data_inicio', 'id').values(
+        'id', 'nome', 'data_inicio', 'data_fim', 'cliente', 'tipo'
+    ):
+        cor = CORES_CALENDARIO[t['id'] % len(CORES_CALENDARIO)]  # cor estável entre janelas
         eventos.append({
-            "id": t.id,
-            "title": t.nome,
-            "start": t.data_inicio.isoformat(),
-            "end": (t.data_fim + timedelta(days=1)).isoformat(),
+            "id": t['id'],
+            "title": t['nome'],
+            "start": t['data_inicio'].isoformat(),
+            "end": (t['data_fim'] + timedelta(days=1)).isoformat(),
             "backgroundColor": cor["bg"],
             "borderColor": cor["border"],
             "extendedProps": {
-                "cliente": t.cliente,
-                "tipo": t.get_tipo_display(),
-                "data_inicio": t.data_inicio.strftime('%d/%m/%Y'),
-                "data_fim": t.data_fim.strftime('%d/%m/%Y')
+                "cliente": t['cliente'],
+                "tipo": tipos.get(t['tipo'], t['tipo']),
+                "data_inicio": t['data_inicio'].strftime('%d/%m/%Y'),
+                "data_fim": t['data_fim'].strftime('%d/%m/%Y')
             }
         })
-
-
-    return JsonResponse(eventos, safe=False)
+    return eventos
 
 @login_required
 def calendario_novo_view(request):
-    return render(request, 'calendario_full.html')
+    contexto = {}
+    if request.user.user_type == 'monitor':
+        contexto['url_ics'] = request.build_absolute_uri(
+            reverse('calendario_ics', args=[token_calendario(request.user)])
+        )
+    return render(request, 'calendario_full.html', contexto)
+
+
+def calendario_ics(request, token):
+    """Feed .ics público (protegido pelo token) das temporadas confirmadas do monitor."""
+    monitor_id = monitor_id_do_token(token)
+    if monitor_id is None:
+        raise Http404
+
+    chave = chave_ics(monitor_id)
+    feed = cache.get(chave)
+    if feed is None:
+        tipos = dict(TIPO_TEMPORADA)
+        temporadas = list(
+            Temporada.objects.filter(
+                interessetemporada__monitor_id=monitor_id,
+                interessetemporada__status='confirmado',
+            ).order_by('data_inicio', 'id').values(
+                'id', 'nome', 'data_inicio', 'data_fim', 'cliente', 'tipo',
+                'hora_chegada_equipe', 'hora_saida_equipe', 'atualizado_em',
+            )
+        )
+        for t in temporadas:
+            t['tipo_display'] = tipos.get(t['tipo'], t['tipo'])
+        conteudo = gerar_ics(temporadas)
+        feed = {'ics': conteudo, 'etag': '"%s"' % hashlib.md5(conteudo.encode()).hexdigest()}
+        cache.set(chave, feed, TIMEOUT_CALENDARIO)
+
+    if request.headers.get('If-None-Match') == feed['etag']:
+        resposta = HttpResponseNotModified()
+    else:
+        resposta = HttpResponse(feed['ics'], content_type='text/calendar; charset=utf-8')
+        resposta['Content-Disposition'] = 'inline; filename="temporadas.ics"'
+    resposta['ETag'] = feed['etag']
+    return resposta
 
 @login_required
 @user_passes_test(is_gestor)
@@ -231,20 +397,31 @@ def visualizar_temporada_monitor(request, temporada_id):
 @login_required
 @user_passes_test(is_gestor)
 def configurar_valores(request):
-    from .models import ConfiguracaoValores
-    instancia = ConfiguracaoValores.objects.order_by('-atualizado_em').first()
+    from .forms import ValoresDiariaForm
+    from .models import CATEGORIAS_VALOR, ValorDiaria
+    from .pagamentos import tabela_valores
+    tabela = tabela_valores()
     if request.method == 'POST':
-        from .forms import ConfiguracaoValoresForm
-        form = ConfiguracaoValoresForm(request.POST, instance=instancia)
+        form = ValoresDiariaForm(request.POST, tabela=tabela)
         if form.is_valid():
-            form.save()
-            messages.success(request, 'Valores de diárias atualizados com sucesso!')
+            alteradas = form.salvar()
+            if alteradas:
+                messages.success(request, f'{alteradas} valor(es) de diária com nova vigência a partir de '
+                                          f'{form.cleaned_data["vigente_desde"]:%d/%m/%Y}.')
+            else:
+                messages.info(request, 'Nenhum valor foi alterado.')
             return redirect('configurar_valores')
         messages.error(request, 'Corrija os erros do formulário de valores.')
     else:
-        from .forms import ConfiguracaoValoresForm
-        form = ConfiguracaoValoresForm(instance=instancia)
-    return render(request, 'configurar_valores.html', {'form': form})
+        hoje = timezone.localdate()
+        form = ValoresDiariaForm(
+            initial={'vigente_desde': hoje, **{categoria: tabela.valor(categoria, hoje) for categoria, _ in CATEGORIAS_VALOR}},
+            tabela=tabela,
+        )
+    return render(request, 'configurar_valores.html', {
+        'form': form,
+        'historico': ValorDiaria.objects.order_by('-vigente_desde', 'categoria')[:100],
+    })
 
 
 @login_required
@@ -283,154 +460,224 @@ def _parse_decimal_br(valor_txt):
         return None
 
 
+# Campos da equipe editados na tela da temporada
+CAMPOS_EQUIPE_EDITAVEIS = (
+    'status', 'recebe_ajuda_custo', 'ajuda_custo_classe', 'recebe_embarque', 'valor_embarque_especial',
+    'recebe_desembarque', 'valor_desembarque_especial',
+)
+
+
+def _valores_membro(dados, prefixo, ajudas, membro):
+    """Valores enviados para um membro; ``ajudas`` é o dict de classes pré-carregado por id."""
+    status = dados.get(prefixo + 'status')
+    return {
+        'status': status if status in dict(STATUS_EQUIPE) else membro.status,
+        'recebe_ajuda_custo': bool(dados.get(prefixo + 'recebe_ajuda_custo')),
+        'ajuda_custo_classe': ajudas.get(dados.get(prefixo + 'ajuda_custo_classe') or ''),
+        'recebe_embarque': bool(dados.get(prefixo + 'recebe_embarque')),
+        'valor_embarque_especial': _parse_decimal_br(dados.get(prefixo + 'valor_embarque_especial')),
+        'recebe_desembarque': bool(dados.get(prefixo + 'recebe_desembarque')),
+        'valor_desembarque_especial': _parse_decimal_br(dados.get(prefixo + 'valor_desembarque_especial')),
+    }
+
+
 @login_required
 @user_passes_test(is_gestor)
 def gerenciar_equipe_temporada(request, temporada_id):
     from .models import TemporadaEquipe, AjudaCustoClasse, Temporada
+    from .pagamentos import anotar_pagamento
     temporada = get_object_or_404(Temporada, id=temporada_id)
-    equipe = TemporadaEquipe.objects.filter(temporada=temporada).select_related('monitor', 'ajuda_custo_classe')
+    equipe = TemporadaEquipe.objects.filter(temporada=temporada).select_related('monitor', 'ajuda_custo_classe').order_by('monitor__first_name', 'monitor__username')
+    ajudas = list(AjudaCustoClasse.objects.order_by('nome'))
     if request.method == 'POST':
-        for membro in equipe:
-            prefix = f"m_{membro.id}_"
-            membro.recebe_ajuda_custo = bool(request.POST.get(prefix + 'recebe_ajuda_custo'))
-            ajuda_id = request.POST.get(prefix + 'ajuda_custo_classe')
-            membro.ajuda_custo_classe = AjudaCustoClasse.objects.filter(id=ajuda_id).first() if ajuda_id else None
-            membro.recebe_embarque = bool(request.POST.get(prefix + 'recebe_embarque'))
-            membro.recebe_desembarque = bool(request.POST.get(prefix + 'recebe_desembarque'))
-            membro.valor_embarque_especial = _parse_decimal_br(request.POST.get(prefix + 'valor_embarque_especial'))
-            membro.valor_desembarque_especial = _parse_decimal_br(request.POST.get(prefix + 'valor_desembarque_especial'))
-            status = request.POST.get(prefix + 'status')
-            if status in dict(membro._meta.get_field('status').choices):
-                membro.status = status
-            membro.save()
-        messages.success(request, 'Equipe da temporada atualizada com sucesso!')
+        por_id = {str(ajuda.id): ajuda for ajuda in ajudas}
+        alterados, campos = [], set()
+        # Lê e compara as linhas travadas: um PATCH ou outro editor simultâneo
+        # não pode lançar ou estornar a mesma mudança de status duas vezes
+        with transaction.atomic():
+            for membro in equipe.select_for_update(of=('self',)):
+                membro.temporada = temporada
+                valores = _valores_membro(request.POST, f"m_{membro.id}_", por_id, membro)
+                mudou = [campo for campo, valor in valores.items() if getattr(membro, campo) != valor]
+                if mudou:
+                    for campo in mudou:
+                        setattr(membro, campo, valores[campo])
+                    alterados.append(membro)
+                    campos.update(mudou)
+
+            if alterados:
+                agora = timezone.now()
+                for membro in alterados:
+                    membro.atualizado_em = agora
+                TemporadaEquipe.objects.bulk_update(alterados, [*sorted(campos), 'atualizado_em'])
+                # bulk_update não dispara sinais: livro, estatísticas e folha são atualizados aqui
+                if 'status' in campos:
+                    lancados = lancamentos.equipes_alteradas_em_lote(alterados)
+                    estatisticas.equipes_alteradas_em_lote(alterados, lancados)
+                invalidar_folha()
+
+        if alterados:
+            messages.success(request, f'Equipe da temporada atualizada: {len(alterados)} membro(s) alterado(s).')
+        else:
+            messages.info(request, 'Nenhuma alteração na equipe.')
         return redirect('gerenciar_equipe_temporada', temporada_id=temporada.id)
 
-    ajudas = AjudaCustoClasse.objects.all()
     return render(request, 'gerenciar_equipe_temporada.html', {
         'temporada': temporada,
-        'equipe': equipe,
+        'equipe': anotar_pagamento(equipe),
         'ajudas': ajudas,
+        'status_equipe': STATUS_EQUIPE,
     })
 
 
-@login_required
-@user_passes_test(is_monitor)
-def relatorio_monitor(request):
+def _valores_patch(dados, membro):
+    """Valida os campos enviados no PATCH; retorna ``(valores, erros)`` só com os campos presentes."""
+    from .models import AjudaCustoClasse, TemporadaEquipe
+    valores, erros = {}, {}
+    for campo, valor in dados.items():
+        if campo not in CAMPOS_EQUIPE_EDITAVEIS:
+            erros[campo] = 'Campo não editável.'
+        elif campo == 'status':
+            if valor in dict(STATUS_EQUIPE):
+                valores[campo] = valor
+            else:
+                erros[campo] = 'Status inválido.'
+        elif campo.startswith('recebe_'):
+            if isinstance(valor, bool):
+                valores[campo] = valor
+            else:
+                erros[campo] = 'Informe true ou false.'
+        elif campo == 'ajuda_custo_classe':
+            if valor in (None, ''):
+                valores[campo] = None
+            else:
+                ajuda = AjudaCustoClasse.objects.filter(pk=valor).first() if str(valor).isdigit() else None
+                if ajuda is None:
+                    erros[campo] = 'Ajuda de custo não encontrada.'
+                else:
+                    valores[campo] = ajuda
+        elif valor in (None, ''):
+            valores[campo] = None
+        else:
+            decimal = _parse_decimal_br(valor)
+            try:
+                if decimal is None:
+                    raise ValidationError('Informe um valor numérico.')
+                valores[campo] = TemporadaEquipe._meta.get_field(campo).clean(decimal, membro)
+            except ValidationError as erro:
+                erros[campo] = ' '.join(erro.messages)
+    return valores, erros
+
+
+def _estado_membro(membro, alterados):
     from decimal import Decimal
-    from .models import TemporadaEquipe, ConfiguracaoValores
-    equipe = TemporadaEquipe.objects.filter(monitor=request.user).select_related('temporada', 'ajuda_custo_classe')
-    config = ConfiguracaoValores.objects.order_by('-atualizado_em').first()
-
-    def valor_diaria_para(user, temporada):
-        if not config:
-            return Decimal('0')
-        if temporada.tipo == 'dayuse':
-            return config.day_camp
-        mapa = {
-            'conselheiro_senior': config.conselheiro_senior,
-            'conselheiro': config.conselheiro,
-            'monitor': config.monitor,
-            'monitor_junior': config.monitor_junior,
-            'estagiario': config.estagiario,
-            'enfermeira': config.enfermeira,
-            'enfermeira_estagiaria': config.enfermeira_estagiaria,
-            'fotografo_1': config.fotografo_1,
-            'fotografo_2': config.fotografo_2,
-        }
-        return mapa.get(user.categoria, Decimal('0')) or Decimal('0')
-
-    itens = []
-    for m in equipe:
-        diaria = valor_diaria_para(request.user, m.temporada)
-        diarias = m.temporada.numero_diarias or 0
-        ajuda = m.ajuda_custo_classe.valor if (m.recebe_ajuda_custo and m.ajuda_custo_classe) else 0
-        embarque = m.valor_embarque_especial or 0
-        desembarque = m.valor_desembarque_especial or 0
-        total = (diaria * diarias) + ajuda + embarque + desembarque
-        itens.append({
-            'temporada': m.temporada,
-            'funcao': getattr(request.user, 'get_categoria_display', lambda: request.user.categoria)(),
-            'valor_diaria': diaria,
-            'numero_diarias': diarias,
-            'ajuda': ajuda,
-            'embarque': embarque,
-            'desembarque': desembarque,
-            'status': m.get_status_display(),
-            'total': total,
-        })
+    from .pagamentos import calcular_pagamento
+    pagamento = calcular_pagamento(membro)
+    return {
+        'id': membro.id,
+        'status': membro.status,
+        'status_display': membro.get_status_display(),
+        'recebe_ajuda_custo': membro.recebe_ajuda_custo,
+        'ajuda_custo_classe': membro.ajuda_custo_classe_id,
+        'recebe_embarque': membro.recebe_embarque,
+        'valor_embarque_especial': membro.valor_embarque_especial,
+        'recebe_desembarque': membro.recebe_desembarque,
+        'valor_desembarque_especial': membro.valor_desembarque_especial,
+        'atualizado_em': membro.atualizado_em,
+        'alterados': alterados,
+        'pagamento': {
+            campo: valor if campo == 'numero_diarias' else valor.quantize(Decimal('0.01'))
+            for campo, valor in pagamento.items()
+        },
+    }
 
-    return render(request, 'relatorio_monitor.html', {'itens': itens})
 
 @login_required
-def api_temporadas_json(request):
-    if request.user.user_type == 'gestor':
-        temporadas = Temporada.objects.all()
-    else:
-        temporadas_ids = InteresseTemporada.objects.filter(
-            monitor=request.user,
-            status='confirmado'
-        ).values_list('temporada', flat=True)
-        temporadas = Temporada.objects.filter(id__in=temporadas_ids)
-
-    cores = [
-        {"bg": "#0865AF", "border": "#054a7e"},
-        {"bg": "#FEBD02", "border": "#d4a901"},
-        {"bg": "#28a745", "border": "#1e7e34"},
-        {"bg": "#dc3545", "border": "#a71d2a"},
-        {"bg": "#6f42c1", "border": "#5936a2"},
-        {"bg": "#20c997", "border": "#159b7e"},
-    ]
-
-    eventos = []
-    for idx, t in enumerate(temporadas):
-        cor = cores[idx % len(cores)]  # troca as cores ciclicamente
-        eventos.append({
-            "id": t.id,
-            "title": t.nome,
-            "start": t.data_inicio.isoformat(),
-            "end": (t.data_fim + timedelta(days=1)).isoformat(),
-            "backgroundColor": cor["bg"],
-            "borderColor": cor["border"],
-            "extendedProps": {
-                "cliente": t.cliente,
-                "tipo": t.get_tipo_display(),
-                "data_inicio": t.data_inicio.strftime('%d/%m/%Y'),
-                "data_fim": t.data_fim.strftime('%d/%m/%Y')
-            }
-        })
+@require_http_methods(['GET', 'PATCH'])
+@user_passes_test(is_gestor)
+def membro_equipe_temporada(request, temporada_id, membro_id):
+    """Uma linha da equipe: GET devolve a linha da tabela, PATCH grava os campos enviados em JSON"""
+    from .models import TemporadaEquipe
+    from .pagamentos import anotar_pagamento
+    equipe = TemporadaEquipe.objects.filter(pk=membro_id, temporada_id=temporada_id)
+    if request.method == 'GET':
+        membro = get_object_or_404(anotar_pagamento(equipe).select_related('monitor', 'ajuda_custo_classe'))
+        return render(request, 'linha_equipe_temporada.html', {'m': membro, 'status_equipe': STATUS_EQUIPE})
 
+    try:
+        dados = json.loads(request.body)
+    except ValueError:
+        dados = None
+    if not isinstance(dados, dict) or not dados:
+        return JsonResponse({'error': 'Envie um objeto JSON com os campos a alterar.'}, status=400)
+
+    # A linha fica travada até o fim: o status anterior (e com ele o livro e as
+    # estatísticas) vem da leitura travada, não de um envio simultâneo da tabela
+    with transaction.atomic():
+        membro = get_object_or_404(
+            equipe.select_for_update(of=('self',)).select_related('temporada', 'monitor', 'ajuda_custo_classe')
+        )
+        valores, erros = _valores_patch(dados, membro)
+        if erros:
+            return JsonResponse({'error': 'Dados inválidos.', 'erros': erros}, status=400)
+
+        alterados = [campo for campo, valor in valores.items() if getattr(membro, campo) != valor]
+        if alterados:
+            for campo in alterados:
+                setattr(membro, campo, valores[campo])
+            # save() dispara os sinais: livro, estatísticas e folha acompanham a mudança de status
+            membro.save(update_fields=[*alterados, 'atualizado_em'])
+    return JsonResponse(_estado_membro(membro, alterados))
 
-    return JsonResponse(eventos, safe=False)
 
 @login_required
-def calendario_novo_view(request):
-    return render(request, 'calendario_full.html')
+@user_passes_test(is_monitor)
+def relatorio_monitor(request):
+    from .models import TemporadaEquipe
+    from .pagamentos import anotar_pagamento, tabela_valores, totais_pagamento
+    equipe = TemporadaEquipe.objects.filter(monitor=request.user)
+    tabela = tabela_valores()
+    # Componentes e totais calculados no banco, sem instanciar monitor e ajuda de custo por linha
+    itens = anotar_pagamento(equipe.select_related('temporada'), tabela).order_by('temporada__data_inicio', 'id')
+
+    return render(request, 'relatorio_monitor.html', {
+        'itens': itens,
+        'funcao': request.user.get_categoria_display(),
+        'totais': totais_pagamento(equipe, tabela=tabela),
+    })
 
-@login_required
-@user_passes_test(is_gestor)
-def detalhes_temporada(request, temporada_id):
-    temporada = get_object_or_404(Temporada, id=temporada_id)
 
-    if request.method == 'POST':
-        form = TemporadaForm(request.POST, instance=temporada)
-        if form.is_valid():
-            form.save()
-            return redirect('lista_temporadas')
-    else:
-        form = TemporadaForm(instance=temporada)
+def _form_folha(request):
+    from .forms import FolhaPagamentoForm
+    dados = request.GET
+    if not dados:
+        # Sem filtros, abre no mês corrente
+        hoje = timezone.localdate()
+        inicio = hoje.replace(day=1)
+        fim = (inicio + timedelta(days=32)).replace(day=1) - timedelta(days=1)
+        dados = {'inicio': inicio.isoformat(), 'fim': fim.isoformat()}
+    return FolhaPagamentoForm(dados)
 
-    return render(request, 'detalhes_temporada.html', {
-        'temporada': temporada,
-        'form': form
-    })
 
 @login_required
-@user_passes_test(is_monitor)
-def visualizar_temporada_monitor(request, temporada_id):
-    temporada = get_object_or_404(Temporada, id=temporada_id)
-
-    # Futuro: incluir outras infos como documentos, status etc.
-    return render(request, 'visualizar_temporada_monitor.html', {
-        'temporada': temporada
+@user_passes_test(is_gestor)
+def folha_pagamento(request):
+    from .folha import resumo_folha
+    form = _form_folha(request)
+    resumo = resumo_folha(**form.filtros()) if form.is_valid() else None
+    return render(request, 'folha_pagamento.html', {
+        'form': form,
+        'resumo': resumo,
+        'parametros': urlencode(form.data, doseq=True),
     })
+
+
+@login_required
+@user_passes_test(is_gestor)
+def exportar_folha_pagamento(request):
+    from .folha import resposta_csv
+    form = _form_folha(request)
+    if not form.is_valid():
+        messages.error(request, 'Corrija os filtros da folha antes de exportar.')
+        return redirect('folha_pagamento')
+    return resposta_csv(**form.filtros())